@@ -43,6 +43,35 @@ function encodeBase64(bytes: Uint8Array) {
   return result;
 }
 
+function decodeBase64(input: string) {
+  const clean = input.replace(/=+$/, '');
+  const bytes = new Uint8Array(Math.floor((clean.length * 3) / 4));
+  let buffer = 0;
+  let bits = 0;
+  let out = 0;
+
+  for (let i = 0; i < clean.length; i++) {
+    buffer = (buffer << 6) | base64Chars.indexOf(clean[i]);
+    bits += 6;
+    if (bits >= 8) {
+      bits -= 8;
+      bytes[out++] = (buffer >> bits) & 0xff;
+    }
+  }
+
+  return bytes.subarray(0, out);
+}
+
+async function writeAudioFile(bytes: Uint8Array) {
+  const FileSystem = await import('expo-file-system');
+  const path = `${FileSystem.cacheDirectory}alfred_tts_${Date.now()}.mp3`;
+  console.log('[Alfred] TTS audio cache path:', path);
+  await FileSystem.writeAsStringAsync(path, encodeBase64(bytes), {
+    encoding: FileSystem.EncodingType.Base64,
+  });
+  return path;
+}
+
 type ChatHistory = { role: 'user' | 'assistant'; content: string };
 
 export default function HomeScreen() {
@@ -99,19 +128,13 @@ export default function HomeScreen() {
 
       if (!uri) throw new Error('Recording URI missing.');
 
-      setStatus('Uploading audio to STT...');
-      const text = await callSTT(uri);
-      setTranscript(text);
+      setStatus('Sending voice turn...');
+      const audioUri = await callVoice(uri);
 
-      setStatus('Asking Alfred...');
-      const assistantReply = await callChat(text);
-      setReply(assistantReply);
-
-      setStatus('Generating voice...');
-      const audioUri = await callTTS(assistantReply);
-
-      setStatus('Playing...');
-      await playAudio(audioUri);
+      if (audioUri) {
+        setStatus('Playing...');
+        await playAudio(audioUri);
+      }
 
       setStatus('Done ✅');
     } catch (e) {
@@ -119,9 +142,11 @@ export default function HomeScreen() {
     }
   }
 
-  async function callSTT(audioUri: string) {
-    const url = `${BACKEND_URL}/stt`;
-
+  // One round-trip voice turn: POST /voice runs STT -> chat -> TTS on the server
+  // and streams transcript, reply text and audio back as Server-Sent Events.
+  // Resolves with a local audio file URI, or null when the server has no TTS.
+  function callVoice(audioUri: string): Promise<string | null> {
+    const url = `${BACKEND_URL}/voice`;
     const form = new FormData();
     form.append('audio', {
       uri: audioUri,
@@ -129,37 +154,131 @@ export default function HomeScreen() {
       type: 'audio/m4a',
     } as any);
 
-    const res = await fetch(url, {
-      method: 'POST',
-      body: form,
-      headers: {
-        // Let fetch set multipart boundary automatically
-      },
+    return new Promise((resolve, reject) => {
+      const xhr = new XMLHttpRequest();
+      const audioChunks: Uint8Array[] = [];
+      let parsedUpTo = 0;
+      let text = '';
+      let finished = false;
+
+      const handleBlock = (block: string) => {
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+        if (event === 'transcript') {
+          setTranscript(payload.text || '');
+          setStatus('Asking Alfred...');
+        } else if (event === 'token') {
+          text += payload.delta || '';
+          setReply(text);
+        } else if (event === 'reply') {
+          setReply(payload.text || text);
+          setStatus('Generating voice...');
+        } else if (event === 'audio') {
+          audioChunks.push(decodeBase64(payload.data || ''));
+        } else if (event === 'done') {
+          finished = true;
+          if (!payload.audio || audioChunks.length === 0) {
+            resolve(null);
+            return;
+          }
+          const total = audioChunks.reduce((n, c) => n + c.length, 0);
+          const bytes = new Uint8Array(total);
+          let offset = 0;
+          for (const c of audioChunks) {
+            bytes.set(c, offset);
+            offset += c.length;
+          }
+          writeAudioFile(bytes).then(resolve, reject);
+        } else if (event === 'error') {
+          finished = true;
+          reject(new Error(`${payload.stage || 'voice'}: ${payload.error || 'failed'}`));
+        }
+      };
+
+      const drain = () => {
+        const body = xhr.responseText || '';
+        let sep;
+        while ((sep = body.indexOf('\n\n', parsedUpTo)) !== -1) {
+          handleBlock(body.slice(parsedUpTo, sep));
+          parsedUpTo = sep + 2;
+        }
+      };
+
+      xhr.open('POST', url);
+      xhr.onprogress = drain;
+      xhr.onload = () => {
+        drain();
+        if (xhr.status < 200 || xhr.status >= 300) reject(new Error('Voice request failed'));
+        else if (!finished) reject(new Error('Voice stream ended early'));
+      };
+      xhr.onerror = () => reject(new Error('Voice request failed'));
+      xhr.send(form);
     });
-
-    const data = await res.json().catch(() => ({}));
-    if (!res.ok) throw new Error(data.error || 'STT failed');
-    return (data.text || '').trim();
   }
 
-  async function callChat(message: string) {
-    const url = `${BACKEND_URL}/chat`;
-
-    const newHistory = [...history, { role: 'user', content: message }];
-
-    const res = await fetch(url, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ message, history: newHistory }),
+  // Streams the reply from /chat/stream (Server-Sent Events) so the UI can show
+  // tokens as they arrive. XMLHttpRequest is used because React Native's fetch
+  // does not expose a readable response body.
+  function callChat(message: string): Promise<string> {
+    const url = `${BACKEND_URL}/chat/stream`;
+    const newHistory: ChatHistory[] = [...history, { role: 'user', content: message }];
+    const startedAt = Date.now();
+
+    return new Promise((resolve, reject) => {
+      const xhr = new XMLHttpRequest();
+      let parsedUpTo = 0;
+      let text = '';
+      let finished = false;
+
+      const handleBlock = (block: string) => {
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        const payload = data ? JSON.parse(data) : {};
+        if (event === 'token') {
+          if (!text) setStatus(`First token in ${Date.now() - startedAt} ms…`);
+          text += payload.delta || '';
+          setReply(text);
+        } else if (event === 'done') {
+          finished = true;
+          const assistantReply = (payload.reply || text).trim();
+          console.log('[Alfred] assistant reply:', assistantReply);
+          setHistory([...newHistory, { role: 'assistant', content: assistantReply }]);
+          resolve(assistantReply);
+        } else if (event === 'error') {
+          finished = true;
+          reject(new Error(payload.error || 'Chat failed'));
+        }
+      };
+
+      const drain = () => {
+        const body = xhr.responseText || '';
+        let sep;
+        while ((sep = body.indexOf('\n\n', parsedUpTo)) !== -1) {
+          handleBlock(body.slice(parsedUpTo, sep));
+          parsedUpTo = sep + 2;
+        }
+      };
+
+      xhr.open('POST', url);
+      xhr.setRequestHeader('Content-Type', 'application/json');
+      xhr.onprogress = drain;
+      xhr.onload = () => {
+        drain();
+        if (xhr.status < 200 || xhr.status >= 300) reject(new Error('Chat failed'));
+        else if (!finished) reject(new Error('Chat stream ended early'));
+      };
+      xhr.onerror = () => reject(new Error('Chat failed'));
+      xhr.send(JSON.stringify({ message }));
     });
-
-    const data = await res.json().catch(() => ({}));
-    if (!res.ok) throw new Error(data.error || 'Chat failed');
-
-    const assistantReply = (data.reply || '').trim();
-    console.log('[Alfred] assistant reply:', assistantReply);
-    setHistory([...newHistory, { role: 'assistant', content: assistantReply }]);
-    return assistantReply;
   }
 
   async function callTTS(text: string) {
@@ -185,17 +304,7 @@ export default function HomeScreen() {
 
     const blob = await res.blob();
     const arrayBuffer = await blob.arrayBuffer();
-    const bytes = new Uint8Array(arrayBuffer);
-
-    const FileSystem = await import('expo-file-system');
-    const path = `${FileSystem.cacheDirectory}alfred_tts_${Date.now()}.mp3`;
-
-    const base64 = encodeBase64(bytes);
-
-    console.log('[Alfred] TTS audio cache path:', path);
-
-    await FileSystem.writeAsStringAsync(path, base64, { encoding: FileSystem.EncodingType.Base64 });
-    return path;
+    return writeAudioFile(new Uint8Array(arrayBuffer));
   }
 
   async function playAudio(uri: string) {
@@ -0,0 +1,42 @@
+"""
+Small PCM helpers shared by the streaming voice session and STT preprocessing.
+All sample math is vectorized with NumPy.
+"""
+import io
+import wave
+
+import numpy as np
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+
+def pcm16_to_float(pcm: bytes) -> np.ndarray:
+    """Little-endian 16-bit PCM bytes -> float32 samples in [-1, 1]."""
+    usable = len(pcm) - (len(pcm) % SAMPLE_WIDTH)
+    samples = np.frombuffer(pcm[:usable], dtype="<i2")
+    return samples.astype(np.float32) / 32768.0
+
+
+def float_to_pcm16(samples: np.ndarray) -> bytes:
+    clipped = np.clip(samples, -1.0, 1.0)
+    return (clipped * 32767.0).astype("<i2").tobytes()
+
+
+def frame_rms(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS energy of each complete `frame_len`-sample frame."""
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.empty(0, dtype=np.float32)
+    frames = samples[: n_frames * frame_len].reshape(n_frames, frame_len)
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+
+def encode_wav(pcm: bytes, sample_rate: int, channels: int = 1) -> bytes:
+    """Wrap raw 16-bit PCM in a WAV container."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(SAMPLE_WIDTH)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
@@ -0,0 +1,260 @@
+"""
+Audio normalization before Whisper.
+
+Uploads arrive as 44.1 kHz stereo WAV from the web client, m4a from mobile,
+and so on. This stage decodes the upload, downmixes to mono, resamples to
+16 kHz and trims leading/trailing silence with a vectorized energy detector,
+then hands Whisper a compact 16-bit WAV. Clips without speech are rejected
+before any upstream call.
+
+WAV is decoded with the standard library; other containers are streamed
+through `ffmpeg` when it is on PATH. Anything we cannot decode is passed
+through unchanged.
+"""
+import io
+import os
+import shutil
+import subprocess
+import threading
+import time
+import wave
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+from .audio import encode_wav, float_to_pcm16, frame_rms, pcm16_to_float
+
+TARGET_RATE = 16000
+FRAME_MS = 20
+SPEECH_RMS = float(os.getenv("ALFRED_STT_SPEECH_RMS", "0.005"))
+MIN_SPEECH_MS = int(os.getenv("ALFRED_STT_MIN_SPEECH_MS", "100"))
+PAD_MS = int(os.getenv("ALFRED_STT_TRIM_PAD_MS", "200"))
+FFMPEG_TIMEOUT = float(os.getenv("ALFRED_FFMPEG_TIMEOUT", "30"))
+FFMPEG_CHUNK_BYTES = 64 * 1024
+WAV_CHUNK_FRAMES = 64 * 1024
+
+
+@dataclass
+class PrepResult:
+    audio: Optional[bytes]   # normalized WAV, or None to send the original upload
+    has_speech: bool
+    bytes_in: int
+    bytes_out: int
+    elapsed_ms: float
+    decoder: str             # "wav", "ffmpeg", "pcm" or "passthrough"
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "decoder": self.decoder,
+            "has_speech": self.has_speech,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "elapsed_ms": round(self.elapsed_ms, 2),
+        }
+
+
+class PrepStats:
+    """Running totals across requests (exposed at /stats)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clips = 0
+        self.rejected_no_speech = 0
+        self.passthrough = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed_ms = 0.0
+
+    def record(self, result: PrepResult) -> None:
+        with self._lock:
+            self.clips += 1
+            self.rejected_no_speech += 0 if result.has_speech else 1
+            self.passthrough += 1 if result.decoder == "passthrough" else 0
+            self.bytes_in += result.bytes_in
+            self.bytes_out += result.bytes_out
+            self.elapsed_ms += result.elapsed_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clips": self.clips,
+                "rejected_no_speech": self.rejected_no_speech,
+                "passthrough": self.passthrough,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+                "avg_ms": round(self.elapsed_ms / self.clips, 2) if self.clips else 0.0,
+            }
+
+
+stats = PrepStats()
+
+
+def _to_float(raw: bytes, width: int) -> Optional[np.ndarray]:
+    if width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if width == 2:
+        return pcm16_to_float(raw)
+    if width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    return None
+
+
+def _decode_wav(source: BinaryIO) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    PCM WAV -> (float32 samples shaped (n, channels), sample rate).
+    Frames are read and converted in chunks, so only the float32 result is
+    held in memory rather than the raw bytes as well.
+    """
+    try:
+        with wave.open(source, "rb") as w:
+            channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            if width not in (1, 2, 4):
+                return None
+            samples = np.empty(w.getnframes() * channels, dtype=np.float32)
+            filled = 0
+            while filled < len(samples):
+                chunk = _to_float(w.readframes(WAV_CHUNK_FRAMES), width)
+                if not len(chunk):
+                    break  # header claims more frames than the file holds
+                chunk = chunk[:len(samples) - filled]
+                samples[filled:filled + len(chunk)] = chunk
+                filled += len(chunk)
+    except (wave.Error, EOFError, ValueError):
+        return None
+    usable = filled - filled % channels
+    return samples[:usable].reshape(-1, channels), rate
+
+
+def _feed(source: BinaryIO, stdin: BinaryIO) -> None:
+    try:
+        shutil.copyfileobj(source, stdin, FFMPEG_CHUNK_BYTES)
+    except (BrokenPipeError, OSError, ValueError):
+        pass  # ffmpeg gave up on the input (or was killed); its exit code says so
+    finally:
+        try:
+            stdin.close()
+        except OSError:
+            pass
+
+
+def _decode_ffmpeg(source: BinaryIO) -> Optional[Tuple[np.ndarray, int]]:
+    """
+    Any container ffmpeg understands -> mono 16 kHz float32. The upload is
+    streamed into ffmpeg's stdin from a feeder thread, so it is never
+    copied into memory as a whole.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    try:
+        proc = subprocess.Popen(
+            [ffmpeg, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-ac", "1", "-ar", str(TARGET_RATE), "pipe:1"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+    except OSError:
+        return None
+    feeder = threading.Thread(target=_feed, args=(source, proc.stdin), daemon=True)
+    timer = threading.Timer(FFMPEG_TIMEOUT, proc.kill)
+    feeder.start()
+    timer.start()
+    try:
+        pcm = proc.stdout.read()
+        proc.stdout.close()
+        returncode = proc.wait()
+    finally:
+        timer.cancel()
+        feeder.join()
+    if returncode != 0 or not pcm:
+        return None
+    return pcm16_to_float(pcm).reshape(-1, 1), TARGET_RATE
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    return samples.mean(axis=1) if samples.ndim == 2 else samples
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """Band-limit (windowed-sinc low-pass) then linearly interpolate to `dst_rate`."""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+
+    if src_rate > dst_rate:
+        cutoff = 0.5 * dst_rate / src_rate   # cycles per input sample
+        taps = np.arange(-16, 17)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        samples = np.convolve(samples, kernel / kernel.sum(), mode="same")
+
+    n_out = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(n_out) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def speech_bounds(samples: np.ndarray, rate: int) -> Optional[Tuple[int, int]]:
+    """
+    Sample range [start, end) covering detected speech plus padding,
+    or None when there is not enough speech in the clip.
+    """
+    frame_len = rate * FRAME_MS // 1000
+    voiced = np.flatnonzero(frame_rms(samples, frame_len) >= SPEECH_RMS)
+    if len(voiced) * FRAME_MS < MIN_SPEECH_MS:
+        return None
+    pad = rate * PAD_MS // 1000
+    start = max(0, voiced[0] * frame_len - pad)
+    end = min(len(samples), (voiced[-1] + 1) * frame_len + pad)
+    return start, end
+
+
+def _normalize(samples: np.ndarray, rate: int) -> Tuple[Optional[bytes], bool]:
+    mono = resample(downmix(samples), rate)
+    bounds = speech_bounds(mono, TARGET_RATE)
+    if bounds is None:
+        return None, False
+    start, end = bounds
+    return encode_wav(float_to_pcm16(mono[start:end]), TARGET_RATE), True
+
+
+def prepare(source: Union[bytes, BinaryIO]) -> PrepResult:
+    """
+    Normalize an uploaded clip (CPU-bound: call from a worker thread).
+    `source` may be bytes or a seekable binary file, which is read in place
+    and rewound afterwards.
+    """
+    started = time.perf_counter()
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    size = source.seek(0, os.SEEK_END)
+    source.seek(0)
+
+    decoder = "wav"
+    decoded = _decode_wav(source)
+    if decoded is None:
+        decoder = "ffmpeg"
+        source.seek(0)
+        decoded = _decode_ffmpeg(source)
+    source.seek(0)
+
+    if decoded is None:
+        result = PrepResult(None, True, size, size, 0.0, "passthrough")
+    else:
+        audio, has_speech = _normalize(*decoded)
+        result = PrepResult(audio, has_speech, size, len(audio or b""), 0.0, decoder)
+
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    stats.record(result)
+    return result
+
+
+def prepare_pcm(pcm: bytes, sample_rate: int) -> PrepResult:
+    """Normalize raw 16-bit mono PCM (streaming sessions)."""
+    started = time.perf_counter()
+    audio, has_speech = _normalize(pcm16_to_float(pcm), sample_rate)
+    result = PrepResult(audio, has_speech, len(pcm), len(audio or b""), 0.0, "pcm")
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    stats.record(result)
+    return result
@@ -1,61 +1,108 @@
 import os
 import sys
-from typing import List, Dict, Optional
+import re
+from typing import Any, AsyncIterator, List, Dict, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # Load local .env for development, but never during pytest runs.
 if "pytest" not in sys.modules:
     load_dotenv()
 
-API_KEY = os.getenv("OPENAI_API_KEY")
-USE_REAL_OPENAI = bool(API_KEY)
+from . import prompt, providers
+from .summaries import Summary
 
-client = OpenAI(api_key=API_KEY) if USE_REAL_OPENAI else None
 SYSTEM_PROMPT = os.getenv("ALFRED_SYSTEM_PROMPT", "You are Alfred, an AI assistant.")
 
 
-def format_history(history: List[Dict[str, str]], max_turns: int = 10) -> List[Dict[str, str]]:
+def build_messages(
+    user_input: str,
+    history: List[Dict[str, Any]],
+    business_context: Any = None,
+    summary: Optional[Summary] = None,
+    recalled: Optional[List[Dict[str, str]]] = None,
+) -> List[Dict[str, str]]:
     """
-    Convert our stored history into OpenAI chat messages.
-    Only takes the last `max_turns` user/assistant pairs.
+    Assemble the full prompt within the token budget: system prompt,
+    rolling summary, recalled earlier turns, recent history, business
+    context and the new user message. Turns already folded into the
+    summary are not repeated.
     """
-    messages: List[Dict[str, str]] = [{"role": "system", "content": SYSTEM_PROMPT}]
-    for entry in history[-max_turns:]:
-        messages.append({"role": "user", "content": entry["user"]})
-        messages.append({"role": "assistant", "content": entry["alfred"]})
-    return messages
+    if summary is not None:
+        history = [t for t in history if t.get("seq") is None or t["seq"] > summary.upto]
+    return prompt.build_prompt(
+        SYSTEM_PROMPT,
+        user_input,
+        history,
+        business_context=business_context,
+        summary=summary.text if summary else None,
+        recalled=recalled,
+    )
+
 
+def dev_reply(user_input: str, business_context: Any = None) -> str:
+    # Dev stub: everything wired but no cost
+    extra = f"\n\n(Business context loaded.)" if business_context else ""
+    return f'(DEV MODE) I received: "{user_input}". ' \
+           f"No real AI call is made yet.{extra}"
 
-def think(
+
+async def think(
     user_input: str,
-    history: List[Dict[str, str]],
-    business_context: Optional[str] = None,
+    history: List[Dict[str, Any]],
+    business_context: Any = None,
+    summary: Optional[Summary] = None,
+    recalled: Optional[List[Dict[str, str]]] = None,
 ) -> str:
-    if not USE_REAL_OPENAI:
-        # Dev stub: everything wired but no cost
-        extra = f"\n\n(Business context loaded.)" if business_context else ""
-        return f'(DEV MODE) I received: "{user_input}". ' \
-               f"No real AI call is made yet.{extra}"
-
-    messages = format_history(history)
-
-    if business_context:
-        messages.append({
-            "role": "system",
-            "content": (
-                "Here is up-to-date structured data about Emileo's businesses. "
-                "Use this as ground truth for staff, warehouses, and stores when relevant.\n\n"
-                f"{business_context}"
-            ),
-        })
-
-    messages.append({"role": "user", "content": user_input})
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        temperature=0.4,
-    )
+    if providers.get_client() is None:
+        return dev_reply(user_input, business_context)
+
+    messages = build_messages(user_input, history, business_context, summary, recalled)
+    return await providers.chat_completion(messages)
+
+
+async def think_stream(
+    user_input: str,
+    history: List[Dict[str, Any]],
+    business_context: Any = None,
+    summary: Optional[Summary] = None,
+    recalled: Optional[List[Dict[str, str]]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `think()`: yields reply text as it is generated.
+    Joining every yielded piece gives the same reply `think()` would return.
+    """
+    if providers.get_client() is None:
+        # Dev stub streams word by word so clients exercise the same path
+        for piece in re.findall(r"\S+\s*", dev_reply(user_input, business_context)):
+            yield piece
+        return
+
+    messages = build_messages(user_input, history, business_context, summary, recalled)
+    async for delta in providers.chat_completion_stream(messages):
+        yield delta
+
+
+SUMMARY_INSTRUCTIONS = (
+    "Fold the new conversation turns into the running summary of this user's "
+    "conversation with Alfred. Keep names, numbers, decisions and open requests; "
+    "drop small talk. Reply with the updated summary only, at most {max_tokens} tokens."
+)
+
+
+async def summarize_turns(previous: str, turns: List[Dict[str, str]], max_tokens: int) -> str:
+    """
+    Rolling-summary step: `previous` summary + `turns` -> new summary.
+    Dev mode keeps an extractive summary (one line per turn) so no cost.
+    """
+    if providers.get_client() is None:
+        lines = [previous] if previous else []
+        for turn in turns:
+            lines.append(f"- User: {turn['user'][:120]} | Alfred: {turn['alfred'][:120]}")
+        return prompt.truncate_tokens("\n".join(lines), max_tokens)
 
-    return response.choices[0].message.content
+    transcript = "\n".join(f"User: {t['user']}\nAlfred: {t['alfred']}" for t in turns)
+    text = await providers.chat_completion([
+        {"role": "system", "content": SUMMARY_INSTRUCTIONS.format(max_tokens=max_tokens)},
+        {"role": "user", "content": f"Running summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript}"},
+    ], temperature=0.0)
+    return prompt.truncate_tokens(text.strip(), max_tokens)
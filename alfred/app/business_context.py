@@ -1,27 +1,229 @@
-from typing import Any, Dict
+"""
+Business context for `think()`: staff headcount and payroll aggregates.
 
+`build_business_context` computes the aggregates with GROUP BY SQL (no ORM
+objects per employee). Chat turns read `context_snapshot`, which keeps the
+result in memory and is updated incrementally by the commands that write
+staff rows, so a turn costs a dict copy instead of a table scan.
 
-def build_business_context(db) -> Dict[str, Any]:
-    """
-    Build a small business context from the DB for use by `think()`.
-    This is intentionally minimal — expand as needed.
-    """
-    ctx = {
+Each write bumps a version counter. With a shared state backend the counter
+is shared, so other workers notice the change and recompute their
+snapshot on their next turn.
+"""
+import copy
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, func, select
+
+from . import models
+
+VERSION_KEY = "business_context:version"
+
+
+def _is_active(status: Optional[str]) -> bool:
+    return (status or "active").strip().lower() == "active"
+
+
+def _empty_context() -> Dict[str, Any]:
+    return {
         "staff_count": 0,
+        "active_count": 0,
+        "inactive_count": 0,
+        "daily_payroll": 0.0,
         "departments": [],
+        "by_department": {},
     }
 
+
+def _aggregate(db) -> Dict[str, Any]:
+    """One GROUP BY department query; raises if the DB is unavailable."""
+    Staff = models.Staff
+    dept = func.trim(func.coalesce(Staff.department, ""))
+    active = func.lower(func.trim(func.coalesce(Staff.status, "active"))) == "active"
+    rows = db.execute(
+        select(
+            dept,
+            func.count(),
+            func.sum(case((active, 1), else_=0)),
+            func.sum(case((active, func.coalesce(Staff.current_daily_rate, 0.0)), else_=0.0)),
+        ).group_by(dept)
+    ).all()
+
+    ctx = _empty_context()
+    for name, headcount, active_count, payroll in rows:
+        active_count = int(active_count or 0)
+        payroll = float(payroll or 0.0)
+        ctx["staff_count"] += headcount
+        ctx["active_count"] += active_count
+        ctx["daily_payroll"] += payroll
+        if name:
+            ctx["by_department"][name] = {
+                "headcount": headcount,
+                "active": active_count,
+                "daily_payroll": round(payroll, 2),
+            }
+    ctx["inactive_count"] = ctx["staff_count"] - ctx["active_count"]
+    ctx["daily_payroll"] = round(ctx["daily_payroll"], 2)
+    ctx["departments"] = sorted(ctx["by_department"])
+    return ctx
+
+
+def build_business_context(db) -> Dict[str, Any]:
+    """
+    Build the business context from the DB for use by `think()`:
+    headcount, active/inactive counts and daily payroll, overall and per
+    department. Returns a minimal context if the DB is unavailable.
+    """
     try:
-        # Attempt to read staff basic info if the models are available
-        from . import models
-
-        staff_q = db.query(models.Staff).all()
-        ctx["staff_count"] = len(staff_q)
-        # unique departments
-        depts = sorted({(s.department or "").strip() for s in staff_q if (s.department or "").strip()})
-        ctx["departments"] = depts
+        return _aggregate(db)
     except Exception:
         # If DB isn't reachable or models change, return minimal context
-        pass
+        return _empty_context()
 
-    return ctx
+
+class BusinessContextSnapshot:
+    """
+    Materialized `build_business_context` result, one per database URL.
+    Readers get a copy; writers apply deltas under a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self.version = 0
+        self.state = None  # shared StateBackend holding the version counter, if any
+        self.builds = 0
+        self.reads = 0
+        self.deltas = 0
+
+    def use_state(self, state) -> None:
+        """Share the version counter through a state backend (multi-worker)."""
+        with self._lock:
+            self.state = state
+            self._snapshots.clear()
+            self.version = self._shared_version()
+
+    @staticmethod
+    def _db_key(db) -> str:
+        return str(db.get_bind().url)
+
+    def _shared_version(self) -> Optional[int]:
+        if self.state is None:
+            return None
+        return int(self.state.get(VERSION_KEY) or 0)
+
+    def get(self, db) -> Dict[str, Any]:
+        """Current context for `db` (blocking: call from a worker thread)."""
+        return self.current(db)[1]
+
+    def current(self, db) -> Tuple[Optional[int], Dict[str, Any]]:
+        """
+        (version, context) for `db`. The version changes with every staff
+        write; it is None when the DB could not be read.
+        """
+        key = self._db_key(db)
+        shared = self._shared_version()
+        with self._lock:
+            self.reads += 1
+            if shared is not None and shared != self.version:
+                self._snapshots.clear()
+                self.version = shared
+            ctx = self._snapshots.get(key)
+            if ctx is not None:
+                return self.version, copy.deepcopy(ctx)
+            built_at = self.version
+
+        try:
+            ctx = _aggregate(db)
+        except Exception:
+            # Not cached: retried on the next turn
+            return None, _empty_context()
+        with self._lock:
+            self.builds += 1
+            if built_at == self.version:  # no write landed while we were reading
+                self._snapshots[key] = copy.deepcopy(ctx)
+        return built_at, ctx
+
+    def current_version(self) -> int:
+        """The version the next read would see (picks up other workers' writes)."""
+        shared = self._shared_version()
+        with self._lock:
+            if shared is not None and shared != self.version:
+                self._snapshots.clear()
+                self.version = shared
+            return self.version
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self.version = self._bump()
+
+    def _bump(self) -> int:
+        if self.state is not None:
+            return int(self.state.incr(VERSION_KEY))
+        return self.version + 1
+
+    def _apply(self, db, delta) -> None:
+        """Apply `delta(ctx)` to the snapshot for `db` and bump the version."""
+        key = self._db_key(db)
+        with self._lock:
+            new_version = self._bump()
+            ctx = self._snapshots.get(key)
+            in_step = new_version == self.version + 1
+            self.version = new_version
+            if not in_step:
+                # Another worker wrote in between: rebuild on next read
+                self._snapshots.clear()
+                return
+            if ctx is not None:
+                delta(ctx)
+                self.deltas += 1
+
+    def staff_added(self, db, department: Optional[str], status: Optional[str], rate: Optional[float]) -> None:
+        def delta(ctx):
+            active = _is_active(status)
+            ctx["staff_count"] += 1
+            ctx["active_count" if active else "inactive_count"] += 1
+            dept = (department or "").strip()
+            if dept:
+                entry = ctx["by_department"].setdefault(
+                    dept, {"headcount": 0, "active": 0, "daily_payroll": 0.0}
+                )
+                entry["headcount"] += 1
+                entry["active"] += int(active)
+                if active:
+                    entry["daily_payroll"] = round(entry["daily_payroll"] + (rate or 0.0), 2)
+                ctx["departments"] = sorted(ctx["by_department"])
+            if active:
+                ctx["daily_payroll"] = round(ctx["daily_payroll"] + (rate or 0.0), 2)
+
+        self._apply(db, delta)
+
+    def rate_changed(
+        self, db, department: Optional[str], status: Optional[str],
+        old_rate: Optional[float], new_rate: Optional[float],
+    ) -> None:
+        def delta(ctx):
+            if not _is_active(status):
+                return
+            change = (new_rate or 0.0) - (old_rate or 0.0)
+            ctx["daily_payroll"] = round(ctx["daily_payroll"] + change, 2)
+            entry = ctx["by_department"].get((department or "").strip())
+            if entry is not None:
+                entry["daily_payroll"] = round(entry["daily_payroll"] + change, 2)
+
+        self._apply(db, delta)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": self.version,
+                "databases": len(self._snapshots),
+                "reads": self.reads,
+                "builds": self.builds,
+                "deltas": self.deltas,
+            }
+
+
+context_snapshot = BusinessContextSnapshot()
@@ -1,6 +1,15 @@
-from typing import Tuple
+import io
+import re
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from . import models
+from .business_context import context_snapshot
+from .payroll import payroll_snapshot
+from .rate_history import changes_between, parse_bound, rates_as_of, record_change
+from .staff_import import ImportFormatError, import_stream
+from .staff_search import find_by_name, list_page, suggest_departments, suggest_names
 
 
 HELP_TEXT = """Command mode (type commands starting with '/'):
@@ -9,14 +18,42 @@ HELP_TEXT = """Command mode (type commands starting with '/'):
 /adjust_salary Full Name | NewDailyRate
 /list_staff
 /list_staff DepartmentName
+/list_staff [DepartmentName] page N   (or: after ID)
+/rate_as_of Full Name or Department | YYYY-MM-DD
+/rate_changes Full Name or Department | From | [To]   (dates YYYY-MM-DD, UTC)
+/payroll [DepartmentName]
+/payroll raise DepartmentName|all N%
+/import_staff   (then CSV or NDJSON rows on the following lines)
+/batch [continue]   (then one /add_staff or /adjust_salary per line)
+
+Several /add_staff or /adjust_salary lines in one message run as a batch
+in one transaction: if any line fails, nothing is saved. Start with
+"/batch continue" to save the lines that succeed instead.
 
 Examples:
   /add_staff Olive Grace Perez | Warehouse Supervisor | Warehouse | 585
   /adjust_salary Olive Grace Perez | 585
   /list_staff
   /list_staff Warehouse
+  /list_staff Warehouse page 2
+  /rate_as_of Olive Grace Perez | 2026-01-31
+  /rate_changes Warehouse | 2026-01-01 | 2026-03-31
+  /payroll Warehouse
+  /payroll raise Warehouse 10%
+  /import_staff
+  full_name,role,department,daily_rate
+  Olive Grace Perez,Warehouse Supervisor,Warehouse,585
+  /batch
+  /adjust_salary Olive Grace Perez | 600
+  /adjust_salary Juan dela Cruz | 650
 """
 
+MAX_BATCH_LINES = 200
+
+
+class CommandError(Exception):
+    """A command that cannot run as given; the message is the reply."""
+
 
 def _split_args(raw: str) -> list[str]:
     """
@@ -25,6 +62,189 @@ def _split_args(raw: str) -> list[str]:
     return [part.strip() for part in raw.split("|") if part.strip()]
 
 
+_RAISE_ARG = re.compile(r"^raise\s+(?P<dept>.+?)\s+(?:by\s+)?(?P<pct>[-+]?\d+(?:\.\d+)?)\s*%?$", re.IGNORECASE)
+_PAGE_ARG = re.compile(r"^(?P<dept>.*?)\s*\b(?P<kind>page|after)\s+(?P<n>\d+)$", re.IGNORECASE)
+
+
+RATE_LINES = 50
+
+
+def _rate_target(db: Session, name: str):
+    """(staff, None) for a person, (None, department) for a department, or (None, None)."""
+    staff = find_by_name(db, name)
+    if staff:
+        return staff, None
+    key = models.search_key(name)
+    if db.query(models.Staff.id).filter(models.Staff.department_key == key).first():
+        return None, name
+    return None, None
+
+
+def _not_found(db: Session, name: str) -> str:
+    suggestions = suggest_names(db, name) + suggest_departments(db, name)
+    return f"⚠️ No staff or department named '{name}'." + _did_you_mean(suggestions)
+
+
+def _money(amount) -> str:
+    return f"{amount:,.2f} PHP" if amount is not None else "n/a"
+
+
+def _spread(row) -> str:
+    return (f"mean {_money(row['mean_rate'])}, median {_money(row['p50'])}, "
+            f"p10-p90 {_money(row['p10'])} to {_money(row['p90'])}")
+
+
+def _did_you_mean(names: list[str]) -> str:
+    return f"\nDid you mean: {', '.join(names)}?" if names else ""
+
+
+def _add_staff(arg_str: str, db: Session, after_commit: List[Callable[[], None]]) -> Tuple[str, str]:
+    """
+    /add_staff Full Name | Role | Department | DailyRate
+
+    Like every write command, this validates before touching the session
+    and does not commit: the caller commits (one command or a whole batch)
+    and then runs `after_commit`, the snapshot updates. Returns (reply,
+    one-line summary for batch results).
+    """
+    args = _split_args(arg_str)
+    if len(args) < 4:
+        raise CommandError("Usage:\n/add_staff Full Name | Role | Department | DailyRate\n"
+                           "Example:\n/add_staff Olive Grace Perez | Warehouse Supervisor | Warehouse | 585")
+
+    full_name, role, department, rate_str = args[:4]
+    try:
+        rate = float(rate_str)
+    except ValueError:
+        raise CommandError(f"Invalid DailyRate value: '{rate_str}'. Please enter a number, e.g., 585")
+
+    staff = models.Staff(
+        full_name=full_name,
+        role=role,
+        department=department,
+        status="active",
+        current_daily_rate=rate,
+    )
+    db.add(staff)
+    db.flush()  # assigns staff.id
+    # Plain values: ORM attributes are expired by the commit and would each reload
+    staff_id, status = staff.id, staff.status
+    after_commit.append(lambda: context_snapshot.staff_added(db, department, status, rate))
+    after_commit.append(lambda: payroll_snapshot.staff_added(db, staff_id, rate, department, status))
+
+    return (f"✅ Added staff:\n"
+            f"- ID: {staff.id}\n"
+            f"- Name: {staff.full_name}\n"
+            f"- Role: {staff.role}\n"
+            f"- Department: {staff.department}\n"
+            f"- Daily rate: {staff.current_daily_rate:.2f} PHP"), \
+        f"Added {full_name} (ID {staff.id}, {department}, {_money(rate)})"
+
+
+def _adjust_salary(arg_str: str, db: Session, after_commit: List[Callable[[], None]]) -> Tuple[str, str]:
+    """/adjust_salary Full Name | NewDailyRate (see `_add_staff`)."""
+    args = _split_args(arg_str)
+    if len(args) < 2:
+        raise CommandError("Usage:\n/adjust_salary Full Name | NewDailyRate\n"
+                           "Example:\n/adjust_salary Olive Grace Perez | 585")
+
+    full_name, rate_str = args[:2]
+    try:
+        new_rate = float(rate_str)
+    except ValueError:
+        raise CommandError(f"Invalid NewDailyRate value: '{rate_str}'. Please enter a number, e.g., 585")
+
+    staff = find_by_name(db, full_name)
+
+    if not staff:
+        raise CommandError(f"⚠️ No staff found with name '{full_name}'." + _did_you_mean(suggest_names(db, full_name)))
+
+    old_rate = staff.current_daily_rate
+    record_change(db, staff, new_rate)
+    db.flush()
+    staff_id, department, status = staff.id, staff.department, staff.status  # see _add_staff
+    after_commit.append(lambda: context_snapshot.rate_changed(db, department, status, old_rate, new_rate))
+    after_commit.append(lambda: payroll_snapshot.rate_changed(db, staff_id, new_rate))
+
+    return (f"✅ Updated salary for {staff.full_name}:\n"
+            f"- Old daily rate: {old_rate if old_rate is not None else 'n/a'}\n"
+            f"- New daily rate: {new_rate:.2f} PHP"), \
+        f"{staff.full_name}: {_money(old_rate)} → {_money(new_rate)}"
+
+
+WRITE_COMMANDS = {"/add_staff": _add_staff, "/adjust_salary": _adjust_salary}
+
+
+def _is_batch(text: str) -> bool:
+    """Several lines that are all commands (an /import_staff body never starts with '/')."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    return len(lines) > 1 and all(line.lstrip().startswith("/") for line in lines)
+
+
+def _brief(error: str) -> str:
+    """An error reply on one line, without the usage example."""
+    return " ".join(error.split("\nExample:")[0].replace("⚠️", "").split())
+
+
+def _run_batch(text: str, db: Session) -> str:
+    """
+    Run write commands, one per line, in a single transaction (one commit
+    instead of one per line). All-or-nothing by default: any failed line
+    rolls the whole batch back. With "/batch continue" failed lines are
+    skipped and the rest are saved. Failed lines never leave changes behind
+    (commands validate before writing), so no savepoints are needed. A
+    database error always rolls back the whole batch.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    continue_on_error = False
+    if lines[0].split(None, 1)[0].lower() == "/batch":
+        mode = lines.pop(0).split(None, 1)[1:]
+        continue_on_error = bool(mode) and mode[0].strip().lower() in ("continue", "continue-on-error")
+    if not lines:
+        return "Usage:\n/batch [continue]\n/adjust_salary Full Name | NewDailyRate\n/add_staff ..."
+    if len(lines) > MAX_BATCH_LINES:
+        return f"⚠️ A batch can have at most {MAX_BATCH_LINES} commands (got {len(lines)}). Nothing was saved."
+
+    results: List[str] = []
+    after_commit: List[Callable[[], None]] = []
+    failed = 0
+    try:
+        for n, line in enumerate(lines, start=1):
+            where = f"on line {n}"
+            parts = line.split(None, 1)
+            cmd, arg_str = parts[0].lower(), (parts[1].strip() if len(parts) > 1 else "")
+            handler = WRITE_COMMANDS.get(cmd)
+            line_updates: List[Callable[[], None]] = []
+            try:
+                if handler is None:
+                    raise CommandError(f"{cmd} can't run in a batch (only {', '.join(WRITE_COMMANDS)})")
+                _, summary = handler(arg_str, db, line_updates)
+            except CommandError as e:
+                failed += 1
+                results.append(f"{n}. ❌ {_brief(str(e))}")
+                continue
+            after_commit.extend(line_updates)
+            results.append(f"{n}. ✅ {summary}")
+
+        if failed and not continue_on_error:
+            db.rollback()
+            header = (f"⚠️ Batch not saved: {failed} of {len(lines)} commands failed, so nothing was changed. "
+                      f"Fix them and resend, or start with /batch continue to save the rest.")
+            return "\n".join([header] + results)
+        where = "on commit"
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return f"⚠️ Batch not saved: database error {where} ({type(e).__name__}). Nothing was changed."
+    except BaseException:
+        db.rollback()  # anything else (a bug, a cancelled request) must not leave the batch pending
+        raise
+    for update in after_commit:
+        update()
+    header = f"✅ Batch saved: {len(lines) - failed} of {len(lines)} commands in one transaction"
+    return "\n".join([header + (f" ({failed} failed, skipped)." if failed else ".")] + results)
+
+
 def handle_command(raw: str, db: Session) -> Tuple[str, bool]:
     """
     Handle a command-line style message.
@@ -37,101 +257,170 @@ def handle_command(raw: str, db: Session) -> Tuple[str, bool]:
         return "", False
 
     # Extract command and rest
-    parts = text.split(" ", 1)
+    parts = text.split(None, 1)
     cmd = parts[0].lower()          # e.g. /add_staff
     arg_str = parts[1].strip() if len(parts) > 1 else ""
 
+    # /batch [continue], or several write commands on separate lines
+    if cmd == "/batch" or _is_batch(text):
+        return _run_batch(text, db), True
+
     # /help
     if cmd in ("/help", "/h", "/?"):
         return HELP_TEXT, True
 
-    # /add_staff Full Name | Role | Department | DailyRate
-    if cmd == "/add_staff":
-        args = _split_args(arg_str)
-        if len(args) < 4:
-            return ("Usage:\n/add_staff Full Name | Role | Department | DailyRate\n"
-                    "Example:\n/add_staff Olive Grace Perez | Warehouse Supervisor | Warehouse | 585"), True
+    # /add_staff and /adjust_salary: one transaction each
+    if cmd in WRITE_COMMANDS:
+        after_commit: List[Callable[[], None]] = []
+        try:
+            reply, _ = WRITE_COMMANDS[cmd](arg_str, db, after_commit)
+            db.commit()
+        except CommandError as e:
+            return str(e), True
+        except BaseException:
+            db.rollback()
+            raise
+        for update in after_commit:
+            update()
+        return reply, True
 
-        full_name, role, department, rate_str = args[:4]
+    # /list_staff [Department] [page N | after ID]
+    if cmd == "/list_staff":
+        dept, page, after = arg_str.strip(), None, 0
+        m = _PAGE_ARG.match(dept)
+        if m:
+            dept = m.group("dept")
+            if m.group("kind").lower() == "page":
+                page = max(1, int(m.group("n")))
+            else:
+                after = int(m.group("n"))
+        result = list_page(db, dept or None, after=after, page=page)
+        header = f"Staff in department '{dept}'" if dept else "All staff"
+
+        if not result.staff:
+            reply = f"{header}:\n(no records found)"
+            if dept and not result.total:
+                reply += _did_you_mean(suggest_departments(db, dept))
+            return reply, True
+
+        end = result.start + len(result.staff) - 1
+        lines = [f"{header} ({result.start}-{end} of {result.total}):"]
+        for s in result.staff:
+            lines.append(
+                f"- {s.full_name} | Role: {s.role}"
+                + (f" | Dept: {s.department}" if s.department else "")
+                + (f" | Daily rate: {s.current_daily_rate:.2f} PHP" if s.current_daily_rate else "")
+                + (f" | Status: {s.status}" if s.status else "")
+            )
+        if result.cursor is not None:
+            more = f"after {result.cursor}" if after else f"page {(page or 1) + 1}"
+            lines.append(f"More: /list_staff {dept + ' ' if dept else ''}{more}")
+        return "\n".join(lines), True
+
+    # /rate_as_of Full Name or Department | YYYY-MM-DD
+    if cmd == "/rate_as_of":
+        args = _split_args(arg_str)
+        if len(args) < 2:
+            return ("Usage:\n/rate_as_of Full Name or Department | YYYY-MM-DD\n"
+                    "Example:\n/rate_as_of Olive Grace Perez | 2026-01-31"), True
+        name, day = args[:2]
         try:
-            rate = float(rate_str)
+            at = parse_bound(day, end=True)
         except ValueError:
-            return f"Invalid DailyRate value: '{rate_str}'. Please enter a number, e.g., 585", True
-
-        staff = models.Staff(
-            full_name=full_name,
-            role=role,
-            department=department,
-            status="active",
-            current_daily_rate=rate,
-        )
-        db.add(staff)
-        db.commit()
-        db.refresh(staff)
+            return f"Invalid date: '{day}'. Use YYYY-MM-DD, e.g., 2026-01-31", True
+        staff, department = _rate_target(db, name)
+        if not staff and not department:
+            return _not_found(db, name), True
 
-        return (f"✅ Added staff:\n"
-                f"- ID: {staff.id}\n"
-                f"- Name: {staff.full_name}\n"
-                f"- Role: {staff.role}\n"
-                f"- Department: {staff.department}\n"
-                f"- Daily rate: {staff.current_daily_rate:.2f} PHP"), True
+        rates = rates_as_of(db, at, staff_id=staff.id if staff else None, department=department)
+        if staff:
+            if not rates:
+                return f"{staff.full_name} was not on staff yet on {day}.", True
+            return f"💰 {staff.full_name}'s daily rate on {day}: {_money(rates[0]['daily_rate'])}", True
+        lines = [f"Daily rates in department '{department}' on {day}:"]
+        lines += [f"- {r['full_name']}: {_money(r['daily_rate'])}" for r in rates[:RATE_LINES]]
+        if len(rates) > RATE_LINES:
+            lines.append(f"... and {len(rates) - RATE_LINES} more (GET /staff/rates for all)")
+        return "\n".join(lines if rates else lines + ["(no staff on that date)"]), True
 
-    # /adjust_salary Full Name | NewDailyRate
-    if cmd == "/adjust_salary":
+    # /rate_changes Full Name or Department | From | [To]
+    if cmd == "/rate_changes":
         args = _split_args(arg_str)
         if len(args) < 2:
-            return ("Usage:\n/adjust_salary Full Name | NewDailyRate\n"
-                    "Example:\n/adjust_salary Olive Grace Perez | 585"), True
-
-        full_name, rate_str = args[:2]
+            return ("Usage:\n/rate_changes Full Name or Department | From | [To]\n"
+                    "Example:\n/rate_changes Warehouse | 2026-01-01 | 2026-03-31"), True
+        name, first = args[:2]
+        last = args[2] if len(args) > 2 else None
         try:
-            new_rate = float(rate_str)
+            start = parse_bound(first)
+            end = parse_bound(last, end=True) if last else datetime.max
         except ValueError:
-            return f"Invalid NewDailyRate value: '{rate_str}'. Please enter a number, e.g., 585", True
+            return f"Invalid date in '{arg_str}'. Use YYYY-MM-DD, e.g., 2026-01-31", True
+        staff, department = _rate_target(db, name)
+        if not staff and not department:
+            return _not_found(db, name), True
 
-        staff = (
-            db.query(models.Staff)
-            .filter(models.Staff.full_name.ilike(full_name))
-            .first()
+        changes, truncated = changes_between(
+            db, start, end, staff_id=staff.id if staff else None, department=department, limit=RATE_LINES
         )
+        period = f"{first} to {last}" if last else f"since {first}"
+        lines = [f"Rate changes for {staff.full_name if staff else f'department {department!r}'}, {period}:"]
+        lines += [
+            f"- {c['effective_at'][:16].replace('T', ' ')} {c['full_name']}: "
+            f"{_money(c['previous_rate'])} → {_money(c['daily_rate'])}"
+            for c in changes
+        ]
+        if truncated:
+            lines.append(f"... showing the first {RATE_LINES} (GET /staff/rate_changes for all)")
+        return "\n".join(lines if changes else lines + ["(no changes)"]), True
 
-        if not staff:
-            return f"⚠️ No staff found with name '{full_name}'.", True
+    # /payroll [Department] | /payroll raise Department|all N%
+    if cmd == "/payroll":
+        view = payroll_snapshot.view(db)
+        m = _RAISE_ARG.match(arg_str)
+        if arg_str.lower().startswith("raise") and not m:
+            return ("Usage:\n/payroll raise DepartmentName|all N%\n"
+                    "Example:\n/payroll raise Warehouse 10%"), True
 
-        old_rate = staff.current_daily_rate
-        staff.current_daily_rate = new_rate
-        db.commit()
+        dept = m.group("dept") if m else arg_str
+        codes = None
+        if dept and dept.lower() != "all":
+            codes = view.matching(dept)
+            if not len(codes) or not view.overall(codes)["headcount"]:
+                return f"⚠️ No active staff in department '{dept}'." + _did_you_mean(suggest_departments(db, dept)), True
+        scope = f"department '{dept}'" if codes is not None else "all active staff"
 
-        return (f"✅ Updated salary for {staff.full_name}:\n"
-                f"- Old daily rate: {old_rate if old_rate is not None else 'n/a'}\n"
-                f"- New daily rate: {new_rate:.2f} PHP"), True
+        if m:
+            p = view.raise_projection(float(m.group("pct")), codes)
+            return (f"📈 Raising {scope} by {p['percent']:g}% ({p['staff_affected']} staff):\n"
+                    f"- Daily payroll: {_money(p['daily_payroll_before'])} → {_money(p['daily_payroll_after'])}\n"
+                    f"- Change: {p['daily_increase']:+,.2f} PHP per day"), True
 
-    # /list_staff [Department]
-    if cmd == "/list_staff":
-        if arg_str:
-            dept = arg_str.strip()
-            staff_list = (
-                db.query(models.Staff)
-                .filter(models.Staff.department.ilike(dept))
-                .all()
-            )
-            header = f"Staff in department '{dept}':"
+        total = view.overall(codes)
+        lines = [f"💼 Daily payroll for {scope}: {_money(total['daily_payroll'])} ({total['headcount']} staff)",
+                 f"- Rates: {_spread(total)}"]
+        if codes is None:
+            lines.append("By department:")
+            lines += [
+                f"- {row['department'] or '(no department)'}: {row['headcount']} staff, "
+                f"{_money(row['daily_payroll'])}/day; {_spread(row)}"
+                for row in view.by_department()
+            ]
         else:
-            staff_list = db.query(models.Staff).all()
-            header = "All staff:"
-
-        if not staff_list:
-            return f"{header}\n(no records found)", True
-
-        lines = [header]
-        for s in staff_list:
-            lines.append(
-                f"- {s.full_name} | Role: {s.role}"
-                + (f" | Dept: {s.department}" if s.department else "")
-                + (f" | Daily rate: {s.current_daily_rate:.2f} PHP" if s.current_daily_rate else "")
-                + (f" | Status: {s.status}" if s.status else "")
-            )
+            lines.append(f"- Quartiles: {_money(total['p25'])} / {_money(total['p50'])} / {_money(total['p75'])}")
         return "\n".join(lines), True
 
+    # /import_staff, followed by CSV (with header) or NDJSON rows on the next lines
+    if cmd == "/import_staff":
+        if not arg_str:
+            return ("Usage:\n/import_staff\nfull_name,role,department,daily_rate\n"
+                    "Olive Grace Perez,Warehouse Supervisor,Warehouse,585\n"
+                    "For large files, upload to POST /staff/import instead."), True
+        try:
+            report = import_stream(db, io.StringIO(arg_str))
+        except ImportFormatError as e:
+            return f"⚠️ {e}", True
+        return ("✅ " if report.inserted and not report.aborted else "⚠️ ") + report.summary(), True
+
     # Unknown command
     return f"Unknown command: {cmd}\nType /help for list of commands.", True
@@ -0,0 +1,85 @@
+"""
+Bounded chat history windows on a pluggable state backend.
+
+Each user's recent window (the turns /chat actually uses) is a bounded list
+in the state backend under `history:<user_id>`. With the default in-process
+backend that is a ring buffer per user with LRU eviction beyond
+`max_users`; with a shared backend (SQLite/WAL or Redis) every worker sees
+the same window, and idle windows expire after `ttl`. A missing window is a
+miss: the caller reloads it from the conversation store. Everything older
+lives only in the store.
+"""
+import json
+from typing import Any, Dict, List, Optional
+
+from .state import InProcessState, StateBackend
+
+Turn = Dict[str, str]
+
+
+class HistoryCache:
+    def __init__(
+        self,
+        max_users: int = 1000,
+        turns: int = 20,
+        backend: Optional[StateBackend] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.backend = backend or InProcessState(max_keys=max_users)
+        self.turns = turns
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def blocking(self) -> bool:
+        return self.backend.blocking
+
+    @staticmethod
+    def _key(user_id: str) -> str:
+        return f"history:{user_id}"
+
+    def get(self, user_id: str) -> Optional[List[Turn]]:
+        """Snapshot of the user's recent turns (oldest first), or None on a miss."""
+        turns = self.backend.items(self._key(user_id))
+        if turns is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [json.loads(turn) for turn in turns]
+
+    def put(self, user_id: str, turns: List[Turn]) -> List[Turn]:
+        """Install a user's history (e.g. reloaded from the store)."""
+        window = turns[-self.turns:]
+        self.backend.set_items(
+            self._key(user_id),
+            [json.dumps(turn, ensure_ascii=False) for turn in window],
+            self.turns,
+            self.ttl,
+        )
+        return list(window)
+
+    def append(self, user_id: str, turn: Turn) -> Optional[List[Turn]]:
+        """
+        Add a turn to a resident user and return the updated window.
+        Returns None if the user is not resident (reload from the store).
+        """
+        key = self._key(user_id)
+        if not self.backend.append(key, json.dumps(turn, ensure_ascii=False), self.turns, self.ttl):
+            return None
+        turns = self.backend.items(key)
+        return None if turns is None else [json.loads(t) for t in turns]
+
+    def stats(self) -> Dict[str, Any]:
+        backend = self.backend.stats()
+        return {
+            "backend": backend["backend"],
+            "users": backend.get("keys"),
+            "max_users": backend.get("max_keys"),
+            "turns_per_user": self.turns,
+            "turns": backend.get("items"),
+            "approx_bytes": backend.get("approx_bytes"),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": backend.get("evictions"),
+        }
@@ -0,0 +1,161 @@
+"""
+Deterministic intent matcher for natural-language staff commands.
+
+"Add Olive Perez as warehouse supervisor at 585" means the same as
+`/add_staff Olive Perez | Warehouse Supervisor | Warehouse | 585`, so
+common phrasings of add staff, adjust salary and list staff are
+recognized locally with precompiled patterns. They then run through
+`handle_command` exactly like their slash form, with no model call.
+
+Every pattern carries a confidence. A match below `MIN_CONFIDENCE`
+(`ALFRED_INTENT_MIN_CONFIDENCE`, default 0.8) is discarded, and the
+message goes to the model as before. Examples are an add without a
+department that can't be inferred, or lowercase names from a sloppy
+transcript.
+
+Names must be capitalized words; keywords are case-insensitive.
+
+Writes (add staff, adjust salary) need an unambiguous instruction: a
+question ("...'s salary is 600?") or several clauses ("..., and ...") is
+never turned into a write, and roles and departments are words only, so
+a second clause or a rate cannot be absorbed into them. The same matcher
+reads /ws/voice transcripts, where a mis-heard phrase must not change
+payroll.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+MIN_CONFIDENCE = float(os.getenv("ALFRED_INTENT_MIN_CONFIDENCE", "0.8"))
+
+NAME = r"(?P<name>(?-i:[A-Z][\w'’.-]*(?:\s+(?:de|del|dela|la|van|von|(?-i:[A-Z][\w'’.-]*))){0,4}))"
+RATE = r"(?:₱|php\s*|p\s*)?(?P<rate>\d[\d,]*(?:\.\d+)?)(?:\s*(?:php|pesos?))?(?:\s*(?:per|a|/)\s*day|\s+daily)?"
+# A role or department word: letters (plus & / -), never a number or the at/and keywords
+_WORD = r"(?!(?:at|and)\b)[^\W\d_](?:[^\W\d_]|[&/-])*"
+ROLE = rf"(?P<role>{_WORD}(?:\s+{_WORD})*?)"
+DEPT = rf"(?:the\s+)?(?P<department>{_WORD}(?:\s+(?:&\s+)?{_WORD})*?)(?:\s+(?:department|dept|team))?"
+STAFF = r"(?:staff|employees?|workers?|people|personnel|team(?:\s+members)?)"
+PAY = r"(?:daily\s+)?(?:rate|salary|pay|wage)"
+END = r"\s*[.!?]?\s*$"
+
+
+@dataclass
+class Intent:
+    name: str                       # add_staff | adjust_salary | list_staff
+    args: Dict[str, Any] = field(default_factory=dict)
+    confidence: float = 1.0
+
+    def command(self) -> str:
+        """The equivalent slash command for `commands.handle_command`."""
+        a = self.args
+        if self.name == "add_staff":
+            return f"/add_staff {a['name']} | {a['role']} | {a['department']} | {a['rate']:g}"
+        if self.name == "adjust_salary":
+            return f"/adjust_salary {a['name']} | {a['rate']:g}"
+        return f"/list_staff {a.get('department') or ''}".rstrip()
+
+
+def _compile(*parts: str) -> Pattern:
+    return re.compile(
+        r"^\s*(?:please\s+|can you\s+|could you\s+|alfred,?\s+)*(?P<body>" + "".join(parts) + ")" + END, re.I
+    )
+
+
+WRITE_INTENTS = ("add_staff", "adjust_salary")
+# A second clause: "and", or a comma that is not a thousands separator
+_MULTI_CLAUSE = re.compile(r"\band\b|,(?!\d{3}\b)", re.I)
+
+
+ADD = r"(?:add|hire|onboard|register|enroll)\s+(?:new\s+staff\s+|staff\s+member\s+)?"
+ADJUST = r"(?:set|change|update|adjust|raise|increase|lower|reduce|bump|make)\s+"
+
+# (intent, pattern, confidence); the first match wins, so specific patterns come first
+PATTERNS: List[Tuple[str, Pattern, float]] = [
+    ("add_staff", _compile(ADD, NAME, r"\s+as\s+(?:an?\s+|the\s+|our\s+)?", ROLE,
+                           r"\s+(?:in|to|for|at)\s+", DEPT, r"\s+(?:at|with|for|on)\s+(?:a\s+)?(?:", PAY, r"\s+(?:of\s+)?)?", RATE), 0.95),
+    ("add_staff", _compile(ADD, NAME, r"\s+to\s+", DEPT, r"\s+as\s+(?:an?\s+|the\s+)?", ROLE,
+                           r"\s+(?:at|with|for|on)\s+(?:a\s+)?(?:", PAY, r"\s+(?:of\s+)?)?", RATE), 0.95),
+    ("add_staff", _compile(ADD, NAME, r"\s+as\s+(?:an?\s+|the\s+|our\s+)?", ROLE,
+                           r"\s+(?:at|with|for|on)\s+(?:a\s+)?(?:", PAY, r"\s+(?:of\s+)?)?", RATE), 0.9),
+    ("adjust_salary", _compile(ADJUST, NAME, r"(?:'s|’s)\s+", PAY, r"\s+to\s+", RATE), 0.95),
+    ("adjust_salary", _compile(ADJUST, r"(?:the\s+)?", PAY, r"\s+(?:of|for)\s+", NAME, r"\s+to\s+", RATE), 0.95),
+    # give/pay needs the pay keyword: "pay Olive Perez 500" may be a one-off payment
+    ("adjust_salary", _compile(r"(?:give|pay)\s+", NAME, r"\s+(?:a\s+)?(?:", PAY, r"\s+of|raise\s+to)\s+", RATE), 0.85),
+    ("adjust_salary", _compile(NAME, r"(?:'s|’s)\s+", PAY, r"\s+(?:is\s+now|should\s+be|is)\s+", RATE), 0.85),
+    ("list_staff", _compile(r"(?:list|show|display|give\s+me|who\s+are)\s+(?:me\s+)?(?:all\s+)?(?:the\s+|our\s+)?",
+                            STAFF, r"\s+(?:in|from|of|at)\s+", DEPT), 0.95),
+    ("list_staff", _compile(r"who\s+(?:works|is\s+working)\s+(?:in|at)\s+", DEPT), 0.9),
+    ("list_staff", _compile(r"(?:list|show|display|give\s+me|who\s+are)\s+(?:me\s+)?(?:all\s+)?(?:the\s+|our\s+)?(?:",
+                            STAFF, r"|everyone)(?:\s+list)?"), 0.95),
+]
+
+
+def _rate(raw: str) -> Optional[float]:
+    try:
+        return float(raw.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def _title(text: str) -> str:
+    return " ".join(w if w.isupper() else w[:1].upper() + w[1:] for w in text.split())
+
+
+def _known(department: str, departments: Iterable[str]) -> Optional[str]:
+    """`department` spelled as stored, if it is a known one."""
+    wanted = department.strip().lower()
+    return next((d for d in departments if d.strip().lower() == wanted), None)
+
+
+def _build(name: str, groups: Dict[str, Optional[str]], confidence: float,
+           departments: Iterable[str]) -> Optional[Intent]:
+    args: Dict[str, Any] = {}
+    if groups.get("name"):
+        args["name"] = " ".join(groups["name"].split())
+    if groups.get("rate") is not None:
+        args["rate"] = _rate(groups["rate"])
+        if args["rate"] is None:
+            return None
+
+    department = (groups.get("department") or "").strip()
+    if department:
+        known = _known(department, departments)
+        if known is None and name == "list_staff":
+            # "show staff in the warehouse" vs an unknown department: still a list, less sure
+            confidence -= 0.1
+        args["department"] = known or _title(department)
+
+    if name == "add_staff":
+        role = " ".join(groups["role"].split())
+        args["role"] = _title(role)
+        if not department:
+            # "warehouse supervisor": take the department from the role when it names one
+            known = next((d for d in departments if role.lower().startswith(d.strip().lower() + " ")), None)
+            if known is None:
+                return Intent(name, args, confidence=0.5)
+            args["department"] = known
+            confidence -= 0.05
+    return Intent(name, args, confidence=round(confidence, 2))
+
+
+def match(text: str, departments: Iterable[str] = (), min_confidence: Optional[float] = None) -> Optional[Intent]:
+    """
+    The staff command `text` asks for, or None when no pattern matches with
+    at least `min_confidence` (default MIN_CONFIDENCE). `departments` are
+    the known department names, used to spell and infer departments.
+    """
+    if text.lstrip().startswith("/") or len(text) > 200:
+        return None
+    threshold = MIN_CONFIDENCE if min_confidence is None else min_confidence
+    departments = list(departments)
+    for name, pattern, confidence in PATTERNS:
+        m = pattern.match(text)
+        if m is None:
+            continue
+        if name in WRITE_INTENTS and ("?" in text or _MULTI_CLAUSE.search(m.group("body"))):
+            return None  # a question or several clauses: let the model read it
+        intent = _build(name, m.groupdict(), confidence, departments)
+        if intent is not None:
+            return intent if intent.confidence >= threshold else None
+    return None
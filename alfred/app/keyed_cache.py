@@ -0,0 +1,149 @@
+"""
+String cache shared by the reply and transcript caches.
+
+Entries live in an in-memory LRU with a TTL (`max_entries`, `ttl`), and
+optionally in a shared state backend under `<prefix>:<key>` so every
+worker benefits. A local miss falls through to the shared backend; a
+shared hit is copied into the LRU. Errors from the shared backend are
+logged and treated as misses, so a cache outage never fails a request.
+
+`get_or_compute` adds single-flight: concurrent callers for one key share
+a single computation. The first caller starts it as a task and later
+callers await the same task. The task is shielded, so a caller that
+disconnects does not cancel it for the others, and its result still lands
+in the cache.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .state import StateBackend
+
+
+class KeyedCache:
+    def __init__(
+        self, prefix: str, max_entries: int, ttl: float, shared: Optional[StateBackend] = None,
+    ):
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get_local(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put_local(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _shared_call(self, fn, *args):
+        try:
+            if not self.shared.blocking:
+                return fn(*args)
+            return await run_in_threadpool(fn, *args)
+        except Exception as e:
+            print(f"Shared {self.prefix} cache error: {e}")
+            return None
+
+    async def _get_shared(self, key: str) -> Optional[str]:
+        if self.shared is None:
+            return None
+        value = await self._shared_call(self.shared.get, f"{self.prefix}:{key}")
+        if value is not None:
+            self.shared_hits += 1
+            self.put_local(key, value)
+        return value
+
+    async def fetch(self, key: str) -> Optional[str]:
+        """The cached value from the LRU or the shared backend; counts a miss if neither has it."""
+        value = self.get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        value = await self._get_shared(key)
+        if value is None:
+            self.misses += 1
+        return value
+
+    async def store(self, key: str, value: str) -> None:
+        self.put_local(key, value)
+        if self.shared is not None:
+            await self._shared_call(self.shared.set, f"{self.prefix}:{key}", value, self.ttl)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> Tuple[str, str]:
+        """
+        Cached value for `key`, or the result of `compute()`.
+        Returns (value, status) with status "hit", "coalesced" or "miss".
+        Failed calls are not cached; every waiter sees the error.
+        """
+        value = self.get_local(key)
+        if value is not None:
+            self.hits += 1
+            return value, "hit"
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            value, _ = await asyncio.shield(task)
+            return value, "coalesced"
+
+        # Registered before the first await, so a caller arriving during the
+        # shared lookup joins this task instead of computing again
+        task = asyncio.ensure_future(self._lookup_or_compute(key, compute))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finish(key, t))
+        return await asyncio.shield(task)
+
+    async def _lookup_or_compute(self, key: str, compute: Callable[[], Awaitable[str]]) -> Tuple[str, str]:
+        value = await self._get_shared(key)
+        if value is not None:
+            return value, "hit"
+        self.misses += 1
+        value = await compute()
+        if self.shared is not None:
+            await self._shared_call(self.shared.set, f"{self.prefix}:{key}", value, self.ttl)
+        return value, "miss"
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.put_local(key, task.result()[0])
+
+    def stats(self) -> Dict[str, Any]:
+        found = self.hits + self.shared_hits + self.coalesced
+        lookups = found + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "hit_rate": round(found / lookups, 3) if lookups else 0.0,
+        }
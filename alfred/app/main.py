@@ -1,13 +1,18 @@
-from typing import List, Dict
-from fastapi import FastAPI, Body, Depends, UploadFile, File
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional, Tuple
+from fastapi import FastAPI, Body, Depends, UploadFile, File, Form, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse, JSONResponse
+from fastapi.responses import StreamingResponse, FileResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
+from datetime import datetime
+import anyio
+import asyncio
+import base64
 import io
+import json
 import os
 import sys
 from pathlib import Path
-from openai import OpenAI
 
 # Load local .env for development, but never during pytest runs.
 if "pytest" not in sys.modules:
@@ -18,43 +23,67 @@ if "pytest" not in sys.modules:
     except Exception:
         pass
 
-from .brain import think
-from .memory import load_memory, save_memory
-from .schemas import ChatRequest, ChatResponse, ChatMessage, TTSRequest
+from . import providers
+from . import (
+    audio_prep, intents, prompt, rate_history, response_cache, retrieval, speculative_tts, staff_export, staff_import,
+    staff_search, state, transcript_cache, tts_cache,
+)
+from .audio import encode_wav
+from .brain import SYSTEM_PROMPT, summarize_turns, think, think_stream
+from .business_context import context_snapshot
+from .payroll import payroll_snapshot
+from .memory import ConversationStore
+from .summaries import RollingSummaries
+from .schemas import ChatRequest, ChatResponse, ChatMessage, HistoryPage, TTSRequest
 from .commands import handle_command
+from .history_cache import HistoryCache
 from .models import Base
+from .uploads import UploadLimitMiddleware, UploadTooLarge
+from .voice_session import UtteranceDetector, VoiceSession
 from sqlalchemy.orm import Session
 
 # --- Simple DB session setup for command mode ---
 from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
 from sqlalchemy.orm import sessionmaker
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./alfred.db")
 engine_kwargs = {}
 if DATABASE_URL.startswith("sqlite"):
     engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+        # One shared connection, so worker threads see the same in-memory DB
+        engine_kwargs["poolclass"] = StaticPool
 
 engine = create_engine(DATABASE_URL, **engine_kwargs)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-# Initialize OpenAI client for TTS (graceful fallback for dev mode)
-api_key = os.getenv("OPENAI_API_KEY")
-openai_client = None
-if api_key:
-    try:
-        openai_client = OpenAI(api_key=api_key)
-    except Exception as e:
-        print(f"Warning: Could not initialize OpenAI client: {e}")
-else:
+# Shared async OpenAI client for chat/STT/TTS (graceful fallback for dev mode)
+if not providers.get_client():
     print("Note: OPENAI_API_KEY not set. Running in dev mode. TTS will use browser speechSynthesis.")
 
+# Legacy JSON history to import once at startup (empty: no import). The
+# data_migrations marker keeps it from being imported twice.
+LEGACY_MEMORY_FILE = os.getenv("ALFRED_LEGACY_MEMORY_FILE", "./alfred_memory.json")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     try:
         Base.metadata.create_all(bind=engine)
+        staff_search.ensure_schema(engine)
     except Exception as e:
         print(f"Warning: could not create DB tables automatically: {e}")
+    if LEGACY_MEMORY_FILE:
+        try:
+            migrated = conversations.migrate_json_memory(Path(LEGACY_MEMORY_FILE))
+            if migrated:
+                print(f"Imported {migrated} turns from {LEGACY_MEMORY_FILE} into the conversation store.")
+        except Exception as e:
+            print(f"Warning: could not migrate {LEGACY_MEMORY_FILE}: {e}")
+    sweeper = asyncio.create_task(prefetch.sweep_forever())
     yield
+    sweeper.cancel()
+    await providers.aclose()
 
 
 app = FastAPI(title="Alfred Core API", lifespan=lifespan)
@@ -68,10 +97,102 @@ def get_db():
     finally:
         db.close()
 
-# In-memory cache per user_id (still persisted to JSON for now)
-_histories: Dict[str, List[Dict[str, str]]] = {
-    "default": load_memory()
-}
+
+def get_session_factory() -> Callable[[], Session]:
+    """Session source for responses that outlive the handler (streamed exports open their own session)."""
+    return SessionLocal
+
+# On-disk cache of synthesized audio (None when ALFRED_TTS_CACHE=false)
+audio_cache = tts_cache.cache_from_env()
+
+# Background pre-synthesis of /chat replies for clients that send speak=true
+prefetch = speculative_tts.SpeculativeTTS(
+    max_jobs=int(os.getenv("ALFRED_TTS_PREFETCH_MAX", "32")),
+    ttl=float(os.getenv("ALFRED_TTS_PREFETCH_TTL", "60")),
+)
+
+# Per-user windows and caches live in a pluggable backend (ALFRED_STATE_BACKEND:
+# memory | sqlite | redis) so several workers share one view of a conversation
+shared_state = state.state_from_env(max_keys=int(os.getenv("ALFRED_HISTORY_MAX_USERS", "1000")))
+SHARED_STATE = not isinstance(shared_state, state.InProcessState)
+if SHARED_STATE:
+    context_snapshot.use_state(shared_state)
+
+# Every turn is appended to the conversation_turns table; the recent
+# window per user_id is kept in the state backend and reloaded on a miss
+HISTORY_TURNS = 20
+conversations = ConversationStore(SessionLocal)
+_histories = HistoryCache(
+    turns=HISTORY_TURNS,
+    backend=shared_state,
+    ttl=float(os.getenv("ALFRED_STATE_TTL", "86400")) if SHARED_STATE else None,
+)
+
+
+# Older turns are folded into a per-user rolling summary in the background
+summaries = RollingSummaries(
+    shared_state if SHARED_STATE else state.InProcessState(
+        max_keys=int(os.getenv("ALFRED_HISTORY_MAX_USERS", "1000"))
+    ),
+    conversations,
+    summarize=summarize_turns,
+    keep_recent=prompt.MAX_HISTORY_TURNS,
+    batch=int(os.getenv("ALFRED_SUMMARY_BATCH", "5")),
+    max_tokens=int(os.getenv("ALFRED_SUMMARY_MAX_TOKENS", "300")),
+)
+
+
+# Relevant turns from beyond the prompt window, found with a local hashed-
+# embedding index (None when ALFRED_RETRIEVAL=false)
+retrieval_index = retrieval.index_from_env(DATABASE_URL)
+RECALL_TURNS = int(os.getenv("ALFRED_RETRIEVAL_K", "3"))
+
+
+# Replies to repeated questions, keyed on the business-context version so
+# staff writes invalidate them (None unless ALFRED_RESPONSE_CACHE=true)
+reply_cache = response_cache.cache_from_env(shared=shared_state if SHARED_STATE else None)
+
+
+def _reply_key(message: str, context_version: Optional[int]) -> Optional[str]:
+    """Response cache key, or None when the reply should not be cached."""
+    if reply_cache is None or context_version is None:
+        return None
+    return response_cache.make_key(message, context_version, SYSTEM_PROMPT, providers.CHAT_MODEL)
+
+
+# Natural-language staff commands ("add Olive Perez as cashier in Store at
+# 450") are matched locally and run like their slash form, with no model call
+INTENTS = os.getenv("ALFRED_INTENTS", "true").lower() == "true"
+
+
+async def _intent_reply(message: str, business_context: Dict[str, Any], db: Session) -> Optional[str]:
+    """Reply for a recognized staff command, or None to ask the model."""
+    if not INTENTS:
+        return None
+    intent = intents.match(message, departments=business_context.get("departments") or ())
+    if intent is None:
+        return None
+    reply, _ = await run_in_threadpool(handle_command, intent.command(), db)
+    return reply
+
+
+async def _state_call(fn, *args):
+    """Call a state-backend method, off the event loop when it does I/O."""
+    if _histories.blocking:
+        return await run_in_threadpool(fn, *args)
+    return fn(*args)
+
+# Reject oversized audio uploads with 413 while they are still being read
+MAX_UPLOAD_BYTES = int(float(os.getenv("ALFRED_MAX_UPLOAD_MB", "25")) * 1024 * 1024)
+MAX_IMPORT_BYTES = int(float(os.getenv("ALFRED_MAX_IMPORT_MB", "50")) * 1024 * 1024)
+UPLOAD_LIMITS = {"/stt": MAX_UPLOAD_BYTES, "/voice": MAX_UPLOAD_BYTES, "/staff/import": MAX_IMPORT_BYTES}
+app.add_middleware(UploadLimitMiddleware, limits=UPLOAD_LIMITS)
+
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(request: Request, exc: UploadTooLarge):
+    return JSONResponse(status_code=413, content={"error": exc.detail})
+
 
 # CORS so web / mobile clients can talk to Alfred
 app.add_middleware(
@@ -95,8 +216,75 @@ def health():
     return {"status": "ok", "alfred": "online"}
 
 
+@app.get("/stats")
+def stats():
+    """Cache counters for capacity checks."""
+    return {
+        "tts_cache": audio_cache.stats() if audio_cache else None,
+        "tts_prefetch": prefetch.stats(),
+        "audio_prep": audio_prep.stats.snapshot() if AUDIO_PREP else None,
+        "stt_cache": stt_cache.stats() if stt_cache else None,
+        "history": _histories.stats(),
+        "business_context": context_snapshot.stats(),
+        "payroll": payroll_snapshot.stats(),
+        "summaries": summaries.stats(),
+        "retrieval": retrieval_index.stats() if retrieval_index else None,
+        "response_cache": reply_cache.stats() if reply_cache else None,
+    }
+
+
+MOCK_TRANSCRIPT = "Mock transcript (MOCK_MODE=true)."
+
+# Decode / downmix / resample / trim uploads before Whisper
+AUDIO_PREP = os.getenv("ALFRED_AUDIO_PREP", "true").lower() == "true"
+
+# Transcripts keyed by audio fingerprint (None when ALFRED_STT_CACHE=false)
+stt_cache = transcript_cache.cache_from_env(shared=shared_state if SHARED_STATE else None)
+
+
+def _mock_mode() -> bool:
+    return os.getenv("MOCK_MODE", "false").lower() == "true"
+
+
+async def _transcribe(audio: UploadFile) -> Tuple[str, Optional[audio_prep.PrepResult], Optional[str]]:
+    """
+    Transcribe one uploaded clip (MOCK_MODE returns a canned transcript).
+    Returns (text, normalization report, transcript cache status); clips
+    without speech return "" without an upstream call.
+    """
+    if _mock_mode():
+        return MOCK_TRANSCRIPT, None, None
+
+    # The upload is already spooled (memory, then disk) by the multipart
+    # parser; hand that file object on instead of copying it into bytes.
+    payload: Any = audio.file
+    filename = audio.filename or "audio.m4a"
+    content_type = audio.content_type or "audio/m4a"
+
+    prep = None
+    if AUDIO_PREP:
+        prep = await run_in_threadpool(audio_prep.prepare, audio.file)
+        if not prep.has_speech:
+            return "", prep, None
+        if prep.audio is not None:
+            payload, filename, content_type = prep.audio, "audio.wav", "audio/wav"
+
+    async def upstream() -> str:
+        if payload is audio.file:
+            audio.file.seek(0)
+        # Call OpenAI Whisper API (async, does not block the event loop)
+        return await providers.transcribe(filename, payload, content_type)
+
+    if stt_cache is None:
+        return await upstream(), prep, None
+
+    key = await run_in_threadpool(transcript_cache.fingerprint, payload, providers.STT_MODEL)
+    text, status = await stt_cache.get_or_transcribe(key, upstream)
+    return text, prep, status
+
+
 @app.post("/stt")
-async def stt(audio: UploadFile = File(...)):
+async def stt(response: Response, audio: UploadFile = File(...)):
     """
     Speech-to-Text using OpenAI Whisper API.
     Accepts an audio file and returns the transcribed text.
@@ -108,28 +296,19 @@ async def stt(audio: UploadFile = File(...)):
                 content={"error": "audio file is required"}
             )
 
-        # Check for MOCK_MODE
-        mock_mode = os.getenv("MOCK_MODE", "false").lower() == "true"
-        if mock_mode:
-            return {"text": "Mock transcript (MOCK_MODE=true)."}
-
-        # Ensure we have OpenAI client
-        if not openai_client:
+        # Ensure we have OpenAI client (MOCK_MODE does not need one)
+        if not _mock_mode() and not providers.get_client():
             return JSONResponse(
                 status_code=500,
                 content={"error": "OpenAI API key not configured"}
             )
 
-        # Read the audio file
-        audio_bytes = await audio.read()
-
-        # Call OpenAI Whisper API
-        response = openai_client.audio.transcriptions.create(
-            model="whisper-1",
-            file=(audio.filename or "audio.m4a", audio_bytes, audio.content_type or "audio/m4a"),
-        )
-
-        return {"text": response.text or ""}
+        text, prep, cache_status = await _transcribe(audio)
+        if cache_status:
+            response.headers["X-STT-Cache"] = cache_status
+        if prep is None:
+            return {"text": text}
+        return {"text": text, "no_speech": not prep.has_speech, "audio_prep": prep.report()}
 
     except Exception as e:
         print(f"STT error: {e}")
@@ -141,48 +320,244 @@ async def stt(audio: UploadFile = File(...)):
         )
 
 
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest, db: Session = Depends(get_db)):
+async def _history(user_id: str) -> List[Dict[str, Any]]:
+    """Recent turns for `user_id` (a snapshot), reloaded from the store on a miss."""
+    history = await _state_call(_histories.get, user_id)
+    if history is None:
+        try:
+            loaded = await run_in_threadpool(conversations.recent, user_id, HISTORY_TURNS)
+        except Exception as e:
+            print(f"Warning: could not load history for {user_id!r}: {e}")
+            loaded = []
+        # Another request may have loaded this user while we were reading
+        history = await _state_call(_histories.get, user_id)
+        if history is None:
+            history = await _state_call(_histories.put, user_id, loaded)
+    return history
+
+
+async def _record_turn(user_id: str, user_message: str, reply: str) -> List[ChatMessage]:
+    """
+    Persist a completed turn and append it to the user's cached window.
+    Returns just the new turn (with its seq); clients sync the rest via /history.
+    """
+    seq = None
     try:
-        user_id = req.user_id or "default"
+        seq = await run_in_threadpool(conversations.append, user_id, user_message, reply)
+    except Exception as e:
+        print(f"Warning: could not persist turn for {user_id!r}: {e}")
 
-        if user_id not in _histories:
-            _histories[user_id] = []
+    # A window that was evicted meanwhile is reloaded (with this turn) on next use
+    window = await _state_call(_histories.append, user_id, {"user": user_message, "alfred": reply, "seq": seq})
+    if window:
+        try:
+            await summaries.schedule(user_id, window)
+        except Exception as e:
+            print(f"Warning: could not schedule summary for {user_id!r}: {e}")
+    return [ChatMessage(user=user_message, alfred=reply, seq=seq)]
 
-        history = _histories[user_id]
-        user_message = req.message.strip()
 
-        if not user_message:
-            return ChatResponse(reply="Please say something for me to respond to.", history=[])
+def _recall_turns(user_id: str, query: str, before: Optional[int]) -> List[Dict[str, str]]:
+    retrieval_index.sync(user_id, conversations)
+    hits = retrieval_index.search(user_id, query, k=RECALL_TURNS, before=before)
+    rows = {seq: (user, alfred) for seq, user, alfred in conversations.by_seq(user_id, [seq for seq, _ in hits])}
+    return [{"user": rows[seq][0], "alfred": rows[seq][1]} for seq, _ in hits if seq in rows]
 
-        # 🔹 1) COMMAND MODE CHECK
-        if user_message.startswith("/"):
-            cmd_reply, handled = handle_command(user_message, db)
-            if handled:
-                # Log to history as if Alfred replied (but no GPT cost)
-                history.append({"user": user_message, "alfred": cmd_reply})
-                _histories[user_id] = history
-                if user_id == "default":
-                    save_memory(history)
 
-                history_models = [ChatMessage(**entry) for entry in history[-20:]]
-                return ChatResponse(reply=cmd_reply, history=history_models)
+async def _recall(user_id: str, query: str, history: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Earlier turns relevant to `query`, best first, older than the turns the
+    prompt already carries. The index first catches up with new turns.
+    """
+    if retrieval_index is None or RECALL_TURNS <= 0:
+        return []
+    window = [t["seq"] for t in history[-prompt.MAX_HISTORY_TURNS:] if t.get("seq") is not None]
+    try:
+        return await run_in_threadpool(_recall_turns, user_id, query, min(window) if window else None)
+    except Exception as e:
+        print(f"Warning: recall failed for {user_id!r}: {e}")
+        return []
+
 
-        # 🔹 2) NORMAL GPT MODE (only if not a command)
-        from .business_context import build_business_context
-        business_context = build_business_context(db)
+def _cursor(history_models: List[ChatMessage]) -> Optional[int]:
+    return history_models[-1].seq if history_models else None
 
-        # If you don't want to pay yet, you can set think() to dev mode as we discussed
-        reply = think(user_message, history, business_context=business_context)
 
-        history.append({"user": user_message, "alfred": reply})
-        _histories[user_id] = history
+HISTORY_PAGE_MAX = 200
 
-        if user_id == "default":
-            save_memory(history)
 
-        history_models = [ChatMessage(**entry) for entry in history[-20:]]
-        return ChatResponse(reply=reply, history=history_models)
+@app.get("/history", response_model=HistoryPage)
+async def history(request: Request, user_id: str = "default", since: int = 0, limit: int = 50):
+    """
+    Turns after the `since` cursor, oldest first, `limit` per page.
+    History is append-only, so the ETag is the newest seq: a client that is
+    already in sync gets 304 without any rows being read.
+    """
+    latest = await run_in_threadpool(conversations.latest_seq, user_id)
+    etag = f'"{latest or 0}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    rows = await run_in_threadpool(conversations.since, user_id, since, limit + 1)
+    turns = [ChatMessage(seq=seq, user=user, alfred=alfred) for seq, user, alfred in rows[:limit]]
+    page = HistoryPage(turns=turns, cursor=turns[-1].seq if turns else since, has_more=len(rows) > limit)
+    return JSONResponse(page.model_dump(), headers=headers)
+
+
+@app.post("/staff/import")
+async def import_staff(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    atomic: bool = Form(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Bulk-import staff from a CSV (with header) or NDJSON upload.
+    The spooled upload is read row by row and inserted in batches; returns
+    {"inserted", "failed", "errors": [{"row", "error"}], "errors_truncated", "aborted"}.
+    If reading (400) or a batch insert (500) fails part way, the same
+    report says which rows were not saved; `atomic=true` saves all or nothing.
+    """
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = await run_in_threadpool(
+            staff_import.import_stream, db, stream, format, file.filename, atomic=atomic
+        )
+    except (staff_import.ImportFormatError, UnicodeDecodeError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+    finally:
+        stream.detach()  # the upload file is closed by FastAPI
+    if report.aborted:
+        status = 400 if report.aborted["stage"] == "read" else 500
+        return JSONResponse(status_code=status, content=report.as_dict())
+    return report.as_dict()
+
+
+@app.get("/staff/export")
+async def export_staff(
+    format: str = "csv",
+    department: Optional[str] = None,
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+):
+    """
+    Stream all staff (or one department) as CSV or NDJSON, in id order.
+    Rows are read in chunks from a streaming cursor, so memory stays flat.
+    """
+    if format not in staff_export.FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"Unknown format {format!r}"})
+    return StreamingResponse(
+        staff_export.iter_export(session_factory, format, department),
+        media_type=staff_export.FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="staff.{format}"'},
+    )
+
+
+def _rate_scope(db: Session, name: Optional[str], department: Optional[str]):
+    """(staff_id, department) for the rate endpoints, or an error response."""
+    if name:
+        staff = staff_search.find_by_name(db, name)
+        if not staff:
+            return None, JSONResponse(status_code=404, content={"error": f"No staff named {name!r}"})
+        return (staff.id, None), None
+    if department:
+        return (None, department), None
+    return None, JSONResponse(status_code=400, content={"error": "name or department is required"})
+
+
+@app.get("/staff/rates")
+def staff_rates(as_of: str, name: Optional[str] = None, department: Optional[str] = None,
+                db: Session = Depends(get_db)):
+    """
+    Daily rate of one person (`name`) or of everyone in a `department` as of
+    an ISO date (end of that day, UTC) or datetime. Staff hired later are left out.
+    """
+    try:
+        at = rate_history.parse_bound(as_of, end=True)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": f"Invalid date {as_of!r}"})
+    scope, error = _rate_scope(db, name, department)
+    if error:
+        return error
+    return {"as_of": at.isoformat(), "rates": rate_history.rates_as_of(db, at, *scope)}
+
+
+@app.get("/staff/rate_changes")
+def staff_rate_changes(start: str, end: Optional[str] = None, name: Optional[str] = None,
+                       department: Optional[str] = None, limit: int = rate_history.CHANGES_LIMIT,
+                       db: Session = Depends(get_db)):
+    """Rate changes between two ISO dates (inclusive; `end` defaults to now), oldest first."""
+    try:
+        first = rate_history.parse_bound(start)
+        last = rate_history.parse_bound(end, end=True) if end else datetime.max
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Invalid start or end date"})
+    scope, error = _rate_scope(db, name, department)
+    if error:
+        return error
+    limit = max(1, min(limit, rate_history.CHANGES_LIMIT))
+    changes, truncated = rate_history.changes_between(db, first, last, *scope, limit=limit)
+    return {"changes": changes, "truncated": truncated}
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _answer(user_id: str, user_message: str, db: Session):
+    """
+    Reply to one message: command mode first, otherwise GPT with business
+    context. The turn is recorded; returns (reply, recent history).
+    """
+    # 🔹 1) COMMAND MODE CHECK
+    if user_message.startswith("/"):
+        cmd_reply, handled = await run_in_threadpool(handle_command, user_message, db)
+        if handled:
+            # Log to history as if Alfred replied (but no GPT cost)
+            return cmd_reply, await _record_turn(user_id, user_message, cmd_reply)
+
+    # 🔹 2) NORMAL GPT MODE (only if not a command)
+    context_version, business_context = await run_in_threadpool(context_snapshot.current, db)
+    reply = await _intent_reply(user_message, business_context, db)
+    if reply is not None:
+        return reply, await _record_turn(user_id, user_message, reply)
+
+    reply_key = _reply_key(user_message, context_version)
+    reply = await reply_cache.get(reply_key) if reply_key else None
+    if reply is not None:
+        return reply, await _record_turn(user_id, user_message, reply)
+
+    # If you don't want to pay yet, you can set think() to dev mode as we discussed
+    history = await _history(user_id)
+    summary = await summaries.get(user_id)
+    recalled = await _recall(user_id, user_message, history)
+    reply = await think(
+        user_message, history, business_context=business_context, summary=summary, recalled=recalled
+    )
+    if reply_key:
+        await reply_cache.put(reply_key, reply)
+
+    return reply, await _record_turn(user_id, user_message, reply)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, db: Session = Depends(get_db)):
+    try:
+        user_id = req.user_id or "default"
+        user_message = req.message.strip()
+
+        if not user_message:
+            return ChatResponse(reply="Please say something for me to respond to.", history=[])
+
+        reply, history_models = await _answer(user_id, user_message, db)
+        return ChatResponse(
+            reply=reply,
+            history=history_models,
+            cursor=_cursor(history_models),
+            audio_handle=_prefetch_audio(reply) if req.speak else None,
+        )
     except Exception as e:
         print(f"Error in /chat: {e}")
         import traceback
@@ -190,50 +565,456 @@ def chat(req: ChatRequest, db: Session = Depends(get_db)):
         return ChatResponse(reply=f"Error: {str(e)}", history=[])
 
 
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, db: Session = Depends(get_db)):
+    """
+    Streaming variant of /chat using Server-Sent Events.
+
+    Events:
+      token  {"delta": "..."}            one per generated text piece
+      done   {"reply": "...", "history": [new turn], "cursor": seq}  after the turn is saved
+      error  {"error": "..."}            if generation fails (turn is not saved)
+    """
+    user_id = req.user_id or "default"
+    history = await _history(user_id)
+    user_message = req.message.strip()
+    headers = {"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+
+    async def single(reply: str, history_models: List[ChatMessage]):
+        yield _sse("token", {"delta": reply})
+        yield _sse("done", {
+            "reply": reply,
+            "history": [m.model_dump() for m in history_models],
+            "cursor": _cursor(history_models),
+            "audio_handle": _prefetch_audio(reply) if req.speak and history_models else None,
+        })
+
+    if not user_message:
+        return StreamingResponse(
+            single("Please say something for me to respond to.", []),
+            media_type="text/event-stream",
+            headers=headers,
+        )
+
+    try:
+        # Commands are answered in one piece (no GPT cost)
+        if user_message.startswith("/"):
+            cmd_reply, handled = await run_in_threadpool(handle_command, user_message, db)
+            if handled:
+                history_models = await _record_turn(user_id, user_message, cmd_reply)
+                return StreamingResponse(
+                    single(cmd_reply, history_models),
+                    media_type="text/event-stream",
+                    headers=headers,
+                )
+
+        context_version, business_context = await run_in_threadpool(context_snapshot.current, db)
+        # Recognized staff commands and cached replies are sent in one piece
+        reply_key = _reply_key(user_message, context_version)
+        ready = await _intent_reply(user_message, business_context, db)
+        if ready is None and reply_key:
+            ready = await reply_cache.get(reply_key)
+        if ready is not None:
+            history_models = await _record_turn(user_id, user_message, ready)
+            return StreamingResponse(
+                single(ready, history_models),
+                media_type="text/event-stream",
+                headers=headers,
+            )
+
+        summary = await summaries.get(user_id)
+        recalled = await _recall(user_id, user_message, history)
+    except Exception as e:
+        print(f"Error in /chat/stream: {e}")
+        return StreamingResponse(
+            single(f"Error: {str(e)}", []),
+            media_type="text/event-stream",
+            headers=headers,
+        )
+
+    async def events():
+        parts: List[str] = []
+        try:
+            async for delta in think_stream(
+                user_message, history, business_context=business_context, summary=summary, recalled=recalled
+            ):
+                parts.append(delta)
+                yield _sse("token", {"delta": delta})
+        except Exception as e:
+            print(f"Error in /chat/stream: {e}")
+            yield _sse("error", {"error": str(e)})
+            return
+
+        reply = "".join(parts)
+        if reply_key:
+            await reply_cache.put(reply_key, reply)
+        history_models = await _record_turn(user_id, user_message, reply)
+        yield _sse("done", {
+            "reply": reply,
+            "history": [m.model_dump() for m in history_models],
+            "cursor": _cursor(history_models),
+            "audio_handle": _prefetch_audio(reply) if req.speak else None,
+        })
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+AUDIO_MEDIA_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+    "pcm": "audio/pcm",
+}
+
+
+async def _primed(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """
+    Wait for the first chunk before a response is started, so upstream
+    failures can still fall back to empty audio. The returned iterator
+    forwards chunks one at a time (the ASGI send applies backpressure) and
+    always closes the upstream stream, including on client disconnect.
+    """
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = b""
+    except BaseException:
+        await chunks.aclose()
+        raise
+
+    async def forward():
+        try:
+            if first:
+                yield first
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            with anyio.CancelScope(shield=True):
+                await chunks.aclose()
+
+    return forward()
+
+
+async def _write_through(chunks: AsyncIterator[bytes], key: str) -> AsyncIterator[bytes]:
+    """
+    Tee audio chunks into the disk cache; only complete audio is published.
+    The cache file is opened on first iteration, so a stream that is never
+    consumed leaves nothing behind.
+    """
+    writer = audio_cache.writer(key)
+    completed = False
+    try:
+        async for chunk in chunks:
+            writer.write(chunk)
+            yield chunk
+        completed = True
+    finally:
+        if completed:
+            writer.commit()
+        else:
+            writer.abort()
+            await chunks.aclose()
+
+
+def _synthesis(text: str, voice: str, fmt: str, key: str) -> AsyncIterator[bytes]:
+    """Upstream TTS chunks, written through to the disk cache when enabled."""
+    chunks = providers.synthesize(text, voice=voice, response_format=fmt)
+    if audio_cache is not None:
+        chunks = _write_through(chunks, key)
+    return chunks
+
+
+def _prefetch_audio(text: str) -> Optional[str]:
+    """
+    Start synthesizing a reply in the background (speak=true).
+    Returns a handle for GET /tts/{handle}, or None when there is nothing
+    to prefetch (dev mode, already cached, or the prefetch queue is full).
+    """
+    if not text.strip() or not providers.get_client():
+        return None
+    req = TTSRequest(text=text.strip())
+    key = tts_cache.make_key(req.text, req.voice, req.format, providers.TTS_MODEL)
+    if audio_cache is not None and key in audio_cache:
+        return None
+    return prefetch.start(key, req.format, lambda: _synthesis(req.text, req.voice, req.format, key))
+
+
 @app.post("/tts")
-def tts(req: TTSRequest):
+async def tts(req: TTSRequest, request: Request):
     """
     Turn Alfred's text reply into speech audio (MP3).
+    Repeated phrases are served from the on-disk audio cache (with ETag);
+    otherwise chunks are passed through to the client as they are synthesized.
     In dev mode (no OpenAI key), returns empty response; browser will use speechSynthesis.
     """
     text = req.text.strip()
+    voice = req.voice or "alloy"
+    fmt = req.format or "mp3"
+    media_type = AUDIO_MEDIA_TYPES.get(fmt, "audio/mpeg")
     if not text:
-        return StreamingResponse(io.BytesIO(b""), media_type="audio/mpeg")
+        return StreamingResponse(io.BytesIO(b""), media_type=media_type)
+
+    key = tts_cache.make_key(text, voice, fmt, providers.TTS_MODEL)
+    etag = f'"{key}"'
+    if audio_cache is not None:
+        path = audio_cache.get(key)
+        if path is not None:
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "X-TTS-Cache": "hit"}
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers=headers)
+            # FileResponse lets the server use zero-copy sendfile where supported
+            return FileResponse(path, media_type=media_type, headers=headers)
+
+    # Attach to audio already being pre-synthesized for this text
+    job = prefetch.claim_key(key)
+    if job is not None:
+        body = await _primed(job.stream())
+        return StreamingResponse(body, media_type=media_type, headers={"Cache-Control": "no-store"})
 
     # Dev mode: no OpenAI client
-    if not openai_client:
+    if not providers.get_client():
         print("[TTS dev mode] Browser will use speechSynthesis instead of server TTS.")
         return StreamingResponse(
             io.BytesIO(b""),
-            media_type="audio/mpeg",
+            media_type=media_type,
             headers={"Cache-Control": "no-store"},
         )
 
     # Using OpenAI Audio API: text-to-speech
     try:
-        audio_bytes = io.BytesIO()
+        headers = {"Cache-Control": "no-store"}
+        if audio_cache is not None:
+            headers = {"ETag": etag, "Cache-Control": "no-cache", "X-TTS-Cache": "miss"}
+        body = await _primed(_synthesis(text, voice, fmt, key))
 
-        # Streaming approach, then collect into buffer
-        with openai_client.audio.speech.with_streaming_response.create(
-            model="tts-1",
-            voice=req.voice or "alloy",
-            input=text,
-            response_format=req.format or "mp3",
-        ) as response:
-            for chunk in response.iter_bytes():
-                audio_bytes.write(chunk)
-
-        audio_bytes.seek(0)
-
-        return StreamingResponse(
-            audio_bytes,
-            media_type="audio/mpeg",
-            headers={"Cache-Control": "no-store"},
-        )
+        return StreamingResponse(body, media_type=media_type, headers=headers)
     except Exception as e:
         print(f"TTS error: {e}")
         return StreamingResponse(
             io.BytesIO(b""),
-            media_type="audio/mpeg",
+            media_type=media_type,
             headers={"Cache-Control": "no-store"},
         )
+
+
+@app.get("/tts/{handle}")
+async def tts_prefetched(handle: str):
+    """Stream audio pre-synthesized by /chat (speak=true); in-flight audio is joined live."""
+    job = prefetch.claim(handle)
+    if job is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": "unknown or expired audio handle"},
+        )
+    body = await _primed(job.stream())
+    return StreamingResponse(
+        body,
+        media_type=AUDIO_MEDIA_TYPES.get(job.fmt, "audio/mpeg"),
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+async def _cached_audio(path: Path) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as f:
+        while chunk := await f.read(providers.TTS_CHUNK_SIZE):
+            yield chunk
+
+
+@app.post("/voice")
+async def voice(
+    audio: UploadFile = File(...),
+    user_id: str = Form("default"),
+    voice: str = Form("alloy"),
+    format: str = Form("mp3"),
+    db: Session = Depends(get_db),
+):
+    """
+    One round-trip voice turn: STT -> command check -> think -> TTS.
+
+    Streams Server-Sent Events:
+      transcript {"text"}                      what the user said
+      token      {"delta"}                     reply text as it is generated
+      reply      {"text", "history", "cursor"} after the turn is saved
+      audio      {"format", "data"}            base64 audio chunks, as synthesized
+      done       {"audio": bool}               false in dev mode (use local TTS)
+      error      {"stage", "error"}            stt / chat / tts failure
+    """
+    user_id = user_id or "default"
+    headers = {"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
+
+    async def events():
+        # 1) Speech to text
+        try:
+            if not _mock_mode() and not providers.get_client():
+                raise RuntimeError("OpenAI API key not configured")
+            transcript, _, _ = await _transcribe(audio)
+            transcript = transcript.strip()
+        except Exception as e:
+            print(f"Error in /voice (stt): {e}")
+            yield _sse("error", {"stage": "stt", "error": str(e)})
+            return
+        yield _sse("transcript", {"text": transcript})
+        if not transcript:
+            yield _sse("done", {"audio": False})
+            return
+
+        # 2) Command mode or GPT (same rules as /chat)
+        try:
+            reply = None
+            if transcript.startswith("/"):
+                cmd_reply, handled = await run_in_threadpool(handle_command, transcript, db)
+                if handled:
+                    reply = cmd_reply
+                    yield _sse("token", {"delta": reply})
+
+            if reply is None:
+                context_version, business_context = await run_in_threadpool(context_snapshot.current, db)
+                reply_key = _reply_key(transcript, context_version)
+                reply = await _intent_reply(transcript, business_context, db)
+                if reply is None and reply_key:
+                    reply = await reply_cache.get(reply_key)
+                if reply is not None:
+                    yield _sse("token", {"delta": reply})
+
+            if reply is None:
+                history = await _history(user_id)
+                parts: List[str] = []
+                summary = await summaries.get(user_id)
+                recalled = await _recall(user_id, transcript, history)
+                async for delta in think_stream(
+                    transcript, history, business_context=business_context, summary=summary, recalled=recalled
+                ):
+                    parts.append(delta)
+                    yield _sse("token", {"delta": delta})
+                reply = "".join(parts)
+                if reply_key:
+                    await reply_cache.put(reply_key, reply)
+        except Exception as e:
+            print(f"Error in /voice (chat): {e}")
+            yield _sse("error", {"stage": "chat", "error": str(e)})
+            return
+
+        history_models = await _record_turn(user_id, transcript, reply)
+        yield _sse("reply", {
+            "text": reply,
+            "history": [m.model_dump() for m in history_models],
+            "cursor": _cursor(history_models),
+        })
+
+        # 3) Text to speech, forwarded chunk by chunk
+        spoken = reply.strip()
+        key = tts_cache.make_key(spoken, voice, format, providers.TTS_MODEL)
+        path = audio_cache.get(key) if audio_cache is not None and spoken else None
+        if not spoken or (path is None and not providers.get_client()):
+            yield _sse("done", {"audio": False})
+            return
+
+        chunks = _cached_audio(path) if path is not None else _synthesis(spoken, voice, format, key)
+        try:
+            async for chunk in chunks:
+                yield _sse("audio", {"format": format, "data": base64.b64encode(chunk).decode("ascii")})
+        except Exception as e:
+            print(f"Error in /voice (tts): {e}")
+            yield _sse("error", {"stage": "tts", "error": str(e)})
+            return
+        finally:
+            with anyio.CancelScope(shield=True):
+                await chunks.aclose()
+        yield _sse("done", {"audio": True})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+WS_PARTIAL_MS = int(os.getenv("ALFRED_WS_PARTIAL_MS", "1500"))
+WS_MAX_UTTERANCE_S = float(os.getenv("ALFRED_WS_MAX_UTTERANCE_S", "30"))
+VAD_THRESHOLD = float(os.getenv("ALFRED_VAD_THRESHOLD", "0.01"))
+VAD_END_SILENCE_MS = int(os.getenv("ALFRED_VAD_END_SILENCE_MS", "700"))
+WS_SAMPLE_RATES = (8000, 48000)  # accepted `sample_rate` range, inclusive
+
+
+async def _transcribe_pcm(pcm: bytes, sample_rate: int) -> str:
+    """Transcribe raw 16-bit mono PCM from a streaming session."""
+    if _mock_mode():
+        return MOCK_TRANSCRIPT
+    if AUDIO_PREP:
+        prep = await run_in_threadpool(audio_prep.prepare_pcm, pcm, sample_rate)
+        if not prep.has_speech:
+            return ""
+        return await providers.transcribe("utterance.wav", prep.audio, "audio/wav")
+    return await providers.transcribe("utterance.wav", encode_wav(pcm, sample_rate), "audio/wav")
+
+
+@app.websocket("/ws/voice")
+async def ws_voice(
+    websocket: WebSocket,
+    user_id: str = "default",
+    sample_rate: int = 16000,
+    db: Session = Depends(get_db),
+):
+    """
+    Streaming voice session.
+
+    Client -> server: binary frames of 16-bit little-endian mono PCM at
+    `sample_rate`; text {"type": "end"} to end an utterance now (push-to-talk),
+    {"type": "close"} to finish pending work and close.
+    Server -> client JSON: ready, speech_start, partial {"text"},
+    final {"text"}, reply {"text"}, error {"error"}.
+    """
+    await websocket.accept()
+
+    low, high = WS_SAMPLE_RATES
+    if not low <= sample_rate <= high:
+        await websocket.send_json({"type": "error", "error": f"sample_rate must be between {low} and {high} Hz"})
+        await websocket.close()
+        return
+
+    if not _mock_mode() and not providers.get_client():
+        await websocket.send_json({"type": "error", "error": "OpenAI API key not configured"})
+        await websocket.close()
+        return
+
+    async def respond(text: str) -> str:
+        reply, _ = await _answer(user_id or "default", text, db)
+        return reply
+
+    session = VoiceSession(
+        transcribe=lambda pcm, rate: _transcribe_pcm(pcm, rate),
+        respond=respond,
+        send=websocket.send_json,
+        sample_rate=sample_rate,
+        max_utterance_s=WS_MAX_UTTERANCE_S,
+        partial_interval_ms=WS_PARTIAL_MS,
+        detector=UtteranceDetector(
+            sample_rate,
+            threshold=VAD_THRESHOLD,
+            end_silence_ms=VAD_END_SILENCE_MS,
+        ),
+    )
+    await websocket.send_json({"type": "ready", "sample_rate": sample_rate})
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                await session.feed(message["bytes"])
+                continue
+
+            try:
+                control = json.loads(message.get("text") or "{}")
+            except ValueError:
+                control = {}
+            if control.get("type") == "end":
+                await session.end_utterance(forced=True)
+            elif control.get("type") == "close":
+                await session.end_utterance()
+                await session.close(drain=True)
+                await websocket.close()
+                return
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
@@ -1,20 +1,171 @@
+"""
+Persistent conversation history.
+
+Turns are appended one row at a time to the `conversation_turns` table
+(next to `staff`), so a write costs the same however long the history is,
+and every user's history survives restarts. Reads fetch only the newest N
+turns through the (user_id, id) index. A turn's id doubles as the
+client-visible sequence cursor: it only ever grows within a user's history.
+Each user's rolling summary is kept in `conversation_summaries` along with
+the seq it covers, so it is never rebuilt from the first turn.
+
+A legacy `alfred_memory.json` (the old whole-file store for the `default`
+user) is imported once by `migrate_json_memory`. A `data_migrations`
+marker row, committed with the turns, records that it was done.
+"""
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.orm import sessionmaker
+
+from .models import ConversationSummary, ConversationTurn, DataMigration
 
 MEMORY_FILE = Path("alfred_memory.json")
 
 
-def load_memory() -> List[Dict[str, str]]:
-    if not MEMORY_FILE.exists():
+def _create_table(table, bind) -> None:
+    """CREATE TABLE if missing, tolerating another worker creating it between the check and the CREATE."""
+    try:
+        table.create(bind=bind, checkfirst=True)
+    except (OperationalError, ProgrammingError):
+        if not inspect(bind).has_table(table.name):
+            raise
+
+
+def load_memory(path: Path = MEMORY_FILE) -> List[Dict[str, str]]:
+    """Read a legacy JSON history file ([] if missing or unreadable)."""
+    if not path.exists():
         return []
     try:
-        with open(MEMORY_FILE, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception:
         return []
 
 
-def save_memory(history: List[Dict[str, str]]) -> None:
-    with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+class ConversationStore:
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+        self._table_ready = False
+
+    def _ensure_table(self) -> None:
+        if not self._table_ready:
+            with self.session_factory() as db:
+                _create_table(ConversationTurn.__table__, db.get_bind())
+                _create_table(ConversationSummary.__table__, db.get_bind())
+            self._table_ready = True
+
+    def append(self, user_id: str, user: str, alfred: str) -> int:
+        """Durably record one turn (a single INSERT + commit); returns its seq."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            turn = ConversationTurn(user_id=user_id, user=user, alfred=alfred)
+            db.add(turn)
+            db.flush()
+            seq = turn.id
+            db.commit()
+            return seq
+
+    def latest_seq(self, user_id: str) -> Optional[int]:
+        """Seq of the user's newest turn (an index lookup), None if there are none."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            return db.execute(
+                select(func.max(ConversationTurn.id)).where(ConversationTurn.user_id == user_id)
+            ).scalar()
+
+    def since(self, user_id: str, since: int, limit: int) -> List[Tuple[int, str, str]]:
+        """Up to `limit` (seq, user, alfred) turns after `since`, oldest first."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(ConversationTurn.id, ConversationTurn.user, ConversationTurn.alfred)
+                .where(ConversationTurn.user_id == user_id, ConversationTurn.id > since)
+                .order_by(ConversationTurn.id)
+                .limit(limit)
+            ).all()
+        return [tuple(row) for row in rows]
+
+    def by_seq(self, user_id: str, seqs: List[int]) -> List[Tuple[int, str, str]]:
+        """The (seq, user, alfred) turns with the given seqs, oldest first."""
+        if not seqs:
+            return []
+        self._ensure_table()
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(ConversationTurn.id, ConversationTurn.user, ConversationTurn.alfred)
+                .where(ConversationTurn.user_id == user_id, ConversationTurn.id.in_(seqs))
+                .order_by(ConversationTurn.id)
+            ).all()
+        return [tuple(row) for row in rows]
+
+    def recent(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """The user's last `limit` turns ({"user", "alfred", "seq"}), oldest first."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            rows = db.execute(
+                select(ConversationTurn.user, ConversationTurn.alfred, ConversationTurn.id)
+                .where(ConversationTurn.user_id == user_id)
+                .order_by(ConversationTurn.id.desc())
+                .limit(limit)
+            ).all()
+        return [{"user": user, "alfred": alfred, "seq": seq} for user, alfred, seq in reversed(rows)]
+
+    def load_summary(self, user_id: str) -> Optional[Tuple[str, int]]:
+        """The user's stored (summary text, upto seq), None if there is none."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            row = db.get(ConversationSummary, user_id)
+            return (row.text, row.upto) if row is not None else None
+
+    def save_summary(self, user_id: str, text: str, upto: int) -> None:
+        """Store the user's summary unless one covering newer turns is already stored."""
+        self._ensure_table()
+        with self.session_factory() as db:
+            row = db.get(ConversationSummary, user_id)
+            if row is None:
+                db.add(ConversationSummary(user_id=user_id, text=text, upto=upto))
+            elif row.upto < upto:
+                row.text, row.upto = text, upto
+            else:
+                return
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another worker stored the first summary at the same time
+
+    def migrate_json_memory(self, path: Path = MEMORY_FILE, user_id: str = "default") -> int:
+        """
+        One-time import of a legacy JSON history file. The marker row and
+        the turns commit together, so several workers starting at once
+        import the file exactly once: the others hit the marker's primary
+        key and roll back. The file is left in place.
+        Returns the number of turns imported.
+        """
+        if not path.exists():
+            return 0
+        name = f"json_memory:{path.resolve()}"
+        self._ensure_table()
+        with self.session_factory() as db:
+            _create_table(DataMigration.__table__, db.get_bind())
+            if db.get(DataMigration, name) is not None:
+                return 0
+            history = [
+                entry for entry in load_memory(path)
+                if isinstance(entry, dict) and "user" in entry and "alfred" in entry
+            ]
+            try:
+                db.add(DataMigration(name=name))
+                db.flush()  # claim the marker before writing any turns
+                db.add_all(
+                    ConversationTurn(user_id=user_id, user=entry["user"], alfred=entry["alfred"])
+                    for entry in history
+                )
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another worker imported it first
+                return 0
+        return len(history)
@@ -1,9 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
-from sqlalchemy.orm import declarative_base
+import re
+import unicodedata
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, Text
+from sqlalchemy.orm import declarative_base, validates
 from datetime import datetime, UTC
 
 Base = declarative_base()
 
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def search_key(text: str | None) -> str | None:
+    """Lowercased, accent-folded, punctuation-free form used for indexed lookups."""
+    if text is None:
+        return None
+    folded = unicodedata.normalize("NFKD", text)
+    folded = "".join(c for c in folded if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", folded.casefold()).split())
+
+
+def _key_default(source: str):
+    # Context-sensitive default, so Core bulk inserts get keys too
+    return lambda context: search_key(context.get_current_parameters().get(source))
+
 
 class Staff(Base):
     __tablename__ = "staff"
@@ -15,6 +33,60 @@ class Staff(Base):
     status = Column(String(50), nullable=True, default="active")
     current_daily_rate = Column(Float, nullable=True)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    # search_key() of full_name / department, for indexed case- and accent-insensitive lookups
+    name_key = Column(String(200), nullable=True, index=True, default=_key_default("full_name"))
+    department_key = Column(String(100), nullable=True, index=True, default=_key_default("department"))
+
+    @validates("full_name", "department")
+    def _sync_keys(self, field, value):
+        setattr(self, "name_key" if field == "full_name" else "department_key", search_key(value))
+        return value
 
     def __repr__(self) -> str:  # pragma: no cover - convenience
         return f"<Staff id={self.id} name={self.full_name!r}>"
+
+
+class StaffRateHistory(Base):
+    """One daily-rate change, appended in the same transaction as the Staff update."""
+
+    __tablename__ = "staff_rate_history"
+    __table_args__ = (Index("ix_staff_rate_history_staff_id_effective_at", "staff_id", "effective_at"),)
+
+    id = Column(Integer, primary_key=True)
+    staff_id = Column(Integer, nullable=False)
+    previous_rate = Column(Float, nullable=True)
+    daily_rate = Column(Float, nullable=True)
+    effective_at = Column(DateTime, nullable=False, default=lambda: datetime.now(UTC))
+
+
+class ConversationTurn(Base):
+    """One chat turn; appended per reply, read back newest-first per user."""
+
+    __tablename__ = "conversation_turns"
+    __table_args__ = (Index("ix_conversation_turns_user_id_id", "user_id", "id"),)
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String(200), nullable=False)
+    user = Column(Text, nullable=False)
+    alfred = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+
+
+class ConversationSummary(Base):
+    """A user's rolling summary and the seq of the newest turn folded into it."""
+
+    __tablename__ = "conversation_summaries"
+
+    user_id = Column(String(200), primary_key=True)
+    text = Column(Text, nullable=False)
+    upto = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+
+
+class DataMigration(Base):
+    """Marker for a one-time data import, written in the same transaction as the data."""
+
+    __tablename__ = "data_migrations"
+
+    name = Column(String(500), primary_key=True)
+    applied_at = Column(DateTime, default=lambda: datetime.now(UTC))
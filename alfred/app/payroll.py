@@ -0,0 +1,277 @@
+"""
+Payroll analytics over a columnar snapshot of `staff`.
+
+`payroll_snapshot` holds one NumPy array per column (id, daily rate,
+department code, active flag), loaded with a single query. Totals, means,
+percentiles and raise projections are vectorized over those arrays
+(bincount, one sort for per-department quantiles), so `/payroll` answers
+from memory in a few ms at 100k staff instead of querying the database.
+
+The snapshot follows the business-context version counter. Commands that
+write staff apply the same change to the arrays in place (append or one
+`searchsorted` update). Any other write (bulk import, another worker)
+moves the counter without a delta, and the snapshot is reloaded on the
+next read. Departments are grouped like the business context: by trimmed
+name, with staff without a department under "".
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select
+
+from . import models
+from .business_context import _is_active, context_snapshot
+from .models import search_key
+
+INITIAL_CAPACITY = 1024
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+_CENTS_BITS = 40
+_CENTS_SPAN = 1 << _CENTS_BITS
+
+
+@dataclass
+class PayrollColumns:
+    """Staff as parallel arrays; rows [:size] are live, sorted by id."""
+
+    ids: np.ndarray
+    rates: np.ndarray                  # float64, NaN where the rate is unset
+    depts: np.ndarray                  # int32 codes into `departments`
+    active: np.ndarray                 # bool
+    size: int
+    departments: List[str] = field(default_factory=list)
+    codes: Dict[str, int] = field(default_factory=dict)
+    version: Optional[int] = None
+
+    @classmethod
+    def empty(cls, capacity: int = INITIAL_CAPACITY) -> "PayrollColumns":
+        return cls(
+            ids=np.zeros(capacity, dtype=np.int64),
+            rates=np.zeros(capacity, dtype=np.float64),
+            depts=np.zeros(capacity, dtype=np.int32),
+            active=np.zeros(capacity, dtype=bool),
+            size=0,
+        )
+
+    def code(self, department: Optional[str]) -> int:
+        name = (department or "").strip()
+        if name not in self.codes:
+            self.codes[name] = len(self.departments)
+            self.departments.append(name)
+        return self.codes[name]
+
+    def append(self, staff_id: int, rate: Optional[float], department: Optional[str], status: Optional[str]) -> None:
+        if self.size == len(self.ids):
+            capacity = max(INITIAL_CAPACITY, 2 * self.size)
+            for name in ("ids", "rates", "depts", "active"):
+                column = getattr(self, name)
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.size] = column[:self.size]
+                setattr(self, name, grown)
+        i = self.size
+        self.ids[i] = staff_id
+        self.rates[i] = np.nan if rate is None else rate
+        self.depts[i] = self.code(department)
+        self.active[i] = _is_active(status)
+        self.size += 1
+
+    def set_rate(self, staff_id: int, rate: Optional[float]) -> bool:
+        i = int(np.searchsorted(self.ids[:self.size], staff_id))
+        if i == self.size or self.ids[i] != staff_id:
+            return False
+        self.rates[i] = np.nan if rate is None else rate
+        return True
+
+    def view(self) -> "PayrollView":
+        """Active staff only, as read-only slices (payroll counts active staff, like the context)."""
+        n = self.size
+        mask = self.active[:n]
+        return PayrollView(self.rates[:n][mask], self.depts[:n][mask], list(self.departments))
+
+
+def load_columns(db) -> PayrollColumns:
+    """One query over `staff`; raises if the DB is unavailable."""
+    staff = models.Staff.__table__
+    rows = db.execute(
+        select(staff.c.id, staff.c.current_daily_rate, staff.c.department, staff.c.status).order_by(staff.c.id)
+    ).all()
+    columns = PayrollColumns.empty(max(INITIAL_CAPACITY, len(rows)))
+    n = len(rows)
+    columns.ids[:n] = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+    columns.rates[:n] = np.fromiter((np.nan if r[1] is None else r[1] for r in rows), dtype=np.float64, count=n)
+    columns.depts[:n] = np.fromiter((columns.code(r[2]) for r in rows), dtype=np.int32, count=n)
+    columns.active[:n] = np.fromiter((_is_active(r[3]) for r in rows), dtype=bool, count=n)
+    columns.size = n
+    return columns
+
+
+@dataclass
+class PayrollView:
+    rates: np.ndarray
+    depts: np.ndarray
+    departments: List[str]
+
+    def matching(self, department: str) -> np.ndarray:
+        """Department codes whose name matches `department` ignoring case and accents."""
+        key = search_key(department)
+        return np.array([c for c, name in enumerate(self.departments) if search_key(name) == key], dtype=np.int32)
+
+    def by_department(self) -> List[Dict[str, Any]]:
+        """Headcount, total, mean and quantiles per department, largest payroll first."""
+        groups = len(self.departments)
+        if not groups:
+            return []
+        paid = ~np.isnan(self.rates)
+        counts = np.bincount(self.depts, minlength=groups)
+        totals = np.bincount(self.depts[paid], weights=self.rates[paid], minlength=groups)
+        paid_counts = np.bincount(self.depts[paid], minlength=groups)
+        quantiles = _group_quantiles(self.depts[paid], self.rates[paid], groups, QUANTILES)
+        rows = []
+        for code in np.flatnonzero(counts):
+            rows.append(_stats_row(
+                self.departments[code], int(counts[code]), float(totals[code]), int(paid_counts[code]),
+                quantiles[code],
+            ))
+        return sorted(rows, key=lambda r: -r["daily_payroll"])
+
+    def overall(self, codes: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """The same statistics over everyone, or over the departments in `codes`."""
+        rates = self.rates if codes is None else self.rates[np.isin(self.depts, codes)]
+        paid = rates[~np.isnan(rates)]
+        quantiles = np.quantile(paid, QUANTILES) if len(paid) else np.full(len(QUANTILES), np.nan)
+        return _stats_row(None, len(rates), float(paid.sum()), len(paid), quantiles)
+
+    def raise_projection(self, percent: float, codes: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Daily payroll before and after raising everyone (or the departments in `codes`) by `percent`."""
+        rates = np.nan_to_num(self.rates)
+        affected = np.ones(len(rates), dtype=bool) if codes is None else np.isin(self.depts, codes)
+        before = float(rates.sum())
+        increase = float(rates[affected].sum() * percent / 100.0)
+        return {
+            "percent": percent,
+            "staff_affected": int(affected.sum()),
+            "daily_payroll_before": round(before, 2),
+            "daily_payroll_after": round(before + increase, 2),
+            "daily_increase": round(increase, 2),
+        }
+
+
+def _stats_row(department, headcount, total, paid, quantiles) -> Dict[str, Any]:
+    row = {
+        "headcount": headcount,
+        "daily_payroll": round(total, 2),
+        "mean_rate": round(total / paid, 2) if paid else None,
+    }
+    row.update({f"p{round(q * 100)}": _round(v) for q, v in zip(QUANTILES, quantiles)})
+    return row if department is None else {"department": department, **row}
+
+
+def _round(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 2)
+
+
+def _group_quantiles(groups: np.ndarray, values: np.ndarray, n_groups: int, qs: Sequence[float]) -> np.ndarray:
+    """(n_groups, len(qs)) linear-interpolated quantiles of `values` per group code; NaN for empty groups."""
+    out = np.full((n_groups, len(qs)), np.nan)
+    if not len(values):
+        return out
+    sorted_values = _sort_within_groups(groups, values)
+    counts = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    has = counts > 0
+    pos = starts[has, None] + np.asarray(qs)[None, :] * (counts[has, None] - 1)
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    frac = pos - lo
+    out[has] = sorted_values[lo] * (1 - frac) + sorted_values[hi] * frac
+    return out
+
+
+def _sort_within_groups(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    `values` ordered by (group, value). Rates are whole cents, so one int64
+    sort of group << 40 | cents does it; that is ~20x faster than lexsort.
+    """
+    cents = np.rint(values * 100).astype(np.int64)
+    base = int(cents.min())
+    if int(cents.max()) - base >= _CENTS_SPAN:  # implausible rates: exact but slower
+        return values[np.lexsort((values, groups))]
+    keys = np.sort((groups.astype(np.int64) << _CENTS_BITS) | (cents - base))
+    return ((keys & (_CENTS_SPAN - 1)) + base) / 100.0
+
+
+class PayrollSnapshot:
+    """`PayrollColumns` per database URL, kept in step with `context_snapshot`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns: Dict[str, PayrollColumns] = {}
+        self.loads = 0
+        self.reads = 0
+        self.deltas = 0
+
+    @staticmethod
+    def _db_key(db) -> str:
+        return str(db.get_bind().url)
+
+    def view(self, db) -> PayrollView:
+        """Active-staff arrays for `db` (blocking: call from a worker thread)."""
+        key = self._db_key(db)
+        version = context_snapshot.current_version()
+        with self._lock:
+            self.reads += 1
+            columns = self._columns.get(key)
+            if columns is not None and columns.version == version:
+                return columns.view()
+
+        columns = load_columns(db)
+        columns.version = version
+        unchanged = context_snapshot.current_version() == version  # no write landed while loading
+        with self._lock:
+            self.loads += 1
+            if unchanged:
+                self._columns[key] = columns
+            return columns.view()
+
+    def _apply(self, db, delta) -> None:
+        """Apply `delta(columns)` after a write that bumped the context version by one."""
+        key = self._db_key(db)
+        version = context_snapshot.current_version()
+        with self._lock:
+            columns = self._columns.get(key)
+            if columns is None:
+                return
+            if columns.version is None or version != columns.version + 1 or not delta(columns):
+                del self._columns[key]  # reload on next read
+                return
+            columns.version = version
+            self.deltas += 1
+
+    def staff_added(
+        self, db, staff_id: int, rate: Optional[float], department: Optional[str], status: Optional[str]
+    ) -> None:
+        """A committed insert; takes plain values so nothing is reloaded after the commit."""
+        def delta(columns):
+            if columns.size and staff_id <= columns.ids[columns.size - 1]:
+                return False
+            columns.append(staff_id, rate, department, status)
+            return True
+
+        self._apply(db, delta)
+
+    def rate_changed(self, db, staff_id: int, rate: Optional[float]) -> None:
+        self._apply(db, lambda columns: columns.set_rate(staff_id, rate))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "databases": len(self._columns),
+                "staff": sum(c.size for c in self._columns.values()),
+                "reads": self.reads,
+                "loads": self.loads,
+                "deltas": self.deltas,
+            }
+
+
+payroll_snapshot = PayrollSnapshot()
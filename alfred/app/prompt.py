@@ -0,0 +1,142 @@
+"""
+Token-budgeted prompt assembly.
+
+The system prompt, business context and new user message are always sent.
+The rolling summary of older turns, the few earlier exchanges retrieved as
+relevant to the new message, and then the most recent turns (newest first)
+fill whatever is left of `ALFRED_PROMPT_BUDGET`, so prompt size stays
+roughly flat however long individual messages get.
+
+Tokens are counted locally: with `tiktoken` when it is installed, else with
+a character/word heuristic that errs on the high side.
+"""
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from . import providers
+
+try:
+    import tiktoken
+except ImportError:  # optional
+    tiktoken = None
+
+TOKEN_BUDGET = int(os.getenv("ALFRED_PROMPT_BUDGET", "3000"))
+MAX_HISTORY_TURNS = int(os.getenv("ALFRED_PROMPT_MAX_TURNS", "10"))
+MESSAGE_OVERHEAD = 4  # role + separators per chat message
+
+CONTEXT_PREAMBLE = (
+    "Here is up-to-date structured data about Emileo's businesses. "
+    "Use this as ground truth for staff, warehouses, and stores when relevant.\n\n"
+)
+SUMMARY_PREAMBLE = "Summary of the earlier conversation with this user:\n\n"
+RECALL_PREAMBLE = "Earlier exchanges with this user that may be relevant:\n\n"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(providers.CHAT_MODEL)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    # ~4 characters per token in English; short words are about a token each
+    return max(math.ceil(len(text) / 4), len(text.split()))
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    return MESSAGE_OVERHEAD + count_tokens(message["content"])
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Keep the end of `text` (whole lines) within `max_tokens`."""
+    lines = text.splitlines()
+    while lines and count_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def format_context(business_context: Any) -> str:
+    """Compact JSON for dict contexts (fewer tokens than a Python repr)."""
+    if isinstance(business_context, (dict, list)):
+        return json.dumps(business_context, ensure_ascii=False, separators=(",", ":"))
+    return str(business_context)
+
+
+def build_prompt(
+    system_prompt: str,
+    user_input: str,
+    history: List[Dict[str, str]],
+    business_context: Any = None,
+    summary: Optional[str] = None,
+    recalled: Optional[List[Dict[str, str]]] = None,
+    budget: int = TOKEN_BUDGET,
+    max_turns: int = MAX_HISTORY_TURNS,
+) -> List[Dict[str, str]]:
+    """
+    Assemble system prompt, summary, recalled turns, recent history,
+    business context and the new user message, fitting the optional parts
+    into `budget` tokens.
+    """
+    system = {"role": "system", "content": system_prompt}
+    user = {"role": "user", "content": user_input}
+    context = None
+    if business_context:
+        context = {"role": "system", "content": CONTEXT_PREAMBLE + format_context(business_context)}
+
+    remaining = budget - sum(message_tokens(m) for m in (system, user, context) if m)
+
+    summary_message = None
+    if summary:
+        candidate = {"role": "system", "content": SUMMARY_PREAMBLE + summary}
+        cost = message_tokens(candidate)
+        if cost <= remaining:
+            summary_message, remaining = candidate, remaining - cost
+
+    recall_message = None
+    recalled_lines: List[str] = []
+    for entry in recalled or []:
+        line = f"User: {entry['user']}\nAlfred: {entry['alfred']}"
+        candidate = {"role": "system", "content": RECALL_PREAMBLE + "\n\n".join(recalled_lines + [line])}
+        if message_tokens(candidate) > remaining:
+            break
+        recalled_lines.append(line)
+        recall_message = candidate
+    if recall_message:
+        remaining -= message_tokens(recall_message)
+
+    turns: List[List[Dict[str, str]]] = []
+    for entry in reversed(history[-max_turns:] if max_turns else []):
+        pair = [
+            {"role": "user", "content": entry["user"]},
+            {"role": "assistant", "content": entry["alfred"]},
+        ]
+        cost = sum(message_tokens(m) for m in pair)
+        if cost > remaining:
+            break
+        turns.append(pair)
+        remaining -= cost
+
+    messages = [system]
+    if summary_message:
+        messages.append(summary_message)
+    if recall_message:
+        messages.append(recall_message)
+    for pair in reversed(turns):
+        messages.extend(pair)
+    if context:
+        messages.append(context)
+    messages.append(user)
+    return messages
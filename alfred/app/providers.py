@@ -0,0 +1,166 @@
+"""
+Async OpenAI provider layer.
+
+A single shared `AsyncOpenAI` client (pooled keep-alive HTTP transport) is
+used by `brain.think`, `/stt` and `/tts`, so upstream round-trips never block
+the event loop. When `OPENAI_API_KEY` is not set, `get_client()` returns None
+and callers keep their dev-mode fallbacks.
+
+Point `OPENAI_BASE_URL` at a local stub, or call `set_client()` with a fake,
+to exercise the real code paths without paid API calls.
+"""
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+# Connection pool (shared by every request on this worker)
+POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+POOL_KEEPALIVE = int(os.getenv("OPENAI_POOL_KEEPALIVE", str(POOL_SIZE)))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+# Per-call timeouts (seconds)
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", "60"))
+STT_TIMEOUT = float(os.getenv("OPENAI_STT_TIMEOUT", "120"))
+TTS_TIMEOUT = float(os.getenv("OPENAI_TTS_TIMEOUT", "60"))
+
+CHAT_MODEL = os.getenv("ALFRED_CHAT_MODEL", "gpt-4o-mini")
+STT_MODEL = os.getenv("ALFRED_STT_MODEL", "whisper-1")
+TTS_MODEL = os.getenv("ALFRED_TTS_MODEL", "tts-1")
+TTS_CHUNK_SIZE = int(os.getenv("ALFRED_TTS_CHUNK_SIZE", "16384"))
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def _timeout(seconds: float) -> httpx.Timeout:
+    return httpx.Timeout(seconds, connect=CONNECT_TIMEOUT)
+
+
+def get_client() -> Optional[AsyncOpenAI]:
+    """
+    Return the shared async client, creating it on first use.
+    Returns None in dev mode (no OPENAI_API_KEY).
+    """
+    global _client
+    if _client is not None:
+        return _client
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+
+    try:
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_retries=MAX_RETRIES,
+            timeout=_timeout(CHAT_TIMEOUT),
+            http_client=DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_KEEPALIVE,
+                ),
+                timeout=_timeout(CHAT_TIMEOUT),
+            ),
+        )
+    except Exception as e:
+        print(f"Warning: Could not initialize OpenAI client: {e}")
+        return None
+    return _client
+
+
+def set_client(client: Optional[Any]) -> None:
+    """Swap the shared client (tests and local stubs)."""
+    global _client
+    _client = client
+
+
+async def aclose() -> None:
+    """Close the pooled transport (called on app shutdown)."""
+    global _client
+    client, _client = _client, None
+    if client is not None and hasattr(client, "close"):
+        await client.close()
+
+
+async def chat_completion(messages: List[Dict[str, str]], temperature: float = 0.4) -> str:
+    client = get_client()
+    if client is None:
+        raise RuntimeError("OpenAI API key not configured")
+
+    response = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=temperature,
+        timeout=_timeout(CHAT_TIMEOUT),
+    )
+    return response.choices[0].message.content
+
+
+async def chat_completion_stream(
+    messages: List[Dict[str, str]],
+    temperature: float = 0.4,
+) -> AsyncIterator[str]:
+    """Yield content deltas as the model produces them."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("OpenAI API key not configured")
+
+    stream = await client.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=temperature,
+        stream=True,
+        timeout=_timeout(CHAT_TIMEOUT),
+    )
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+async def transcribe(filename: str, data: Any, content_type: str) -> str:
+    """Whisper transcription. `data` may be bytes or a binary file object."""
+    client = get_client()
+    if client is None:
+        raise RuntimeError("OpenAI API key not configured")
+
+    response = await client.audio.transcriptions.create(
+        model=STT_MODEL,
+        file=(filename, data, content_type),
+        timeout=_timeout(STT_TIMEOUT),
+    )
+    return response.text or ""
+
+
+def speech_stream(text: str, voice: str, response_format: str):
+    """
+    Open a streamed TTS response. Use as `async with speech_stream(...) as r:`
+    and read `r.iter_bytes()`.
+    """
+    client = get_client()
+    if client is None:
+        raise RuntimeError("OpenAI API key not configured")
+
+    return client.audio.speech.with_streaming_response.create(
+        model=TTS_MODEL,
+        voice=voice,
+        input=text,
+        response_format=response_format,
+        timeout=_timeout(TTS_TIMEOUT),
+    )
+
+
+async def synthesize(text: str, voice: str, response_format: str) -> AsyncIterator[bytes]:
+    """
+    Yield TTS audio chunks (at most TTS_CHUNK_SIZE bytes) as they arrive.
+    Closing the generator early closes the upstream response.
+    """
+    async with speech_stream(text, voice=voice, response_format=response_format) as response:
+        async for chunk in response.iter_bytes(TTS_CHUNK_SIZE):
+            if chunk:
+                yield chunk
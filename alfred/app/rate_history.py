@@ -0,0 +1,141 @@
+"""
+Append-only history of staff daily rates.
+
+Anything that changes a rate calls `record_change()` before committing, so
+the Staff update and its history row land in one transaction. Each row
+holds the rate before and after the change. Staff whose rate never
+changed (bulk imports, rows older than this table) need no rows at all.
+
+The rate as of time T is:
+  - the `daily_rate` of the last change at or before T, else
+  - the `previous_rate` of the first change after T, else
+  - the current `Staff.current_daily_rate`.
+Staff created after T have no rate yet.
+
+Each lookup is a seek on the (staff_id, effective_at) index. Department
+queries first find staff through the `department_key` index, so they use
+each person's current department.
+"""
+from datetime import UTC, date, datetime, time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+from .models import search_key
+
+CHANGES_LIMIT = 500
+_ID_CHUNK = 500
+
+
+def record_change(
+    db: Session, staff: models.Staff, new_rate: Optional[float], effective_at: Optional[datetime] = None
+) -> models.StaffRateHistory:
+    """Set `staff`'s rate and add its history row; the caller commits both."""
+    entry = models.StaffRateHistory(
+        staff_id=staff.id,
+        previous_rate=staff.current_daily_rate,
+        daily_rate=new_rate,
+        effective_at=effective_at or datetime.now(UTC),
+    )
+    staff.current_daily_rate = new_rate
+    db.add(entry)
+    return entry
+
+
+def parse_bound(text: str, end: bool = False) -> datetime:
+    """
+    An ISO date or datetime. A bare date means the start of that day, or
+    its last instant when `end` is true (so "as of 2026-01-31" covers the
+    whole day).
+    """
+    text = text.strip()
+    if len(text) == 10:
+        day = date.fromisoformat(text)
+        return datetime.combine(day, time.max if end else time.min)
+    return datetime.fromisoformat(text)
+
+
+def _scope(query, staff_id: Optional[int], department: Optional[str]):
+    if staff_id is not None:
+        return query.where(models.Staff.id == staff_id)
+    if department:
+        return query.where(models.Staff.department_key == search_key(department))
+    raise ValueError("a staff member or a department is required")
+
+
+def rates_as_of(
+    db: Session, at: datetime, staff_id: Optional[int] = None, department: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Rate of one person, or everyone in a department, at `at` (staff hired later are left out)."""
+    s, h = models.Staff, models.StaffRateHistory
+    before = (
+        select(h.id).where(h.staff_id == s.id, h.effective_at <= at)
+        .order_by(h.effective_at.desc(), h.id.desc()).limit(1).scalar_subquery()
+    )
+    after = (
+        select(h.id).where(h.staff_id == s.id, h.effective_at > at)
+        .order_by(h.effective_at, h.id).limit(1).scalar_subquery()
+    )
+    query = _scope(
+        select(s.id, s.full_name, s.department, s.current_daily_rate, before, after)
+        .where(or_(s.created_at.is_(None), s.created_at <= at))
+        .order_by(s.id),
+        staff_id, department,
+    )
+    rows = db.execute(query).all()
+
+    entry_ids = [i for row in rows for i in row[4:] if i is not None]
+    entries: Dict[int, Tuple[Optional[float], Optional[float]]] = {}
+    for start in range(0, len(entry_ids), _ID_CHUNK):
+        chunk = entry_ids[start:start + _ID_CHUNK]
+        entries.update(
+            (i, (rate, previous))
+            for i, rate, previous in db.execute(select(h.id, h.daily_rate, h.previous_rate).where(h.id.in_(chunk)))
+        )
+
+    result = []
+    for id_, name, dept, current, before_id, after_id in rows:
+        if before_id is not None:
+            rate = entries[before_id][0]
+        elif after_id is not None:
+            rate = entries[after_id][1]
+        else:
+            rate = current
+        result.append({"staff_id": id_, "full_name": name, "department": dept, "daily_rate": rate})
+    return result
+
+
+def changes_between(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    staff_id: Optional[int] = None,
+    department: Optional[str] = None,
+    limit: int = CHANGES_LIMIT,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """Rate changes with start <= effective_at <= end, oldest first; (changes, truncated)."""
+    s, h = models.Staff, models.StaffRateHistory
+    query = _scope(
+        select(h.staff_id, s.full_name, s.department, h.previous_rate, h.daily_rate, h.effective_at)
+        .join(s, s.id == h.staff_id)
+        .where(h.effective_at >= start, h.effective_at <= end)
+        .order_by(h.effective_at, h.id)
+        .limit(limit + 1),
+        staff_id, department,
+    )
+    rows = db.execute(query).all()
+    changes = [
+        {
+            "staff_id": id_,
+            "full_name": name,
+            "department": dept,
+            "previous_rate": previous,
+            "daily_rate": rate,
+            "effective_at": effective_at.isoformat(),
+        }
+        for id_, name, dept, previous, rate, effective_at in rows[:limit]
+    ]
+    return changes, len(rows) > limit
+
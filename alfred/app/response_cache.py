@@ -0,0 +1,58 @@
+"""
+Opt-in cache of chat replies for repeated questions.
+
+Staff ask the same things all day ("how many staff do we have"), and each
+one is a full completion round-trip. Replies are cached under a hash of
+the normalized message, the business-context version, the system prompt
+and the chat model. Every staff write bumps the context version (see
+`business_context`), so answers computed before a write are never served
+after it: they are simply unreachable and age out of the LRU.
+
+Entries live in a `KeyedCache`: an in-memory LRU with a TTL, and
+optionally the shared state backend so every worker benefits. The cache ignores conversation
+history, which is why it is off by default (`ALFRED_RESPONSE_CACHE=true`):
+it suits deployments where most questions stand on their own.
+"""
+import hashlib
+import json
+import os
+import re
+from typing import Optional
+
+from .keyed_cache import KeyedCache
+from .state import StateBackend
+
+_SPACE = re.compile(r"\s+")
+_TRAILING = re.compile(r"[\s?!.]+$")
+
+
+def normalize(text: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive form of `text`."""
+    return _TRAILING.sub("", _SPACE.sub(" ", text.strip().lower()))
+
+
+def make_key(text: str, context_version: int, system_prompt: str, model: str) -> str:
+    payload = json.dumps([normalize(text), context_version, system_prompt, model], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(KeyedCache):
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0, shared: Optional[StateBackend] = None):
+        super().__init__("reply", max_entries, ttl, shared)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.fetch(key)
+
+    async def put(self, key: str, reply: str) -> None:
+        if reply.strip():
+            await self.store(key, reply)
+
+
+def cache_from_env(shared: Optional[StateBackend] = None) -> Optional[ResponseCache]:
+    if os.getenv("ALFRED_RESPONSE_CACHE", "false").lower() != "true":
+        return None
+    return ResponseCache(
+        max_entries=int(os.getenv("ALFRED_RESPONSE_CACHE_MAX", "1024")),
+        ttl=float(os.getenv("ALFRED_RESPONSE_CACHE_TTL", "600")),
+        shared=shared,
+    )
@@ -0,0 +1,281 @@
+"""
+Local retrieval over each user's long-term conversation history.
+
+Every stored turn is embedded with feature hashing (word unigrams and
+bigrams hashed into `dim` signed buckets, L2-normalized), so there is no
+model or vocabulary to ship. Vectors live in per-user memory-mapped
+arrays under `ALFRED_RETRIEVAL_DIR`:
+
+  <user>.vec   float32 [capacity, dim]   one row per turn
+  <user>.seq   int64   [capacity]        the turn's seq (0 = empty row)
+  database     sha256 of the database URL the rows were indexed from
+
+Rows are appended in seq order; a row counts once its seq is written
+(vector first, seq second), so a crash never exposes a half-written row.
+Capacity doubles as needed. A query is one matrix-vector product over the
+user's rows plus an argpartition for the top k.
+
+Seqs only mean something for the database they came from, so an index
+opened for another database (a changed DATABASE_URL, a shared directory)
+drops every user's files and is rebuilt from the new one.
+
+The conversation_turns table stays the source of truth. `sync` indexes the
+turns stored since the last indexed one (usually just the previous turn;
+everything on first use, or turns recorded by other workers), and is run
+before each query. Writers take an advisory file lock where `fcntl` is
+available so workers on one host can share a directory.
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+DEFAULT_DIM = 128  # 128 float32s per turn: ~60 MB and a few ms per query at 120k turns
+INITIAL_CAPACITY = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+def embed(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """Hashed bag of unigrams + bigrams, L2-normalized (all zeros for no words)."""
+    words = _WORD.findall(text.lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    vec = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vec
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, hashes % dim, signs)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def turn_text(user: str, alfred: str) -> str:
+    return f"{user}\n{alfred}"
+
+
+class _FileLock:
+    """Exclusive advisory lock on `path` (a no-op without fcntl)."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._fh = open(self.path, "a+")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+
+class _UserIndex:
+    def __init__(self, base: Path, dim: int):
+        self.dim = dim
+        self.vec_path = base.with_suffix(".vec")
+        self.seq_path = base.with_suffix(".seq")
+        self.file_lock = _FileLock(base.with_suffix(".lock"))
+        self.lock = threading.Lock()
+        self.vectors: Optional[np.memmap] = None
+        self.seqs: Optional[np.memmap] = None
+        self._mapped_size = -1
+
+    def _map(self) -> None:
+        """(Re)map the files if they are new or were grown by another writer."""
+        size = self.seq_path.stat().st_size if self.seq_path.exists() else 0
+        if size == self._mapped_size:
+            return
+        if size == 0:
+            self.vectors = self.seqs = None
+            self._mapped_size = 0
+            return
+        capacity = size // 8
+        if self.vec_path.stat().st_size != capacity * self.dim * 4:
+            # Written with another `dim`: start over (sync rebuilds it)
+            self.reset()
+            self._mapped_size = 0
+            return
+        self.seqs = np.memmap(self.seq_path, dtype=np.int64, mode="r+", shape=(capacity,))
+        self.vectors = np.memmap(self.vec_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._mapped_size = size
+
+    def _grow(self, needed: int) -> None:
+        capacity = 0 if self.seqs is None else len(self.seqs)
+        if needed <= capacity:
+            return
+        new_capacity = max(INITIAL_CAPACITY, capacity)
+        while new_capacity < needed:
+            new_capacity *= 2
+        self.vectors = self.seqs = None  # release the old mappings first
+        for path, row_bytes in ((self.vec_path, self.dim * 4), (self.seq_path, 8)):
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * row_bytes)
+        self._mapped_size = -1
+        self._map()
+
+    def reset(self) -> None:
+        self.vectors = self.seqs = None
+        self.vec_path.unlink(missing_ok=True)
+        self.seq_path.unlink(missing_ok=True)
+        self._mapped_size = -1
+
+    def view(self) -> Tuple[int, Optional[np.ndarray], Optional[np.ndarray]]:
+        """(row count, vectors, seqs) as currently on disk."""
+        self._map()
+        if self.seqs is None:
+            return 0, None, None
+        return int(np.count_nonzero(self.seqs)), self.vectors, self.seqs
+
+    def last_seq(self) -> int:
+        count, _, seqs = self.view()
+        return int(seqs[count - 1]) if count else 0
+
+    def extend(self, rows: List[Tuple[int, np.ndarray]]) -> int:
+        """Append (seq, vector) rows newer than the last stored seq; returns rows added."""
+        count, _, seqs = self.view()
+        last = int(seqs[count - 1]) if count else 0
+        rows = [(seq, vec) for seq, vec in rows if seq > last]
+        if not rows:
+            return 0
+        self._grow(count + len(rows))
+        end = count + len(rows)
+        self.vectors[count:end] = np.stack([vec for _, vec in rows])
+        self.vectors.flush()
+        self.seqs[count:end] = [seq for seq, _ in rows]
+        self.seqs.flush()
+        return len(rows)
+
+
+def database_identity(url: str) -> str:
+    """What the index stores to recognise its database (a hash, so no credentials land on disk)."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class RetrievalIndex:
+    def __init__(
+        self, directory: str, dim: int = DEFAULT_DIM, max_open: int = 1000, database: Optional[str] = None,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.max_open = max_open
+        self._open: "OrderedDict[str, _UserIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.indexed = 0
+        self.queries = 0
+        if database is not None:
+            self._claim(database_identity(database))
+
+    def _claim(self, identity: str) -> None:
+        """Drop the indexed rows if they were built from another database."""
+        marker = self.directory / "database"
+        with _FileLock(self.directory / "database.lock"):
+            try:
+                current = marker.read_text().strip()
+            except FileNotFoundError:
+                current = None
+            if current == identity:
+                return
+            if current is not None:
+                for path in self.directory.iterdir():
+                    if path.suffix in (".vec", ".seq"):
+                        path.unlink(missing_ok=True)
+            marker.write_text(identity)
+
+    def _index(self, user_id: str) -> _UserIndex:
+        with self._lock:
+            index = self._open.get(user_id)
+            if index is None:
+                name = hashlib.sha256(user_id.encode("utf-8")).hexdigest()[:32]
+                index = self._open[user_id] = _UserIndex(self.directory / name, self.dim)
+                while len(self._open) > self.max_open:
+                    self._open.popitem(last=False)
+            self._open.move_to_end(user_id)
+            return index
+
+    def sync(self, user_id: str, store, chunk: int = 1000) -> int:
+        """Index every stored turn newer than the last indexed one; returns rows added."""
+        index = self._index(user_id)
+        total = 0
+        with index.lock, index.file_lock:
+            last = index.last_seq()
+            latest = store.latest_seq(user_id) or 0
+            if latest == last:
+                return 0
+            if latest < last:
+                # The store was reset under us: reindex from scratch
+                index.reset()
+                last = 0
+            while True:
+                rows = store.since(user_id, last, chunk)
+                if not rows:
+                    break
+                total += index.extend([
+                    (seq, embed(turn_text(user, alfred), self.dim)) for seq, user, alfred in rows
+                ])
+                last = rows[-1][0]
+                if len(rows) < chunk:
+                    break
+        self.indexed += total
+        return total
+
+    def search(
+        self, user_id: str, query: str, k: int = 3,
+        before: Optional[int] = None, min_score: float = 0.2,
+    ) -> List[Tuple[int, float]]:
+        """Top `k` (seq, cosine score) turns for `query`, best first, with seq < `before`."""
+        self.queries += 1
+        q = embed(query, self.dim)
+        if k <= 0 or not q.any():
+            return []
+        index = self._index(user_id)
+        with index.lock:
+            count, vectors, seqs = index.view()
+            if not count:
+                return []
+            if before is not None:
+                count = int(np.searchsorted(seqs[:count], before))  # seqs ascend
+            if not count:
+                return []
+            scores = vectors[:count] @ q
+            seq_values = np.asarray(seqs[:count])
+        top = np.argpartition(-scores, k)[:k] if count > k else np.arange(count)
+        top = top[np.argsort(-scores[top])]
+        return [(int(seq_values[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            open_users = len(self._open)
+        return {
+            "dim": self.dim,
+            "open_users": open_users,
+            "indexed": self.indexed,
+            "queries": self.queries,
+        }
+
+
+def index_from_env(database: Optional[str] = None) -> Optional[RetrievalIndex]:
+    """RetrievalIndex for `database` configured from ALFRED_RETRIEVAL*, or None when disabled."""
+    if os.getenv("ALFRED_RETRIEVAL", "true").lower() != "true":
+        return None
+    return RetrievalIndex(
+        os.getenv("ALFRED_RETRIEVAL_DIR", ".alfred_cache/retrieval"),
+        dim=int(os.getenv("ALFRED_RETRIEVAL_DIM", str(DEFAULT_DIM))),
+        database=database,
+    )
@@ -5,16 +5,26 @@ from typing import List, Dict
 class ChatRequest(BaseModel):
     user_id: str = "default"   # later: different users/devices
     message: str
+    speak: bool = False        # pre-synthesize the reply audio (see ChatResponse.audio_handle)
 
 
 class ChatMessage(BaseModel):
     user: str
     alfred: str
+    seq: int | None = None     # position in the user's history (the sync cursor)
 
 
 class ChatResponse(BaseModel):
     reply: str
-    history: List[ChatMessage]
+    history: List[ChatMessage]       # only the turn just added; older turns via GET /history
+    cursor: int | None = None        # pass as GET /history?since= to sync from here
+    audio_handle: str | None = None  # GET /tts/{audio_handle} when speak=True
+
+
+class HistoryPage(BaseModel):
+    turns: List[ChatMessage]
+    cursor: int | None = None  # seq of the last turn returned (request the next page with since=cursor)
+    has_more: bool = False
 
 
 class TTSRequest(BaseModel):
@@ -0,0 +1,140 @@
+"""
+Speculative TTS pre-synthesis.
+
+When a client opts in (`ChatRequest.speak`), /chat starts synthesizing the
+reply in a background task as soon as `think()` returns and hands back an
+audio handle. `GET /tts/{handle}` (or a `/tts` call for the same text)
+attaches to the in-flight or finished audio instead of starting over.
+
+Jobs are bounded (`max_jobs`) and unclaimed audio is dropped after `ttl`
+seconds, by a periodic sweep (`sweep_forever`, run from the app lifespan)
+as well as on every start/claim. A claimed job leaves the registry, so each handle plays once.
+"""
+import asyncio
+import secrets
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+
+class AudioJob:
+    def __init__(self, handle: str, key: str, fmt: str):
+        self.handle = handle
+        self.key = key
+        self.fmt = fmt
+        self.created_at = time.monotonic()
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def run(self, chunks: AsyncIterator[bytes]) -> None:
+        try:
+            async for chunk in chunks:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Speculative TTS error: {e}")
+            self.error = str(e)
+        finally:
+            self.done = True
+            self._notify()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """Yield every chunk produced so far, then new ones until synthesis ends."""
+        sent = 0
+        while True:
+            changed = self._changed
+            if sent < len(self.chunks):
+                chunk = self.chunks[sent]
+                sent += 1
+                yield chunk
+                continue
+            if self.done:
+                return
+            await changed.wait()
+
+
+class SpeculativeTTS:
+    def __init__(self, max_jobs: int = 32, ttl: float = 60.0):
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self._jobs: Dict[str, AudioJob] = {}
+        self._by_key: Dict[str, str] = {}
+        self.started = 0
+        self.claimed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def start(self, key: str, fmt: str, make_chunks: Callable[[], AsyncIterator[bytes]]) -> Optional[str]:
+        """
+        Begin synthesizing in the background and return a handle, or None
+        if the queue is full. `make_chunks` is only called for a new job, so
+        a duplicate or rejected request never opens an upstream stream or a
+        cache file. Must be called from a running event loop.
+        """
+        self.sweep()
+        if key in self._by_key:
+            return self._by_key[key]
+        if len(self._jobs) >= self.max_jobs:
+            self.rejected += 1
+            return None
+
+        handle = secrets.token_urlsafe(12)
+        job = AudioJob(handle, key, fmt)
+        job.task = asyncio.create_task(job.run(make_chunks()))
+        self._jobs[handle] = job
+        self._by_key[key] = handle
+        self.started += 1
+        return handle
+
+    def _pop(self, handle: str) -> Optional[AudioJob]:
+        job = self._jobs.pop(handle, None)
+        if job is not None:
+            self._by_key.pop(job.key, None)
+        return job
+
+    def claim(self, handle: str) -> Optional[AudioJob]:
+        """Take ownership of a job by handle (each handle can be claimed once)."""
+        self.sweep()
+        job = self._pop(handle)
+        if job is not None:
+            self.claimed += 1
+        return job
+
+    def claim_key(self, key: str) -> Optional[AudioJob]:
+        """Take ownership of the job synthesizing this cache key, if any."""
+        handle = self._by_key.get(key)
+        return self.claim(handle) if handle else None
+
+    def sweep(self) -> None:
+        """Drop unclaimed jobs older than the TTL, cancelling unfinished ones."""
+        cutoff = time.monotonic() - self.ttl
+        for handle in [h for h, job in self._jobs.items() if job.created_at < cutoff]:
+            job = self._pop(handle)
+            if job.task is not None and not job.task.done():
+                job.task.cancel()
+            self.dropped += 1
+
+    async def sweep_forever(self, interval: Optional[float] = None) -> None:
+        """Sweep every `interval` seconds (TTL/2 by default), so an idle worker frees expired audio."""
+        while True:
+            await asyncio.sleep(interval or max(self.ttl / 2, 1.0))
+            self.sweep()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._jobs),
+            "max_jobs": self.max_jobs,
+            "started": self.started,
+            "claimed": self.claimed,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,72 @@
+"""
+Streaming staff export as CSV or NDJSON.
+
+Rows are fetched with `yield_per`, which streams results from a
+server-side cursor where the driver supports one, and are written out one
+partition (`chunk` rows) at a time. Memory stays flat however large the
+table is. Columns use the same names `staff_import` accepts, so an export
+can be imported again (`id` and `created_at` are ignored on import).
+"""
+import csv
+import io
+import json
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import models
+from .models import search_key
+
+CHUNK = 1000
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+COLUMNS = ("id", "full_name", "role", "department", "daily_rate", "status", "created_at")
+
+
+def _statement(department: Optional[str]):
+    staff = models.Staff.__table__
+    statement = select(
+        staff.c.id, staff.c.full_name, staff.c.role, staff.c.department,
+        staff.c.current_daily_rate, staff.c.status, staff.c.created_at,
+    ).order_by(staff.c.id)
+    if department:
+        statement = statement.where(staff.c.department_key == search_key(department))
+    return statement
+
+
+def _value(value: Any) -> Any:
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    fmt: str = "csv",
+    department: Optional[str] = None,
+    chunk: int = CHUNK,
+) -> Iterator[str]:
+    """
+    Text chunks of the export. The session is opened on first iteration and
+    closed when the stream ends, so the generator can outlive the request
+    handler that created it.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == "csv":
+        writer.writerow(COLUMNS)
+
+    with session_factory() as db:
+        result = db.execute(_statement(department).execution_options(yield_per=chunk))
+        for rows in result.partitions():
+            if fmt == "csv":
+                writer.writerows([_value(v) for v in row] for row in rows)
+            else:
+                for row in rows:
+                    buffer.write(json.dumps(dict(zip(COLUMNS, map(_value, row))), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()  # CSV header of an empty export
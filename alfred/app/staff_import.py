@@ -0,0 +1,264 @@
+"""
+Bulk staff import from CSV or NDJSON.
+
+Rows are read one at a time from a text stream, validated, and inserted in
+batches of `batch_size` with one executemany INSERT and one commit per
+batch. Only the current batch and the first `max_errors` error reports are
+held in memory, so memory stays flat however large the file is.
+
+CSV needs a header row. NDJSON has one JSON object per line. Accepted
+columns (case-insensitive):
+
+  full_name (or name)                        required
+  role, department (or dept)                 optional
+  daily_rate (or current_daily_rate, rate)   optional, a non-negative number
+  status                                     optional, default "active"
+
+A bad row is reported by its line number and skipped; the other rows are
+still imported. The business-context snapshot is rebuilt once at the end
+instead of being updated per row.
+
+If the file cannot be read further (bad encoding) or a batch fails to
+insert, the import stops and the report says where: `aborted` gives the
+stage ("read" or "write"), the error and the rows that were not saved.
+`inserted` still counts the batches committed before that. With
+`atomic=True` all batches share one transaction, so a failure saves
+nothing.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from . import models
+from .business_context import context_snapshot
+from .models import search_key
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+FORMATS = ("csv", "ndjson")
+
+ALIASES = {
+    "full_name": "full_name", "name": "full_name", "fullname": "full_name",
+    "role": "role", "position": "role",
+    "department": "department", "dept": "department",
+    "daily_rate": "current_daily_rate", "current_daily_rate": "current_daily_rate",
+    "rate": "current_daily_rate", "dailyrate": "current_daily_rate",
+    "status": "status",
+}
+LIMITS = {"full_name": 200, "role": 100, "department": 100, "status": 50}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole cannot be read (unknown format, no CSV header)."""
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    failed: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)  # first MAX_ERRORS {"row", "error"}
+    errors_truncated: bool = False
+    # {"stage", "error", "first_row", "last_row"}: rows from first_row on were not saved
+    aborted: Optional[Dict[str, Any]] = None
+
+    def add_error(self, row: int, error: str, max_errors: int) -> None:
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append({"row": row, "error": error})
+        else:
+            self.errors_truncated = True
+
+    def summary(self) -> str:
+        lines = [f"Imported {self.inserted} staff, {self.failed} rows rejected."]
+        lines += [f"- row {e['row']}: {e['error']}" for e in self.errors[:10]]
+        if self.failed > 10:
+            lines.append(f"... and {self.failed - 10} more")
+        if self.aborted:
+            a = self.aborted
+            lines.append(f"Stopped after row {a['last_row']} ({a['error']}); rows from {a['first_row']} on were not imported.")
+        return "\n".join(lines)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+            "aborted": self.aborted,
+        }
+
+
+def detect_format(filename: Optional[str], first_line: str) -> str:
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return "ndjson" if first_line.lstrip().startswith("{") else "csv"
+
+
+def iter_records(stream: Iterable[str], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """(line number, raw record) pairs; NDJSON lines that fail to parse yield an error string."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream, skipinitialspace=True)
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV file has no header row")
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "ndjson":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, f"invalid JSON: {e}"
+    else:
+        raise ImportFormatError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+
+
+@lru_cache(maxsize=256)
+def _column(key: Any) -> Optional[str]:
+    return ALIASES.get(str(key or "").strip().lower().replace(" ", "_"))
+
+
+def validate(record: Any) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(insert values, None) for a good record, else (None, reason)."""
+    if isinstance(record, str):
+        return None, record
+    if not isinstance(record, dict):
+        return None, "expected an object with staff fields"
+
+    values: Dict[str, Any] = {}
+    for key, value in record.items():
+        column = _column(key)
+        if column is None or value is None:
+            continue
+        values[column] = value.strip() if isinstance(value, str) else value
+
+    if not values.get("full_name"):
+        return None, "full_name is required"
+    for column, limit in LIMITS.items():
+        value = values.get(column)
+        if value in (None, ""):
+            values[column] = None
+            continue
+        if not isinstance(value, str):
+            return None, f"{column} must be text"
+        if len(value) > limit:
+            return None, f"{column} is longer than {limit} characters"
+
+    rate = values.get("current_daily_rate")
+    if rate in (None, ""):
+        values["current_daily_rate"] = None
+    else:
+        try:
+            rate = float(str(rate).replace(",", ""))
+        except ValueError:
+            return None, f"invalid daily_rate {rate!r}"
+        if rate < 0 or rate != rate:
+            return None, f"invalid daily_rate {rate!r}"
+        values["current_daily_rate"] = rate
+
+    values["status"] = values.get("status") or "active"
+    values["name_key"] = search_key(values["full_name"])
+    values["department_key"] = search_key(values["department"])
+    return values, None
+
+
+def import_records(
+    db: Session,
+    records: Iterable[Tuple[int, Any]],
+    batch_size: int = BATCH_SIZE,
+    max_errors: int = MAX_ERRORS,
+    atomic: bool = False,
+) -> ImportReport:
+    """
+    Validate and insert `records` in batches: one commit per batch, or one
+    for the whole import when `atomic`. A read or insert failure stops the
+    import and is recorded in `report.aborted` instead of raised.
+    """
+    report = ImportReport()
+    batch: List[Dict[str, Any]] = []
+    written = 0  # rows inserted but not yet committed (atomic mode)
+    first_row = None  # first row not yet committed
+    last_row = 0
+    # Core executemany: no ORM objects or per-row defaults
+    statement = insert(models.Staff.__table__)
+
+    def flush() -> None:
+        nonlocal written, first_row
+        created_at = datetime.now(UTC)
+        for values in batch:
+            values["created_at"] = created_at
+        db.connection().execute(statement, batch)
+        written += len(batch)
+        batch.clear()
+        if not atomic:
+            db.commit()
+            report.inserted += written
+            written, first_row = 0, None
+
+    stage = "read"
+    try:
+        for row, record in records:
+            last_row = row
+            if first_row is None:
+                first_row = row
+            values, error = validate(record)
+            if error:
+                report.add_error(row, error, max_errors)
+                continue
+            batch.append(values)
+            if len(batch) >= batch_size:
+                stage = "write"
+                flush()
+                stage = "read"
+        stage = "write"
+        if batch:
+            flush()
+        if atomic:
+            db.commit()
+            report.inserted, written = written, 0
+    except (SQLAlchemyError, UnicodeDecodeError, csv.Error) as e:
+        report.aborted = {
+            "stage": stage,
+            "error": str(e).splitlines()[0],
+            "first_row": first_row if first_row is not None else last_row + 1,
+            "last_row": last_row,
+        }
+    finally:
+        db.rollback()  # uncommitted rows; committed batches stay
+        if report.inserted:
+            context_snapshot.invalidate()
+    return report
+
+
+def import_stream(
+    db: Session,
+    stream: Iterable[str],
+    fmt: Optional[str] = None,
+    filename: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    max_errors: int = MAX_ERRORS,
+    atomic: bool = False,
+) -> ImportReport:
+    """Import a CSV/NDJSON text stream (`fmt` is detected when not given)."""
+    if fmt is None:
+        lines = iter(stream)
+        first = next(lines, "")
+        fmt = detect_format(filename, first)
+        stream = _prepend(first, lines)
+    return import_records(db, iter_records(stream, fmt.lower()), batch_size, max_errors, atomic)
+
+
+def _prepend(first: str, stream: Iterator[str]) -> Iterator[str]:
+    yield first
+    yield from stream
@@ -0,0 +1,244 @@
+"""
+Indexed staff name lookups with "did you mean" suggestions, and keyset
+pages of staff for listing.
+
+`staff.name_key` and `staff.department_key` hold `models.search_key()` of
+the name and department: lowercased, accent-folded, punctuation-free. They
+are B-tree indexed, so exact lookups are one index probe rather than the
+full scan an `ilike()` filter costs.
+
+For typos, SQLite gets an FTS5 trigram table (`staff_name_fts`) over
+`name_key`, kept in sync by triggers on `staff`. Bulk inserts and raw SQL
+writes are indexed too. A fuzzy lookup ORs the query's rarest trigrams
+(document counts from `fts5vocab`, added until FTS_DOC_BUDGET postings;
+very common ones like "per" in a table full of Perezes say little about
+the match), ranks at most FTS_MATCH_LIMIT of the matching rows, and
+re-ranks the best FTS_CANDIDATES by edit similarity in Python. Ranking
+costs time per row, so the cap keeps a lookup at about 2 ms at 100k staff
+however many names share a trigram. The document counts are cached per
+engine for FTS_VOCAB_TTL seconds, since reading `fts5vocab` costs a scan
+of the index. Without FTS5 (other databases, older SQLite) candidates come
+from an index range scan on the first letters of the name instead.
+"""
+import difflib
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, inspect, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import models
+from .models import search_key
+
+FTS_TABLE = "staff_name_fts"
+FTS_VOCAB = "staff_name_fts_vocab"
+FTS_CANDIDATES = 50
+FTS_DOC_BUDGET = 5000  # trigram postings matched per fuzzy lookup
+FTS_MATCH_LIMIT = 200  # of those, rows ranked
+FTS_VOCAB_TTL = 60.0
+PREFIX_CANDIDATES = 200
+MIN_SIMILARITY = 0.6
+BACKFILL_BATCH = 1000
+PAGE_SIZE = 50
+
+_FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name_key, content='staff', content_rowid='id', tokenize='trigram')",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_VOCAB} USING fts5vocab({FTS_TABLE}, 'row')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON staff BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.id, new.name_key); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON staff BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.id, old.name_key); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name_key ON staff BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name_key) VALUES ('delete', old.id, old.name_key); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name_key) VALUES (new.id, new.name_key); END",
+]
+
+
+def ensure_schema(engine: Engine) -> None:
+    """
+    Bring an existing `staff` table up to date: add and backfill the key
+    columns if they are missing, and on SQLite create the trigram table
+    and its triggers (filled from existing rows the first time).
+    """
+    inspector = inspect(engine)
+    if not inspector.has_table("staff"):
+        return
+    columns = {c["name"] for c in inspector.get_columns("staff")}
+    with engine.begin() as conn:
+        for column in ("name_key", "department_key"):
+            if column not in columns:
+                length = models.Staff.__table__.c[column].type.length
+                conn.execute(text(f"ALTER TABLE staff ADD COLUMN {column} VARCHAR({length})"))
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_staff_{column} ON staff ({column})"))
+        _backfill_keys(conn)
+
+    if engine.dialect.name != "sqlite":
+        return
+    fts_existed = inspector.has_table(FTS_TABLE)
+    try:
+        with engine.begin() as conn:
+            for ddl in _FTS_DDL:
+                conn.execute(text(ddl))
+            if not fts_existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except Exception as e:
+        # SQLite without FTS5 / the trigram tokenizer (< 3.34): prefix fallback
+        print(f"Note: staff name fuzzy index unavailable ({e}); using prefix candidates.")
+
+
+def _backfill_keys(conn) -> None:
+    staff = models.Staff.__table__
+    rows = conn.execute(
+        select(staff.c.id, staff.c.full_name, staff.c.department).where(
+            ((staff.c.name_key.is_(None)) & staff.c.full_name.isnot(None))
+            | ((staff.c.department_key.is_(None)) & staff.c.department.isnot(None))
+        )
+    ).all()
+    update = text("UPDATE staff SET name_key = :name_key, department_key = :department_key WHERE id = :id")
+    for start in range(0, len(rows), BACKFILL_BATCH):
+        conn.execute(update, [
+            {"id": id_, "name_key": search_key(name), "department_key": search_key(department)}
+            for id_, name, department in rows[start:start + BACKFILL_BATCH]
+        ])
+
+
+def find_by_name(db: Session, full_name: str) -> Optional[models.Staff]:
+    """Staff whose name matches ignoring case, accents and punctuation (index lookup)."""
+    return (
+        db.query(models.Staff)
+        .filter(models.Staff.name_key == search_key(full_name))
+        .order_by(models.Staff.id)
+        .first()
+    )
+
+
+@dataclass
+class StaffPage:
+    staff: List[models.Staff]
+    total: int                 # matching staff across all pages
+    start: int                 # 1-based position of staff[0]
+    cursor: Optional[int]      # id to continue after; None on the last page
+
+
+def list_page(
+    db: Session,
+    department: Optional[str] = None,
+    after: int = 0,
+    page: Optional[int] = None,
+    limit: int = PAGE_SIZE,
+) -> StaffPage:
+    """
+    One page of staff in id order, optionally in one department. Pages are
+    keyset-based: rows with id > `after`. A `page` number is turned into
+    its `after` id with an index-only offset scan over ids, so no full
+    rows are read for the pages skipped.
+    """
+    where = [models.Staff.department_key == search_key(department)] if department else []
+    ids = select(models.Staff.id).where(*where).order_by(models.Staff.id)
+    total = db.scalar(select(func.count()).select_from(ids.subquery()))
+    if page is not None and page > 1:
+        after = db.scalar(ids.offset((page - 1) * limit - 1).limit(1))
+        if after is None:  # past the last page
+            return StaffPage(staff=[], total=total, start=(page - 1) * limit + 1, cursor=None)
+    start = 1 + (db.scalar(select(func.count()).select_from(ids.where(models.Staff.id <= after).subquery()))
+                 if after else 0)
+    rows = (
+        db.query(models.Staff)
+        .filter(*where, models.Staff.id > after)
+        .order_by(models.Staff.id)
+        .limit(limit + 1)
+        .all()
+    )
+    staff = rows[:limit]
+    return StaffPage(staff=staff, total=total, start=start, cursor=staff[-1].id if len(rows) > limit else None)
+
+
+def _has_fts(db: Session) -> bool:
+    if db.get_bind().dialect.name != "sqlite":
+        return False
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first() is not None
+
+
+_doc_counts: "weakref.WeakKeyDictionary[Engine, Tuple[float, Dict[str, int]]]" = weakref.WeakKeyDictionary()
+
+
+def _trigram_doc_counts(db: Session) -> Dict[str, int]:
+    engine = db.get_bind()
+    cached = _doc_counts.get(engine)
+    if cached is not None and time.monotonic() - cached[0] < FTS_VOCAB_TTL:
+        return cached[1]
+    counts = dict(db.execute(text(f"SELECT term, doc FROM {FTS_VOCAB}")).all())
+    _doc_counts[engine] = (time.monotonic(), counts)
+    return counts
+
+
+def _rarest(db: Session, grams: List[str]) -> List[str]:
+    doc_counts = _trigram_doc_counts(db)
+    # A trigram unknown to the cached counts may belong to a name added since; try it first
+    counts = [(g, doc_counts.get(g, 0)) for g in grams]
+    chosen, total = [], 0
+    for term, docs in sorted(counts, key=lambda row: row[1]):
+        if chosen and total + docs > FTS_DOC_BUDGET:
+            break
+        chosen.append(term)
+        total += docs
+    return chosen
+
+
+def _trigram_candidates(db: Session, key: str) -> List[Tuple[str, str]]:
+    grams = _rarest(db, list(dict.fromkeys(key[i:i + 3] for i in range(len(key) - 2))))
+    if not grams:
+        return []
+    query = " OR ".join('"' + g.replace('"', '""') + '"' for g in grams)
+    return db.execute(
+        text(
+            f"SELECT s.full_name, s.name_key FROM (SELECT rowid, rank FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH :query LIMIT :match_limit) f JOIN staff s ON s.id = f.rowid "
+            "ORDER BY f.rank LIMIT :limit"
+        ),
+        {"query": query, "match_limit": FTS_MATCH_LIMIT, "limit": FTS_CANDIDATES},
+    ).all()
+
+
+def _prefix_candidates(db: Session, key: str) -> List[Tuple[str, str]]:
+    prefix = key[:2]
+    column = models.Staff.name_key
+    return db.execute(
+        select(models.Staff.full_name, column)
+        .where(column >= prefix, column < prefix + "￿")
+        .limit(PREFIX_CANDIDATES)
+    ).all()
+
+
+def suggest_names(db: Session, full_name: str, limit: int = 3) -> List[str]:
+    """Closest staff names to `full_name`, best first ("did you mean")."""
+    key = search_key(full_name)
+    if not key:
+        return []
+    candidates = _trigram_candidates(db, key) if len(key) >= 3 and _has_fts(db) else _prefix_candidates(db, key)
+    matcher = difflib.SequenceMatcher(None, b=key)  # indexes `key` once for all candidates
+    scored = {}
+    for name, candidate_key in candidates:
+        matcher.set_seq1(candidate_key or "")
+        if matcher.quick_ratio() < MIN_SIMILARITY:
+            continue
+        score = matcher.ratio()
+        if score >= MIN_SIMILARITY and score > scored.get(name, 0.0):
+            scored[name] = score
+    return sorted(scored, key=lambda name: -scored[name])[:limit]
+
+
+def suggest_departments(db: Session, department: str, limit: int = 3) -> List[str]:
+    """Closest existing department names (there are few, so all are compared)."""
+    names = [
+        d for (d,) in db.execute(select(models.Staff.department).distinct()).all() if d
+    ]
+    by_key = {search_key(d): d for d in names}
+    matches = difflib.get_close_matches(search_key(department) or "", list(by_key), n=limit, cutoff=MIN_SIMILARITY)
+    return [by_key[m] for m in matches]
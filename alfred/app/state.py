@@ -0,0 +1,415 @@
+"""
+Pluggable state backends for per-user conversation windows and caches.
+
+With `uvicorn --workers N` (or several nodes) process-local dicts give each
+worker its own view of a user's conversation. These backends put that state
+somewhere every worker can see:
+
+  memory  InProcessState   one process only (the default; LRU-bounded)
+  sqlite  SQLiteState      a SQLite file in WAL mode, shared by workers on one host
+  redis   RedisState       a Redis-compatible server, shared across hosts
+
+All backends store strings (callers serialize) and expose the same small
+interface: get / set (with TTL) / delete / incr for scalar keys, plus
+set_items / append / items for bounded lists. `append` only touches a list
+that already exists, so a list that expired or was evicted is reloaded
+from the source of truth instead of being rebuilt from one entry.
+
+`blocking` tells async callers whether a call may do I/O and should run
+in a worker thread.
+"""
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class StateBackend(ABC):
+    name = "base"
+    blocking = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def set_items(self, key: str, values: List[str], max_len: int, ttl: Optional[float] = None) -> None:
+        """Replace the list at `key` with (the last `max_len` of) `values`."""
+
+    @abstractmethod
+    def append(self, key: str, value: str, max_len: int, ttl: Optional[float] = None) -> bool:
+        """Append to an existing list, keeping the newest `max_len`. False if `key` is absent."""
+
+    @abstractmethod
+    def items(self, key: str) -> Optional[List[str]]:
+        """The list at `key` (oldest first), or None if absent."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class InProcessState(StateBackend):
+    """Process-local state with LRU eviction beyond `max_keys`."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, max_keys: int = 1000):
+        self.max_keys = max_keys
+        self._data: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expired = 0
+
+    def _live(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.monotonic() >= expires_at:
+            del self._data[key]
+            self.expired += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any, ttl: Optional[float], expires_at: Optional[float] = None) -> None:
+        self._data[key] = (value, time.monotonic() + ttl if ttl else expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_keys:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._live(key)
+            return value if isinstance(value, str) else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._live(key) or 0) + 1
+            entry = self._data.get(key)
+            self._store(key, str(value), None, entry[1] if entry else None)
+            return value
+
+    def set_items(self, key: str, values: List[str], max_len: int, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._store(key, deque(values, maxlen=max_len), ttl)
+
+    def append(self, key: str, value: str, max_len: int, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            items = self._live(key)
+            if not isinstance(items, deque):
+                return False
+            items.append(value)
+            if ttl:
+                self._data[key] = (items, time.monotonic() + ttl)
+            return True
+
+    def items(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            items = self._live(key)
+            return list(items) if isinstance(items, deque) else None
+
+    def exists(self, key: str) -> bool:
+        with self._lock:
+            return self._live(key) is not None
+
+    def memory_bytes(self) -> int:
+        """Approximate bytes held by keys, values and their containers."""
+        with self._lock:
+            total = sys.getsizeof(self._data)
+            for key, (value, _) in self._data.items():
+                total += sys.getsizeof(key) + sys.getsizeof(value)
+                if isinstance(value, deque):
+                    total += sum(sys.getsizeof(item) for item in value)
+            return total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            items = sum(len(v) for v, _ in self._data.values() if isinstance(v, deque))
+            keys = len(self._data)
+        return {
+            "backend": self.name,
+            "keys": keys,
+            "max_keys": self.max_keys,
+            "items": items,
+            "approx_bytes": self.memory_bytes(),
+            "evictions": self.evictions,
+            "expired": self.expired,
+        }
+
+
+class SQLiteState(StateBackend):
+    """
+    State in a SQLite file shared by all workers on one host. WAL mode lets
+    readers proceed while one writer commits; writes that must be atomic
+    use BEGIN IMMEDIATE. One connection per thread. Expired rows are
+    purged every `purge_every` writes of expiring keys (reads already skip them), so
+    the table-wide DELETE is not paid on every write.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str, busy_timeout: float = 5.0, purge_every: int = 100):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.purge_every = purge_every
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        self.purges = 0
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with self._tx() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS state_kv ("
+                " key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS state_list ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT, key TEXT NOT NULL, value TEXT NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS ix_state_list_key_seq ON state_list (key, seq)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        return _Transaction(self._conn())
+
+    @staticmethod
+    def _expiry(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    @staticmethod
+    def _alive(db: sqlite3.Connection, key: str) -> Optional[Tuple[Optional[str]]]:
+        row = db.execute(
+            "SELECT value FROM state_kv WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._alive(self._conn(), key)
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        if ttl:
+            self._count_write()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO state_kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, self._expiry(ttl)),
+        )
+
+    def delete(self, key: str) -> None:
+        with self._tx() as db:
+            db.execute("DELETE FROM state_kv WHERE key = ?", (key,))
+            db.execute("DELETE FROM state_list WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        with self._tx() as db:
+            db.execute(
+                "INSERT INTO state_kv (key, value) VALUES (?, '1')"
+                " ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key,),
+            )
+            return int(db.execute("SELECT value FROM state_kv WHERE key = ?", (key,)).fetchone()[0])
+
+    def purge_expired(self) -> None:
+        """Delete expired keys and the lists that belonged to them."""
+        with self._tx() as db:
+            db.execute("DELETE FROM state_kv WHERE expires_at <= ?", (time.time(),))
+            db.execute("DELETE FROM state_list WHERE key NOT IN (SELECT key FROM state_kv)")
+        self.purges += 1
+
+    def _count_write(self) -> None:
+        with self._writes_lock:
+            self._writes += 1
+            due = self.purge_every > 0 and self._writes % self.purge_every == 0
+        if due:
+            self.purge_expired()
+
+    def set_items(self, key: str, values: List[str], max_len: int, ttl: Optional[float] = None) -> None:
+        # Lists are (re)loaded on misses only, so expired ones are tidied up from here
+        self._count_write()
+        with self._tx() as db:
+            db.execute("DELETE FROM state_list WHERE key = ?", (key,))
+            # The kv row (value NULL) marks the list as present and carries its TTL
+            db.execute(
+                "INSERT OR REPLACE INTO state_kv (key, value, expires_at) VALUES (?, NULL, ?)",
+                (key, self._expiry(ttl)),
+            )
+            db.executemany(
+                "INSERT INTO state_list (key, value) VALUES (?, ?)",
+                [(key, value) for value in values[-max_len:]],
+            )
+
+    def append(self, key: str, value: str, max_len: int, ttl: Optional[float] = None) -> bool:
+        with self._tx() as db:
+            if self._alive(db, key) is None:
+                return False
+            db.execute("INSERT INTO state_list (key, value) VALUES (?, ?)", (key, value))
+            db.execute(
+                "DELETE FROM state_list WHERE key = ? AND seq NOT IN"
+                " (SELECT seq FROM state_list WHERE key = ? ORDER BY seq DESC LIMIT ?)",
+                (key, key, max_len),
+            )
+            if ttl:
+                db.execute("UPDATE state_kv SET expires_at = ? WHERE key = ?", (self._expiry(ttl), key))
+            return True
+
+    def items(self, key: str) -> Optional[List[str]]:
+        db = self._conn()
+        if self._alive(db, key) is None:
+            return None
+        rows = db.execute("SELECT value FROM state_list WHERE key = ? ORDER BY seq", (key,)).fetchall()
+        return [value for (value,) in rows]
+
+    def exists(self, key: str) -> bool:
+        return self._alive(self._conn(), key) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._conn()
+        keys = db.execute(
+            "SELECT COUNT(*) FROM state_kv WHERE expires_at IS NULL OR expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+        return {"backend": self.name, "path": self.path, "keys": keys, "purges": self.purges}
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK on an autocommit connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# Redis cannot hold an empty list, so empty windows keep this placeholder
+_EMPTY = "\x00"
+
+
+class RedisState(StateBackend):
+    """
+    State in a Redis-compatible server. `client` is anything with the
+    redis-py methods used here (tests pass a local stand-in); otherwise a
+    client is created from `url` (needs `pip install redis`).
+    """
+
+    name = "redis"
+
+    def __init__(self, client: Any = None, url: str = "redis://localhost:6379/0", prefix: str = "alfred:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("ALFRED_STATE_BACKEND=redis requires the 'redis' package") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _k(self, key: str) -> str:
+        return self.prefix + key
+
+    @staticmethod
+    def _text(value: Any) -> Optional[str]:
+        if value is None:
+            return None
+        return value.decode("utf-8") if isinstance(value, bytes) else str(value)
+
+    @staticmethod
+    def _ttl_ms(ttl: Optional[float]) -> Optional[int]:
+        return max(1, math.ceil(ttl * 1000)) if ttl else None
+
+    def get(self, key: str) -> Optional[str]:
+        return self._text(self.client.get(self._k(key)))
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        self.client.set(self._k(key), value, px=self._ttl_ms(ttl))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self._k(key))
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(self._k(key)))
+
+    def set_items(self, key: str, values: List[str], max_len: int, ttl: Optional[float] = None) -> None:
+        k = self._k(key)
+        pipe = self.client.pipeline()
+        pipe.delete(k)
+        pipe.rpush(k, *(values[-max_len:] or [_EMPTY]))
+        if ttl:
+            pipe.pexpire(k, self._ttl_ms(ttl))
+        pipe.execute()
+
+    def append(self, key: str, value: str, max_len: int, ttl: Optional[float] = None) -> bool:
+        k = self._k(key)
+        pipe = self.client.pipeline()
+        pipe.rpushx(k, value)   # no-op when the list is gone
+        pipe.ltrim(k, -max_len, -1)
+        if ttl:
+            pipe.pexpire(k, self._ttl_ms(ttl))
+        return bool(pipe.execute()[0])
+
+    def items(self, key: str) -> Optional[List[str]]:
+        values = self.client.lrange(self._k(key), 0, -1)
+        if not values:
+            return None
+        return [v for v in (self._text(value) for value in values) if v != _EMPTY]
+
+    def exists(self, key: str) -> bool:
+        return bool(self.client.exists(self._k(key)))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "prefix": self.prefix}
+
+
+def state_from_env(max_keys: int = 1000) -> StateBackend:
+    backend = os.getenv("ALFRED_STATE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteState(os.getenv("ALFRED_STATE_PATH", ".alfred_cache/state.db"))
+    if backend == "redis":
+        return RedisState(url=os.getenv("ALFRED_STATE_URL", "redis://localhost:6379/0"))
+    return InProcessState(max_keys=max_keys)
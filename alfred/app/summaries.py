@@ -0,0 +1,136 @@
+"""
+Rolling per-user conversation summaries.
+
+Turns that have scrolled out of the recent window the prompt uses are
+folded into one short summary per user, saved in the conversation store
+and cached in the state backend under `summary:<user_id>` as {"text",
+"upto"} (`upto` = seq of the newest folded turn). A cache miss (expiry, or
+eviction from the in-process LRU) reloads the stored summary, so a refresh
+always continues from the last summary rather than from the first turn.
+Refreshes run as background tasks after a turn is recorded, never on the
+request path: a turn just reads whatever summary is current.
+"""
+import asyncio
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from .memory import ConversationStore
+from .state import StateBackend
+
+Summarizer = Callable[[str, List[Dict[str, str]], int], Awaitable[str]]
+
+
+@dataclass
+class Summary:
+    text: str
+    upto: int  # seq of the newest turn folded into `text`
+
+
+class RollingSummaries:
+    def __init__(
+        self,
+        state: StateBackend,
+        store: ConversationStore,
+        summarize: Summarizer,
+        keep_recent: int = 10,
+        batch: int = 5,
+        max_tokens: int = 300,
+        chunk: int = 50,
+        ttl: Optional[float] = None,
+    ):
+        self.state = state
+        self.store = store
+        self.summarize = summarize
+        self.keep_recent = keep_recent  # newest turns left out of the summary
+        self.batch = batch              # fold once this many turns are waiting
+        self.max_tokens = max_tokens
+        self.chunk = chunk              # turns per summarizer call
+        self.ttl = ttl
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.refreshes = 0
+        self.failures = 0
+
+    async def _call(self, fn, *args):
+        if self.state.blocking:
+            return await run_in_threadpool(fn, *args)
+        return fn(*args)
+
+    async def _cache(self, user_id: str, summary: Summary) -> None:
+        await self._call(
+            self.state.set, f"summary:{user_id}",
+            json.dumps({"text": summary.text, "upto": summary.upto}, ensure_ascii=False),
+            self.ttl,
+        )
+
+    async def get(self, user_id: str) -> Optional[Summary]:
+        raw = await self._call(self.state.get, f"summary:{user_id}")
+        if raw is not None:
+            data = json.loads(raw)
+            return Summary(data["text"], int(data["upto"]))
+        stored = await run_in_threadpool(self.store.load_summary, user_id)
+        if stored is None:
+            return None
+        summary = Summary(*stored)
+        await self._cache(user_id, summary)
+        return summary
+
+    def _cutoff(self, window: List[Dict[str, Any]], summary: Optional[Summary]) -> Optional[int]:
+        """Seq to fold up to, or None if too few turns are waiting."""
+        older = [t.get("seq") for t in window[:-self.keep_recent or None] if t.get("seq") is not None]
+        upto = summary.upto if summary else 0
+        waiting = [seq for seq in older if seq > upto]
+        if len(waiting) < self.batch:
+            return None
+        return waiting[-1]
+
+    async def schedule(self, user_id: str, window: List[Dict[str, Any]]) -> Optional[asyncio.Task]:
+        """Start a background refresh for `user_id` if enough turns are waiting."""
+        running = self._tasks.get(user_id)
+        if running is not None and not running.done():
+            return None
+        if len(window) <= self.keep_recent:
+            return None
+        cutoff = self._cutoff(window, await self.get(user_id))
+        if cutoff is None:
+            return None
+        task = asyncio.create_task(self.refresh(user_id, cutoff))
+        self._tasks[user_id] = task
+        task.add_done_callback(lambda t: self._finished(user_id, t))
+        return task
+
+    def _finished(self, user_id: str, task: asyncio.Task) -> None:
+        if self._tasks.get(user_id) is task:
+            del self._tasks[user_id]
+
+    async def refresh(self, user_id: str, cutoff: int) -> Optional[Summary]:
+        """Fold every stored turn after the current summary up to `cutoff`."""
+        try:
+            current = await self.get(user_id)
+            text, upto = (current.text, current.upto) if current else ("", 0)
+            while upto < cutoff:
+                rows = await run_in_threadpool(self.store.since, user_id, upto, self.chunk)
+                rows = [row for row in rows if row[0] <= cutoff]
+                if not rows:
+                    break
+                turns = [{"user": user, "alfred": alfred} for _, user, alfred in rows]
+                text = await self.summarize(text, turns, self.max_tokens)
+                upto = rows[-1][0]
+            summary = Summary(text, upto)
+            await run_in_threadpool(self.store.save_summary, user_id, summary.text, summary.upto)
+            await self._cache(user_id, summary)
+            self.refreshes += 1
+            return summary
+        except Exception as e:
+            self.failures += 1
+            print(f"Summary refresh failed for {user_id!r}: {e}")
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": sum(1 for task in self._tasks.values() if not task.done()),
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,60 @@
+"""
+Transcript cache for /stt and /voice uploads.
+
+Clients retry uploads after network hiccups and the web client's silence
+probing can re-send the same clip, so transcripts are cached by a
+fingerprint of the audio Whisper would receive (the normalized WAV when
+audio prep ran, otherwise the raw upload). Entries live in a
+`KeyedCache`: an in-memory LRU with a TTL, and optionally a shared state
+backend so a retry that lands on another worker is still a hit.
+Concurrent requests for the same fingerprint share one upstream call.
+"""
+import hashlib
+import os
+from typing import Awaitable, BinaryIO, Callable, Optional, Tuple, Union
+
+from .keyed_cache import KeyedCache
+from .state import StateBackend
+
+READ_CHUNK = 1024 * 1024
+
+
+def fingerprint(source: Union[bytes, BinaryIO], model: str) -> str:
+    """
+    sha256 over the STT model and the audio bytes. A file is hashed in
+    chunks and rewound (blocking: call from a worker thread for big uploads).
+    """
+    h = hashlib.sha256(model.encode("utf-8") + b"\x00")
+    if isinstance(source, (bytes, bytearray)):
+        h.update(source)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(READ_CHUNK), b""):
+            h.update(chunk)
+        source.seek(0)
+    return h.hexdigest()
+
+
+class TranscriptCache(KeyedCache):
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, shared: Optional[StateBackend] = None):
+        super().__init__("stt", max_entries, ttl, shared)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_local(key)
+
+    def put(self, key: str, text: str) -> None:
+        self.put_local(key, text)
+
+    async def get_or_transcribe(self, key: str, transcribe: Callable[[], Awaitable[str]]) -> Tuple[str, str]:
+        """Cached transcript for `key`, or the result of `transcribe()`; see `KeyedCache.get_or_compute`."""
+        return await self.get_or_compute(key, transcribe)
+
+
+def cache_from_env(shared: Optional[StateBackend] = None) -> Optional[TranscriptCache]:
+    if os.getenv("ALFRED_STT_CACHE", "true").lower() != "true":
+        return None
+    return TranscriptCache(
+        max_entries=int(os.getenv("ALFRED_STT_CACHE_MAX", "512")),
+        ttl=float(os.getenv("ALFRED_STT_CACHE_TTL", "3600")),
+        shared=shared,
+    )
@@ -0,0 +1,187 @@
+"""
+Content-addressed on-disk cache for synthesized TTS audio.
+
+Alfred repeats itself a lot (command confirmations, greetings, errors), so
+audio is stored under a hash of (model, voice, format, text) and served
+straight from disk on the next request. The cache has a byte cap with LRU
+eviction. Recency is kept in file mtimes (a hit touches the file), so it
+survives restarts and is shared by every worker using the directory. Each
+new entry rescans the directory, counting the other workers' files too,
+and evicts the least recently used files over the cap.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SUFFIX = ".audio"
+PART_SUFFIX = ".part"
+STALE_PART_SECONDS = 15 * 60  # temp files older than this were left by a crashed writer
+
+
+def make_key(text: str, voice: str, fmt: str, model: str) -> str:
+    payload = json.dumps([model, voice, fmt, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CacheWriter:
+    """
+    Collects streamed chunks into its own temp file; `commit()` publishes it.
+    Concurrent writers for the same key (two misses for the same text)
+    never share a temp file; the last one to commit wins, with identical
+    content either way.
+    """
+
+    def __init__(self, cache: "TTSCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        fd, tmp = tempfile.mkstemp(dir=cache.directory, prefix=f"{key}.", suffix=PART_SUFFIX)
+        self._tmp = Path(tmp)
+        self._fh = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self._fh.write(chunk)
+        self.size += len(chunk)
+
+    def commit(self) -> None:
+        self._fh.close()
+        if self.size == 0:
+            self._tmp.unlink(missing_ok=True)
+            return
+        try:
+            os.replace(self._tmp, self.cache.path_for(self.key))
+        except OSError:
+            # Lost a race (temp file swept as stale, or the target is locked
+            # on Windows): another writer publishes the same audio
+            self._tmp.unlink(missing_ok=True)
+            return
+        self.cache._rescan()
+
+    def abort(self) -> None:
+        self._fh.close()
+        self._tmp.unlink(missing_ok=True)
+
+
+class TTSCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the LRU index from disk and sweep temp files left by crashed writers."""
+        cutoff = time.time() - STALE_PART_SECONDS
+        for tmp in self.directory.glob(f"*{PART_SUFFIX}"):
+            try:
+                if tmp.stat().st_mtime < cutoff:
+                    tmp.unlink()
+            except OSError:
+                continue  # committed or removed meanwhile
+        self._rescan()
+
+    def _scan(self) -> List[Tuple[float, int, str, int]]:
+        """
+        (mtime, rank, key, size) of every cached file, least recently used
+        first. File times are coarse, so ties go by this worker's own
+        recency order; keys it has not seen (just written) count as newest.
+        """
+        ranks = {key: i for i, key in enumerate(self._entries)}
+        files = []
+        for path in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            key = path.name[: -len(SUFFIX)]
+            files.append((st.st_mtime, ranks.get(key, len(ranks)), key, st.st_size))
+        return sorted(files)
+
+    def _rescan(self) -> None:
+        """
+        Re-read the directory, which other workers write to as well, and
+        evict the least recently used files until the total fits `max_bytes`.
+        """
+        with self._lock:
+            files = self._scan()
+            total = sum(size for *_, size in files)
+            entries: "OrderedDict[str, int]" = OrderedDict()
+            for _, _, key, size in files:
+                if total > self.max_bytes:
+                    self.path_for(key).unlink(missing_ok=True)
+                    total -= size
+                    self.evictions += 1
+                else:
+                    entries[key] = size
+            self._entries, self._bytes = entries, total
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached file for `key` (marking it recently used), or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            # Removed behind our back (another worker evicted it)
+            with self._lock:
+                size = self._entries.pop(key, 0)
+                self._bytes -= size
+                self.hits -= 1
+                self.misses += 1
+            return None
+        return path
+
+    def writer(self, key: str) -> CacheWriter:
+        return CacheWriter(self, key)
+
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+def cache_from_env() -> Optional[TTSCache]:
+    """Build the cache from ALFRED_TTS_CACHE* settings (None when disabled)."""
+    if os.getenv("ALFRED_TTS_CACHE", "true").lower() != "true":
+        return None
+    directory = os.getenv("ALFRED_TTS_CACHE_DIR", ".alfred_cache/tts")
+    max_mb = float(os.getenv("ALFRED_TTS_CACHE_MAX_MB", "256"))
+    try:
+        return TTSCache(directory, int(max_mb * 1024 * 1024))
+    except OSError as e:
+        print(f"Warning: TTS cache disabled: {e}")
+        return None
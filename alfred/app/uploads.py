@@ -0,0 +1,67 @@
+"""
+Size caps for audio upload routes, enforced while the body is being read.
+
+Starlette's multipart parser already streams file parts in chunks into a
+SpooledTemporaryFile (in memory up to 1 MB, then on disk). This middleware
+makes sure an oversized upload is rejected with 413 as early as possible:
+immediately when Content-Length is over the cap, otherwise as soon as the
+streamed body crosses it, before the rest is read.
+"""
+import json
+from typing import Dict
+
+from starlette.exceptions import HTTPException
+
+
+class UploadTooLarge(HTTPException):
+    def __init__(self, limit: int):
+        super().__init__(status_code=413, detail=f"Upload too large (limit {limit} bytes)")
+
+
+class UploadLimitMiddleware:
+    def __init__(self, app, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits  # path -> max body bytes
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            declared = int(headers.get(b"content-length", b"-1"))
+        except ValueError:
+            declared = -1
+        if declared > limit:
+            await _reject(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside the route's body parsing -> 413 response
+                    raise UploadTooLarge(limit)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def _reject(send, limit: int) -> None:
+    body = json.dumps({"error": UploadTooLarge(limit).detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("ascii")),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,239 @@
+"""
+Streaming voice session for the /ws/voice WebSocket.
+
+The client sends 16-bit mono PCM frames while the user is still speaking.
+Audio is kept in a bounded ring buffer, an energy-based detector finds the
+end of the utterance on the server, and transcription is dispatched the
+moment speech ends. Partial transcripts and the final reply go back over
+the same socket.
+
+The transcription and reply backends are plain async callables, so tests
+can plug in a local stand-in.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .audio import SAMPLE_WIDTH, frame_rms, pcm16_to_float
+
+
+class RingBuffer:
+    """Fixed-capacity byte buffer; writing past capacity drops the oldest bytes."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._start = 0
+        self._len = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def full(self) -> bool:
+        return self._len == self.capacity
+
+    def write(self, data: bytes) -> None:
+        if len(data) >= self.capacity:
+            self.dropped += self._len + len(data) - self.capacity
+            self._buf[:] = data[-self.capacity:]
+            self._start, self._len = 0, self.capacity
+            return
+
+        overflow = self._len + len(data) - self.capacity
+        if overflow > 0:
+            self._start = (self._start + overflow) % self.capacity
+            self._len -= overflow
+            self.dropped += overflow
+
+        end = (self._start + self._len) % self.capacity
+        first = min(len(data), self.capacity - end)
+        self._buf[end:end + first] = data[:first]
+        self._buf[:len(data) - first] = data[first:]
+        self._len += len(data)
+
+    def keep_last(self, n: int) -> None:
+        """Discard everything except the newest `n` bytes."""
+        if n < self._len:
+            self._start = (self._start + self._len - n) % self.capacity
+            self._len = n
+
+    def read_all(self) -> bytes:
+        end = self._start + self._len
+        if end <= self.capacity:
+            return bytes(self._buf[self._start:end])
+        return bytes(self._buf[self._start:]) + bytes(self._buf[:end - self.capacity])
+
+    def clear(self) -> None:
+        self._start = self._len = 0
+
+
+class UtteranceDetector:
+    """
+    Energy-based start/end-of-speech detector over fixed-size frames.
+    `feed()` returns "start" / "end" events for the PCM it was given.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = 30,
+        threshold: float = 0.01,
+        min_speech_ms: int = 90,
+        end_silence_ms: int = 700,
+    ):
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * SAMPLE_WIDTH
+        self.threshold = threshold
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self._carry = b""
+        self.reset()
+
+    def reset(self) -> None:
+        self.in_speech = False
+        self.speech_frames = 0
+        self._voiced_run = 0
+        self._silent_run = 0
+
+    def feed(self, pcm: bytes) -> List[str]:
+        data = self._carry + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._carry = data[usable:]
+        if not usable:
+            return []
+
+        voiced = frame_rms(pcm16_to_float(data[:usable]), self.frame_bytes // SAMPLE_WIDTH) >= self.threshold
+        events: List[str] = []
+        for is_voiced in voiced.tolist():
+            if not self.in_speech:
+                self._voiced_run = self._voiced_run + 1 if is_voiced else 0
+                if self._voiced_run >= self.min_speech_frames:
+                    self.in_speech = True
+                    self.speech_frames = self._voiced_run
+                    self._silent_run = 0
+                    events.append("start")
+                continue
+
+            self.speech_frames += 1
+            self._silent_run = 0 if is_voiced else self._silent_run + 1
+            if self._silent_run >= self.end_silence_frames:
+                events.append("end")
+                self.reset()
+        return events
+
+
+Transcriber = Callable[[bytes, int], Awaitable[str]]
+Responder = Callable[[str], Awaitable[str]]
+Sender = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class VoiceSession:
+    def __init__(
+        self,
+        transcribe: Transcriber,
+        respond: Responder,
+        send: Sender,
+        sample_rate: int = 16000,
+        max_utterance_s: float = 30.0,
+        preroll_ms: int = 300,
+        partial_interval_ms: int = 1500,
+        detector: Optional[UtteranceDetector] = None,
+    ):
+        self.transcribe = transcribe
+        self.respond = respond
+        self.send = send
+        self.sample_rate = sample_rate
+        self.bytes_per_ms = sample_rate * SAMPLE_WIDTH / 1000
+        self.ring = RingBuffer(int(max_utterance_s * 1000 * self.bytes_per_ms))
+        self.preroll_bytes = int(preroll_ms * self.bytes_per_ms)
+        self.partial_bytes = int(partial_interval_ms * self.bytes_per_ms)
+        self.detector = detector or UtteranceDetector(sample_rate)
+
+        self._speaking = False
+        self._utterance = 0
+        self._since_partial = 0
+        self._partial_task: Optional[asyncio.Task] = None
+        self._queue: "asyncio.Queue[Optional[bytes]]" = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def feed(self, pcm: bytes) -> None:
+        """Accept one frame of audio from the client."""
+        self.ring.write(pcm)
+        for event in self.detector.feed(pcm):
+            if event == "start":
+                self._speaking = True
+                self.ring.keep_last(self.preroll_bytes + len(pcm))
+                self._since_partial = 0
+                await self.send({"type": "speech_start"})
+            elif event == "end":
+                await self.end_utterance()
+                return
+
+        if not self._speaking:
+            # Before speech starts only the pre-roll is worth keeping
+            self.ring.keep_last(self.preroll_bytes)
+            return
+
+        if self.ring.full:
+            # Longest utterance we buffer: dispatch what we have
+            await self.end_utterance()
+            return
+
+        self._since_partial += len(pcm)
+        if self.partial_bytes and self._since_partial >= self.partial_bytes:
+            self._since_partial = 0
+            if self._partial_task is None or self._partial_task.done():
+                self._partial_task = asyncio.create_task(
+                    self._partial(self._utterance, self.ring.read_all())
+                )
+
+    async def end_utterance(self, forced: bool = False) -> None:
+        """
+        Dispatch the buffered utterance. `forced` is set when the client ends
+        it (push-to-talk release); with no speech detected it gets an empty final.
+        """
+        had_speech, self._speaking = self._speaking, False
+        pcm = self.ring.read_all()
+        self.ring.clear()
+        self.detector.reset()
+        self._utterance += 1
+        if pcm and had_speech:
+            await self._queue.put(pcm)
+        elif forced:
+            await self.send({"type": "final", "text": ""})
+
+    async def _partial(self, utterance: int, pcm: bytes) -> None:
+        try:
+            text = await self.transcribe(pcm, self.sample_rate)
+        except Exception as e:
+            print(f"Partial transcription error: {e}")
+            return
+        if utterance == self._utterance and text:
+            await self.send({"type": "partial", "text": text})
+
+    async def _run(self) -> None:
+        # One utterance at a time, in order
+        while True:
+            pcm = await self._queue.get()
+            if pcm is None:
+                return
+            try:
+                text = (await self.transcribe(pcm, self.sample_rate)).strip()
+                await self.send({"type": "final", "text": text})
+                if text:
+                    reply = await self.respond(text)
+                    await self.send({"type": "reply", "text": reply})
+            except Exception as e:
+                print(f"Voice session error: {e}")
+                await self.send({"type": "error", "error": str(e)})
+
+    async def close(self, drain: bool = False) -> None:
+        """Stop the session; with `drain`, finish utterances already dispatched."""
+        if self._partial_task is not None:
+            self._partial_task.cancel()
+        if drain:
+            await self._queue.put(None)
+            await self._worker
+        else:
+            self._worker.cancel()
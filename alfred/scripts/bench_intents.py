@@ -0,0 +1,103 @@
+"""
+Latency and hit rate of the local intent matcher over sample utterances.
+
+    python -m alfred.scripts.bench_intents [--rounds 200]
+
+Each utterance is labelled with the slash command it should become, or
+None when it must go to the model. Reports per-utterance match latency,
+the share of command utterances handled locally (hit rate) and any
+wrong matches (which would run the wrong command).
+"""
+import argparse
+import statistics
+import time
+
+from alfred.app import intents
+
+DEPARTMENTS = ["Warehouse", "Store", "Office", "Logistics"]
+
+CORPUS = [
+    ("Add Olive Perez as warehouse supervisor at 585", "/add_staff Olive Perez | Warehouse Supervisor | Warehouse | 585"),
+    ("Please add Olive Grace Perez as a cashier in the store department at 450 per day",
+     "/add_staff Olive Grace Perez | Cashier | Store | 450"),
+    ("hire Juan dela Cruz to Warehouse as forklift operator for ₱600",
+     "/add_staff Juan dela Cruz | Forklift Operator | Warehouse | 600"),
+    ("Onboard Maria Santos as an accountant in Office with a daily rate of 900",
+     "/add_staff Maria Santos | Accountant | Office | 900"),
+    ("add Ben Lim as driver in logistics at 700 php", "/add_staff Ben Lim | Driver | Logistics | 700"),
+    ("Can you hire Ana Reyes as store clerk at 480", "/add_staff Ana Reyes | Store Clerk | Store | 480"),
+    ("Add Rico Tan as security guard for the Office department at 520",
+     "/add_staff Rico Tan | Security Guard | Office | 520"),
+    ("Register Liza Go as logistics coordinator at 1,050", "/add_staff Liza Go | Logistics Coordinator | Logistics | 1050"),
+    ("set Olive Perez's rate to 600", "/adjust_salary Olive Perez | 600"),
+    ("Change the daily rate of Olive Perez to 1,200.50", "/adjust_salary Olive Perez | 1200.5"),
+    ("raise Juan dela Cruz's salary to 650", "/adjust_salary Juan dela Cruz | 650"),
+    ("update the pay for Maria Santos to 950 per day", "/adjust_salary Maria Santos | 950"),
+    ("give Mark Santos a salary of 700", "/adjust_salary Mark Santos | 700"),
+    ("Olive Perez's salary is now 650", "/adjust_salary Olive Perez | 650"),
+    ("Alfred, adjust Ben Lim's daily rate to 720.", "/adjust_salary Ben Lim | 720"),
+    ("list staff in warehouse", "/list_staff Warehouse"),
+    ("show me all the employees in the Store department", "/list_staff Store"),
+    ("who works in the office?", "/list_staff Office"),
+    ("Who are the workers at logistics", "/list_staff Logistics"),
+    ("list all staff", "/list_staff"),
+    ("show everyone", "/list_staff"),
+    ("Display our team members", "/list_staff"),
+    ("give me the staff list", "/list_staff"),
+    # Commands phrased too loosely for the patterns: the model handles these
+    ("could you bring Olive on board as a supervisor, pay her 585", None),
+    ("Olive should get a raise", None),
+    ("add olive perez as cashier at 500", None),
+    ("Add Olive Perez as supervisor at 585", None),
+    # Questions and multi-clause requests never become writes
+    ("Can you hire Ana Reyes as store clerk at 480?", None),
+    ("Olive Perez's salary is 600?", None),
+    ("Add Rico Tan as security guard for the Office department, at 520", None),
+    ("Add Olive Perez as warehouse supervisor at 585 and Juan as driver at 600", None),
+    ("Give Olive Perez 5", None),
+    ("Pay Olive Perez 500", None),
+    # Not commands
+    ("what is the weather today", None),
+    ("how many staff do we have?", None),
+    ("What's our daily payroll?", None),
+    ("Summarize yesterday's sales", None),
+    ("Who is our best cashier?", None),
+    ("show me the warehouse inventory report for last week please", None),
+    ("Thanks Alfred!", None),
+]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.rounds):
+        for text, _ in CORPUS:
+            start = time.perf_counter()
+            intents.match(text, DEPARTMENTS)
+            timings.append(time.perf_counter() - start)
+
+    commands = [(t, e) for t, e in CORPUS if e and e.startswith("/")]
+    hits, wrong = 0, []
+    for text, expected in CORPUS:
+        intent = intents.match(text, DEPARTMENTS)
+        got = intent.command() if intent else None
+        if got is not None and got == expected:
+            hits += 1
+        elif got is not None:
+            wrong.append((text, expected, got))
+
+    timings_us = sorted(t * 1e6 for t in timings)
+    print(f"utterances: {len(CORPUS)} ({len(commands)} matchable commands), rounds: {args.rounds}")
+    print(f"latency us: mean {statistics.mean(timings_us):.1f}  "
+          f"p50 {timings_us[len(timings_us) // 2]:.1f}  p99 {timings_us[int(len(timings_us) * 0.99)]:.1f}")
+    print(f"hit rate: {hits}/{len(commands)} ({hits / len(commands):.0%}) handled without the model")
+    print(f"wrong matches: {len(wrong)}")
+    for text, expected, got in wrong:
+        print(f"  {text!r}: expected {expected!r}, got {got!r}")
+
+
+if __name__ == "__main__":
+    main()
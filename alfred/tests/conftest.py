@@ -0,0 +1,77 @@
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Runtime caches (retrieval index, TTS audio, shared state) default to
+# .alfred_cache/ in the working directory; keep test runs out of the repo.
+# Set before any test module imports alfred.app.main.
+_CACHE_DIR = tempfile.mkdtemp(prefix="alfred-tests-")
+os.environ.setdefault("ALFRED_RETRIEVAL_DIR", os.path.join(_CACHE_DIR, "retrieval"))
+os.environ.setdefault("ALFRED_TTS_CACHE_DIR", os.path.join(_CACHE_DIR, "tts"))
+os.environ.setdefault("ALFRED_STATE_PATH", os.path.join(_CACHE_DIR, "state.db"))
+# Never import an alfred_memory.json lying in the working directory.
+os.environ["ALFRED_LEGACY_MEMORY_FILE"] = ""
+# In-memory database unless one is given, and dev mode: no real API calls.
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.pop("OPENAI_API_KEY", None)
+
+from alfred.app import models, staff_search  # noqa: E402
+from alfred.app.memory import ConversationStore  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _remove_cache_dir():
+    yield
+    shutil.rmtree(_CACHE_DIR, ignore_errors=True)
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def parse_sse():
+    """Parser for a text/event-stream body: [(event, decoded data), ...]."""
+    return _parse_sse
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """A file-backed SQLite database with the app's tables, triggers and search index."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'alfred.db'}", future=True)
+    models.Base.metadata.create_all(engine)
+    staff_search.ensure_schema(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(db_engine):
+    """A session configured like the app's SessionLocal."""
+    session = sessionmaker(bind=db_engine, autoflush=False, autocommit=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_store(tmp_path):
+    """`make_store(name)` -> a ConversationStore over tmp_path/name; same name, same database."""
+    engines = []
+
+    def make(name: str = "alfred.db") -> ConversationStore:
+        engine = create_engine(f"sqlite:///{tmp_path / name}", future=True)
+        engines.append(engine)
+        return ConversationStore(sessionmaker(bind=engine))
+
+    yield make
+    for engine in engines:
+        engine.dispose()
@@ -1,14 +1,9 @@
-import os
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-# Ensure tests import the app with an in-memory sqlite DB by default
-os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
-# Force dev mode for OpenAI client to avoid real API calls during tests
-os.environ.pop("OPENAI_API_KEY", None)
-
 from alfred.app import main as app_module
+from alfred.app import providers
 from alfred.app.models import Base, Staff
 
 
@@ -46,13 +41,8 @@ def test_chat_and_commands_with_overridden_db():
     app_module.app.dependency_overrides[app_module.get_db] = override_get_db
     client = TestClient(app_module.app)
 
-    # Ensure brain runs in dev mode for tests (avoid real OpenAI calls)
-    try:
-        import alfred.app.brain as brain
-        brain.USE_REAL_OPENAI = False
-        brain.client = None
-    except Exception:
-        pass
+    # No client: brain runs in dev mode (no real OpenAI calls)
+    providers.set_client(None)
 
     # 1) Normal chat (dev mode) should reply with DEV MODE message
     resp = client.post("/chat", json={"user_id": "test", "message": "hello"})
@@ -0,0 +1,94 @@
+import io
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import audio_prep, providers
+
+
+def stereo_wav(segments, rate=44100):
+    """segments: list of (ms, amplitude); builds 16-bit stereo WAV bytes."""
+    parts = []
+    for ms, amplitude in segments:
+        t = np.arange(rate * ms // 1000) / rate
+        parts.append(np.sin(2 * np.pi * 300 * t) * amplitude)
+    mono = np.concatenate(parts)
+    stereo = np.stack([mono, mono * 0.5], axis=1)
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes((stereo * 32767).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def test_prepare_downmixes_resamples_and_trims():
+    data = stereo_wav([(1000, 0.0), (800, 0.4), (1000, 0.0)])
+    result = audio_prep.prepare(data)
+
+    assert result.has_speech and result.decoder == "wav"
+    with wave.open(io.BytesIO(result.audio), "rb") as w:
+        assert w.getnchannels() == 1
+        assert w.getframerate() == 16000
+        duration_ms = w.getnframes() * 1000 / w.getframerate()
+    # speech plus padding on both sides, leading/trailing silence gone
+    assert 800 <= duration_ms <= 800 + 2 * audio_prep.PAD_MS + 2 * audio_prep.FRAME_MS
+    assert result.report()["bytes_saved"] > 0.9 * len(data)
+
+
+def test_prepare_rejects_silence_and_passes_unknown_formats_through(monkeypatch):
+    assert audio_prep.prepare(stereo_wav([(1500, 0.001)])).has_speech is False
+
+    monkeypatch.setattr(audio_prep.shutil, "which", lambda name: None)
+    passthrough = audio_prep.prepare(b"\x00\x00\x00 ftypM4A not really")
+    assert passthrough.decoder == "passthrough"
+    assert passthrough.has_speech and passthrough.audio is None
+
+
+def test_non_wav_uploads_are_streamed_through_ffmpeg(monkeypatch, tmp_path):
+    # Stand-in for ffmpeg that passes stdin through, so the upload is read as 16 kHz PCM
+    fake = tmp_path / "ffmpeg"
+    fake.write_text("#!/bin/sh\nexec cat\n")
+    fake.chmod(0o755)
+    monkeypatch.setattr(audio_prep.shutil, "which", lambda name: str(fake))
+
+    t = np.arange(16000 * 5) / 16000  # 160 kB, more than a pipe buffer
+    pcm = (np.sin(2 * np.pi * 300 * t) * 0.4 * 32767).astype("<i2").tobytes()
+    source = io.BytesIO(pcm)
+    result = audio_prep.prepare(source)
+
+    assert result.decoder == "ffmpeg" and result.has_speech
+    with wave.open(io.BytesIO(result.audio), "rb") as w:
+        assert w.getframerate() == 16000 and w.getnframes() == len(pcm) // 2
+    assert source.tell() == 0
+
+
+def test_stt_skips_upstream_call_for_silent_clip(monkeypatch):
+    calls = []
+
+    async def transcribe_create(**kwargs):
+        calls.append(kwargs["file"])
+        return SimpleNamespace(text="hello")
+
+    monkeypatch.delenv("MOCK_MODE", raising=False)
+    monkeypatch.setattr(app_module, "stt_cache", None)
+    providers.set_client(SimpleNamespace(audio=SimpleNamespace(
+        transcriptions=SimpleNamespace(create=transcribe_create)
+    )))
+    try:
+        client = TestClient(app_module.app)
+        silent = client.post("/stt", files={"audio": ("s.wav", stereo_wav([(1000, 0.0)]), "audio/wav")})
+        assert silent.json()["text"] == ""
+        assert silent.json()["no_speech"] is True
+        assert calls == []
+
+        spoken = client.post("/stt", files={"audio": ("v.wav", stereo_wav([(500, 0.0), (600, 0.4)]), "audio/wav")})
+        assert spoken.json()["text"] == "hello"
+        filename, sent, content_type = calls[0]
+        assert content_type == "audio/wav" and len(sent) < spoken.json()["audio_prep"]["bytes_in"]
+    finally:
+        providers.set_client(None)
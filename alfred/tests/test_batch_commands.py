@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, func, select
+
+from alfred.app import main as app_module
+from alfred.app import models
+from alfred.app.business_context import context_snapshot
+from alfred.app import commands
+from alfred.app.commands import handle_command
+from alfred.app.payroll import payroll_snapshot
+
+
+@pytest.fixture
+def db(db):
+    for name, rate in (("Olive Perez", 500), ("Ben Lim", 450)):
+        handle_command(f"/add_staff {name} | Staff | Warehouse | {rate}", db)
+    return db
+
+
+def rates(db):
+    return dict(db.execute(select(models.Staff.full_name, models.Staff.current_daily_rate)).all())
+
+
+def history_rows(db):
+    return db.scalar(select(func.count()).select_from(models.StaffRateHistory))
+
+
+def test_lines_run_in_one_transaction(db):
+    reply, handled = handle_command(
+        "/adjust_salary Olive Perez | 600\n/add_staff Ana Cruz | Clerk | Store | 400\n/adjust_salary Ana Cruz | 420", db
+    )
+    assert handled
+    assert reply.splitlines() == [
+        "✅ Batch saved: 3 of 3 commands in one transaction.",
+        "1. ✅ Olive Perez: 500.00 PHP → 600.00 PHP",
+        "2. ✅ Added Ana Cruz (ID 3, Store, 400.00 PHP)",
+        "3. ✅ Ana Cruz: 400.00 PHP → 420.00 PHP",
+    ]
+    assert rates(db) == {"Olive Perez": 600, "Ben Lim": 450, "Ana Cruz": 420}
+    assert context_snapshot.get(db)["daily_payroll"] == 1470.0
+
+
+def test_a_failed_line_saves_nothing_by_default(db):
+    before = context_snapshot.get(db)
+    reply, _ = handle_command(
+        "/batch\n/adjust_salary Olive Perez | 600\n/adjust_salary Olvie Perez | 700\n/add_staff Missing Rate | X | Y", db
+    )
+    lines = reply.splitlines()
+    assert lines[0].startswith("⚠️ Batch not saved: 2 of 3 commands failed")
+    assert lines[2] == "2. ❌ No staff found with name 'Olvie Perez'. Did you mean: Olive Perez?"
+    assert lines[3] == "3. ❌ Usage: /add_staff Full Name | Role | Department | DailyRate"
+    assert rates(db) == {"Olive Perez": 500, "Ben Lim": 450} and history_rows(db) == 0
+    assert context_snapshot.get(db) == before
+
+
+def test_continue_mode_saves_the_lines_that_succeed(db):
+    reply, _ = handle_command(
+        "/batch continue\n/adjust_salary Olive Perez | 600\n/list_staff\n/adjust_salary Ben Lim | abc\n"
+        "/adjust_salary Ben Lim | 480", db
+    )
+    assert reply.splitlines()[0] == "✅ Batch saved: 2 of 4 commands in one transaction (2 failed, skipped)."
+    assert "2. ❌ /list_staff can't run in a batch" in reply
+    assert rates(db) == {"Olive Perez": 600, "Ben Lim": 480} and history_rows(db) == 2
+
+
+def test_snapshot_updates_after_commit_do_not_reload_rows(db, db_engine):
+    payroll_snapshot.view(db)  # loaded, so the batch applies deltas to it
+    context_snapshot.get(db)
+    selects = []
+
+    def record(conn, cursor, statement, *args):
+        selects.append(statement)
+
+    event.listen(db_engine, "before_cursor_execute", record)
+    lines = [f"/adjust_salary Olive Perez | {600 + i}" for i in range(5)]
+    lines += [f"/add_staff New {i} | Clerk | Store | 400" for i in range(5)]
+    reply, _ = handle_command("\n".join(lines), db)
+    event.remove(db_engine, "before_cursor_execute", record)
+    assert reply.startswith("✅ Batch saved: 10 of 10")
+    # one name lookup per /adjust_salary line and nothing after the commit
+    assert sum(sql.lstrip().upper().startswith("SELECT") for sql in selects) == 5
+    view = payroll_snapshot.view(db)
+    assert view.overall()["headcount"] == 7 and view.overall()["daily_payroll"] == 604 + 450 + 5 * 400
+
+
+def test_unexpected_errors_roll_the_batch_back(db, monkeypatch):
+    def broken(arg_str, db, after_commit):
+        raise RuntimeError("bug")
+
+    monkeypatch.setitem(commands.WRITE_COMMANDS, "/adjust_salary", broken)
+    with pytest.raises(RuntimeError):
+        handle_command("/add_staff Ana Cruz | Clerk | Store | 400\n/adjust_salary Ben Lim | 480", db)
+    assert not db.in_transaction()  # rolled back, not left pending
+    assert rates(db) == {"Olive Perez": 500, "Ben Lim": 450}
+
+
+def test_batch_over_chat_is_one_request():
+    message = "/add_staff Batch One | Clerk | Batch | 300\n/add_staff Batch Two | Clerk | Batch | 310"
+    with TestClient(app_module.app) as client:
+        reply = client.post("/chat", json={"user_id": "batch", "message": message}).json()["reply"]
+        assert reply.startswith("✅ Batch saved: 2 of 2")
+        assert "(2 staff)" in client.post("/chat", json={"user_id": "batch", "message": "/payroll Batch"}).json()["reply"]
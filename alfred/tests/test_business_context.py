@@ -2,7 +2,10 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from alfred.app.models import Base, Staff
-from alfred.app.business_context import build_business_context
+from alfred.app import commands
+from alfred.app.business_context import BusinessContextSnapshot, build_business_context
+from alfred.app.commands import handle_command
+from alfred.app.state import InProcessState
 
 
 def test_build_business_context_counts_depts():
@@ -25,3 +28,50 @@ def test_build_business_context_counts_depts():
         assert "Warehouse" in ctx["departments"]
     finally:
         db.close()
+
+
+def test_aggregates_include_payroll_and_status(db):
+    db.add_all([
+        Staff(full_name="A", department="Sales", current_daily_rate=500),
+        Staff(full_name="B", department=" Sales ", status="inactive", current_daily_rate=400),
+        Staff(full_name="C", department="Warehouse", current_daily_rate=585),
+        Staff(full_name="D", department=None),
+    ])
+    db.commit()
+
+    ctx = build_business_context(db)
+    assert ctx["staff_count"] == 4
+    assert ctx["active_count"] == 3 and ctx["inactive_count"] == 1
+    assert ctx["daily_payroll"] == 1085.0
+    assert ctx["by_department"]["Sales"] == {"headcount": 2, "active": 1, "daily_payroll": 500.0}
+    assert ctx["departments"] == ["Sales", "Warehouse"]
+
+
+def test_snapshot_is_updated_by_commands_without_rescanning(db, monkeypatch):
+    snapshot = BusinessContextSnapshot()
+    monkeypatch.setattr(commands, "context_snapshot", snapshot)
+
+    assert snapshot.get(db)["staff_count"] == 0
+    handle_command("/add_staff Olive Perez | Supervisor | Warehouse | 585", db)
+    handle_command("/adjust_salary Olive Perez | 600", db)
+    ctx = snapshot.get(db)
+
+    assert ctx == build_business_context(db)
+    assert ctx["by_department"]["Warehouse"]["daily_payroll"] == 600.0
+    stats = snapshot.stats()
+    assert stats["builds"] == 1 and stats["deltas"] == 2 and stats["version"] == 2
+
+
+def test_shared_version_makes_other_workers_rebuild(db):
+    shared = InProcessState()
+    worker_a, worker_b = BusinessContextSnapshot(), BusinessContextSnapshot()
+    worker_a.use_state(shared)
+    worker_b.use_state(shared)
+    assert worker_b.get(db)["staff_count"] == 0
+
+    db.add(Staff(full_name="E", department="Sales"))
+    db.commit()
+    worker_a.staff_added(db, "Sales", "active", None)
+
+    assert worker_b.get(db)["staff_count"] == 1
+    assert worker_b.stats()["builds"] == 2
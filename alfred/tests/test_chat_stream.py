@@ -0,0 +1,31 @@
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+
+
+def test_chat_stream_sends_tokens_then_saves_turn(parse_sse):
+    client = TestClient(app_module.app)
+
+    r = client.post("/chat/stream", json={"user_id": "stream-test", "message": "hello"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(r.text)
+    tokens = [data["delta"] for kind, data in events if kind == "token"]
+    assert len(tokens) > 1
+    kind, done = events[-1]
+    assert kind == "done"
+    assert "".join(tokens) == done["reply"]
+    assert "DEV MODE" in done["reply"]
+
+    # completed turn is recorded exactly like /chat
+    assert app_module._histories.get("stream-test")[-1] == {"user": "hello", "alfred": done["reply"], "seq": done["cursor"]}
+    assert done["history"][-1]["user"] == "hello"
+
+
+def test_chat_stream_empty_message(parse_sse):
+    client = TestClient(app_module.app)
+    r = client.post("/chat/stream", json={"user_id": "stream-test", "message": "  "})
+    events = parse_sse(r.text)
+    assert events[0][0] == "token"
+    assert events[-1][1]["history"] == []
@@ -0,0 +1,31 @@
+from alfred.app.history_cache import HistoryCache
+
+
+def turn(i):
+    return {"user": f"q{i}", "alfred": f"a{i}"}
+
+
+def test_turns_per_user_are_a_ring_buffer():
+    cache = HistoryCache(max_users=2, turns=3)
+    cache.put("alice", [turn(0)])
+    for i in range(1, 5):
+        window = cache.append("alice", turn(i))
+    assert window == [turn(2), turn(3), turn(4)]
+    assert cache.append("unknown", turn(0)) is None  # caller reloads from the store
+
+
+def test_idle_users_are_evicted_and_memory_is_reported():
+    cache = HistoryCache(max_users=2, turns=3)
+    cache.put("alice", [turn(0)])
+    cache.put("bob", [turn(0)])
+    assert cache.get("alice") == [turn(0)]  # alice is now most recent
+    cache.put("carol", [])
+
+    assert cache.get("bob") is None
+    assert cache.get("alice") == [turn(0)]
+    stats = cache.stats()
+    assert stats["users"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+    before = stats["approx_bytes"]
+    cache.append("carol", {"user": "x" * 1000, "alfred": "y" * 1000})
+    assert cache.stats()["approx_bytes"] >= before + 2000
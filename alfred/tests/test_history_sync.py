@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+
+
+def test_chat_returns_only_the_new_turn_and_history_syncs_by_cursor():
+    client = TestClient(app_module.app)
+    user = "sync-test"
+
+    cursors = []
+    for i in range(3):
+        r = client.post("/chat", json={"user_id": user, "message": f"message {i}"}).json()
+        assert [turn["user"] for turn in r["history"]] == [f"message {i}"]
+        assert r["history"][0]["seq"] == r["cursor"]
+        cursors.append(r["cursor"])
+    assert cursors == sorted(cursors)
+
+    page = client.get("/history", params={"user_id": user, "since": cursors[0], "limit": 1})
+    assert [t["user"] for t in page.json()["turns"]] == ["message 1"]
+    assert page.json()["has_more"] is True
+    rest = client.get("/history", params={"user_id": user, "since": page.json()["cursor"]}).json()
+    assert [t["user"] for t in rest["turns"]] == ["message 2"]
+    assert rest["has_more"] is False and rest["cursor"] == cursors[2]
+
+    # nothing new: conditional request is answered with 304
+    params = {"user_id": user, "since": cursors[2]}
+    etag = client.get("/history", params=params).headers["ETag"]
+    assert client.get("/history", params=params, headers={"If-None-Match": etag}).status_code == 304
+
+    client.post("/chat", json={"user_id": user, "message": "one more"})
+    fresh = client.get("/history", params=params, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert [t["user"] for t in fresh.json()["turns"]] == ["one more"]
@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app.intents import match
+from alfred.scripts.bench_intents import CORPUS, DEPARTMENTS
+
+
+def test_sample_corpus_matches_expected_commands():
+    for text, expected in CORPUS:
+        intent = match(text, DEPARTMENTS)
+        assert (intent.command() if intent else None) == expected, text
+
+
+def test_low_confidence_matches_are_left_to_the_model():
+    # no department given and none can be inferred from the role
+    assert match("Add Olive Perez as supervisor at 585", DEPARTMENTS) is None
+    intent = match("Add Olive Perez as supervisor at 585", DEPARTMENTS, min_confidence=0.0)
+    assert intent.name == "add_staff" and intent.confidence < 0.8
+
+
+def test_ambiguous_text_never_becomes_a_write():
+    for text in (
+        "Olive Perez's salary is 600?",
+        "Can you set Olive Perez's rate to 600?",
+        "Give Olive Perez 5",
+        "Pay Olive Perez 500",
+        "Add Olive Perez as warehouse supervisor at 585 and Juan as driver at 600",
+        "Add Olive Perez as cashier in Store at 450, Ben Lim as driver in Logistics at 700",
+    ):
+        assert match(text, DEPARTMENTS, min_confidence=0.0) is None, text
+    # roles and departments never swallow a number or the at/and keywords
+    intent = match("Add Olive Perez as warehouse supervisor at 585", DEPARTMENTS)
+    assert intent.args["role"] == "Warehouse Supervisor" and intent.args["rate"] == 585
+    # give/pay still works with the pay keyword; thousands separators are not clauses
+    assert match("Pay Olive Perez a daily rate of 1,500", DEPARTMENTS).command() == "/adjust_salary Olive Perez | 1500"
+    assert match("give Olive Perez a raise to 650", DEPARTMENTS).command() == "/adjust_salary Olive Perez | 650"
+
+
+def test_natural_language_command_skips_the_model(monkeypatch):
+    async def no_think(*args, **kwargs):
+        raise AssertionError("think() should not be called for a recognized command")
+
+    monkeypatch.setattr(app_module, "think", no_think)
+    with TestClient(app_module.app) as client:
+        reply = client.post(
+            "/chat", json={"user_id": "intent-test", "message": "Hire Dina Lopez as cashier in Store at 450"}
+        ).json()["reply"]
+        assert "Added staff" in reply and "Dina Lopez" in reply
+
+        reply = client.post("/chat", json={"user_id": "intent-test", "message": "list staff in store"}).json()["reply"]
+        assert "Dina Lopez" in reply
@@ -0,0 +1,47 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_appends_are_per_user_and_tail_reads_are_ordered(make_store):
+    store = make_store()
+    for i in range(5):
+        store.append("alice", f"q{i}", f"a{i}")
+    store.append("bob", "hi", "hello")
+
+    assert store.recent("alice", 2) == [
+        {"user": "q3", "alfred": "a3", "seq": 4},
+        {"user": "q4", "alfred": "a4", "seq": 5},
+    ]
+    assert store.recent("bob", 10) == [{"user": "hi", "alfred": "hello", "seq": 6}]
+    # durable: a fresh store on the same DB sees the same turns
+    assert len(make_store().recent("alice", 10)) == 5
+
+
+def test_legacy_json_memory_is_migrated_once(tmp_path, make_store):
+    store = make_store()
+    legacy = tmp_path / "alfred_memory.json"
+    legacy.write_text(json.dumps([{"user": "old q", "alfred": "old a"}, {"bad": "entry"}]))
+
+    assert store.migrate_json_memory(legacy) == 1
+    assert legacy.exists()  # the marker row, not a rename, prevents a second import
+    assert store.migrate_json_memory(legacy) == 0
+    assert make_store().migrate_json_memory(legacy) == 0
+    assert store.recent("default", 10) == [{"user": "old q", "alfred": "old a", "seq": 1}]
+
+
+def test_concurrent_workers_import_legacy_memory_once(tmp_path, make_store):
+    legacy = tmp_path / "alfred_memory.json"
+    legacy.write_text(json.dumps([{"user": f"q{i}", "alfred": f"a{i}"} for i in range(50)]))
+    make_store().recent("default", 1)  # create the table up front
+    barrier = threading.Barrier(4)
+
+    def worker():
+        store = make_store()
+        barrier.wait()
+        return store.migrate_json_memory(legacy)
+
+    with ThreadPoolExecutor(4) as pool:
+        imported = [f.result() for f in [pool.submit(worker) for _ in range(4)]]
+    assert sorted(imported) == [0, 0, 0, 50]
+    assert len(make_store().recent("default", 100)) == 50
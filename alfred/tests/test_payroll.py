@@ -0,0 +1,70 @@
+import io
+
+import numpy as np
+
+from alfred.app import models
+from alfred.app.commands import handle_command
+from alfred.app.payroll import PayrollSnapshot, _group_quantiles, payroll_snapshot
+from alfred.app.staff_import import import_stream
+
+
+def test_group_quantiles_match_numpy():
+    rng = np.random.default_rng(7)
+    groups = rng.integers(0, 5, 2000).astype(np.int32)
+    values = np.round(rng.uniform(300, 900, 2000), 2)
+    got = _group_quantiles(groups, values, 6, (0.1, 0.5, 0.9))
+    expected = [np.quantile(values[groups == g], (0.1, 0.5, 0.9)) for g in range(5)]
+    assert np.allclose(got[:5], expected) and np.isnan(got[5]).all()
+
+
+def test_stats_by_department_and_raise_projection(db):
+    db.add_all([
+        models.Staff(full_name="A", department="Warehouse", current_daily_rate=500),
+        models.Staff(full_name="B", department="Warehouse", current_daily_rate=700),
+        models.Staff(full_name="C", department=" Store ", current_daily_rate=400),
+        models.Staff(full_name="D", department="Store", current_daily_rate=None),
+        models.Staff(full_name="E", department="Store", current_daily_rate=900, status="inactive"),
+    ])
+    db.commit()
+
+    view = PayrollSnapshot().view(db)
+    by_dept = {row["department"]: row for row in view.by_department()}
+    assert by_dept["Warehouse"] == {
+        "department": "Warehouse", "headcount": 2, "daily_payroll": 1200.0, "mean_rate": 600.0,
+        "p10": 520.0, "p25": 550.0, "p50": 600.0, "p75": 650.0, "p90": 680.0,
+    }
+    # inactive staff are left out; unset rates count towards headcount only
+    assert by_dept["Store"]["headcount"] == 2 and by_dept["Store"]["mean_rate"] == 400.0
+    assert view.overall()["daily_payroll"] == 1600.0
+
+    projection = view.raise_projection(10, view.matching("warehouse"))
+    assert projection["staff_affected"] == 2
+    assert projection["daily_payroll_after"] == 1720.0 and projection["daily_increase"] == 120.0
+
+
+def test_snapshot_follows_writes(db):
+    handle_command("/add_staff Olive Perez | Supervisor | Warehouse | 500", db)
+    assert "500.00 PHP (1 staff)" in handle_command("/payroll", db)[0]
+    loads, deltas = payroll_snapshot.loads, payroll_snapshot.deltas
+
+    handle_command("/add_staff Ben Lim | Driver | Logistics | 700", db)
+    handle_command("/adjust_salary Olive Perez | 600", db)
+    reply, _ = handle_command("/payroll", db)
+    assert "1,300.00 PHP (2 staff)" in reply and "- Logistics: 1 staff, 700.00 PHP/day" in reply
+    assert (payroll_snapshot.loads, payroll_snapshot.deltas) == (loads, deltas + 2)  # updated in place
+
+    import_stream(db, io.StringIO("full_name,department,daily_rate\nAna Cruz,Logistics,300\n"))
+    assert "1,600.00 PHP (3 staff)" in handle_command("/payroll", db)[0]
+    assert payroll_snapshot.loads == loads + 1  # bulk import: reloaded
+
+
+def test_payroll_commands(db):
+    for i, rate in enumerate((400, 500, 600)):
+        handle_command(f"/add_staff Worker {i} | Picker | Warehouse | {rate}", db)
+
+    reply, _ = handle_command("/payroll warehouse", db)
+    assert "1,500.00 PHP (3 staff)" in reply and "Quartiles: 450.00 PHP / 500.00 PHP / 550.00 PHP" in reply
+    reply, _ = handle_command("/payroll raise Warehouse by 10%", db)
+    assert "1,500.00 PHP → 1,650.00 PHP" in reply and "+150.00 PHP per day" in reply
+    assert "Did you mean: Warehouse?" in handle_command("/payroll raise Warehose 5%", db)[0]
+    assert handle_command("/payroll raise Warehouse", db)[0].startswith("Usage:")
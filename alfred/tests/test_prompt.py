@@ -0,0 +1,81 @@
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from alfred.app import brain, prompt
+from alfred.app.memory import ConversationStore
+from alfred.app.state import InProcessState
+from alfred.app.summaries import RollingSummaries, Summary
+
+
+def test_prompt_keeps_newest_turns_within_budget():
+    history = [{"user": f"question {i} " * 20, "alfred": f"answer {i} " * 20} for i in range(10)]
+    messages = prompt.build_prompt("system", "new question", history, budget=300)
+
+    total = sum(prompt.message_tokens(m) for m in messages)
+    assert total <= 300
+    assert messages[0] == {"role": "system", "content": "system"}
+    assert messages[-1] == {"role": "user", "content": "new question"}
+    # whatever history fits is the newest, in order
+    kept = [m["content"] for m in messages[1:-1] if m["role"] == "user"]
+    assert kept and kept == [h["user"] for h in history[-len(kept):]]
+
+
+def test_turns_folded_into_the_summary_are_not_repeated():
+    history = [{"user": f"q{i}", "alfred": f"a{i}", "seq": i} for i in range(1, 6)]
+    messages = brain.build_messages("next", history, summary=Summary("- earlier stuff", upto=3))
+
+    contents = [m["content"] for m in messages]
+    assert prompt.SUMMARY_PREAMBLE + "- earlier stuff" in contents
+    assert "q3" not in contents
+    assert contents[-5:] == ["q4", "a4", "q5", "a5", "next"]
+
+
+def test_rolling_summary_folds_older_turns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'alfred.db'}", future=True)
+    store = ConversationStore(sessionmaker(bind=engine))
+    summaries = RollingSummaries(
+        InProcessState(), store, brain.summarize_turns, keep_recent=3, batch=2,
+    )
+    window = []
+    for i in range(6):
+        seq = store.append("alice", f"q{i}", f"a{i}")
+        window.append({"user": f"q{i}", "alfred": f"a{i}", "seq": seq})
+
+    async def run():
+        task = await summaries.schedule("alice", window)
+        assert task is not None
+        await task
+        # nothing new waiting: no second refresh
+        assert await summaries.schedule("alice", window) is None
+        return await summaries.get("alice")
+
+    summary = asyncio.run(run())
+    assert summary.upto == window[2]["seq"]
+    assert "q0" in summary.text and "q2" in summary.text and "q3" not in summary.text
+    assert summaries.stats()["refreshes"] == 1
+
+
+def test_summary_survives_eviction_from_the_state_cache(tmp_path):
+    store = ConversationStore(sessionmaker(bind=create_engine(f"sqlite:///{tmp_path / 'alfred.db'}", future=True)))
+    folded = []
+
+    async def summarize(previous, turns, max_tokens):
+        folded.extend(t["user"] for t in turns)
+        return await brain.summarize_turns(previous, turns, max_tokens)
+
+    seqs = [store.append("alice", f"q{i}", f"a{i}") for i in range(6)]
+
+    async def run():
+        first = RollingSummaries(InProcessState(), store, summarize, keep_recent=3, batch=2)
+        await first.refresh("alice", seqs[2])
+        # a fresh cache, as after the LRU evicted the key
+        second = RollingSummaries(InProcessState(), store, summarize, keep_recent=3, batch=2)
+        assert (await second.get("alice")).upto == seqs[2]
+        return await second.refresh("alice", seqs[4])
+
+    summary = asyncio.run(run())
+    assert folded == ["q0", "q1", "q2", "q3", "q4"]  # nothing folded twice
+    assert summary.upto == seqs[4] and "q0" in summary.text and "q4" in summary.text
+    assert store.load_summary("alice") == (summary.text, summary.upto)
@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+
+
+class _FakeSpeech:
+    def __init__(self, chunks):
+        self._chunks = chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_bytes(self, chunk_size=None):
+        for chunk in self._chunks:
+            yield chunk
+
+
+class FakeAsyncClient:
+    """Local stand-in for AsyncOpenAI with the three endpoints Alfred uses."""
+
+    def __init__(self):
+        self.calls = []
+
+        async def chat_create(**kwargs):
+            self.calls.append(("chat", kwargs))
+            message = SimpleNamespace(content="stub reply")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        async def transcribe_create(**kwargs):
+            self.calls.append(("stt", kwargs))
+            return SimpleNamespace(text="stub transcript")
+
+        def speech_create(**kwargs):
+            self.calls.append(("tts", kwargs))
+            return _FakeSpeech([b"ID3", b"audio"])
+
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=chat_create))
+        self.audio = SimpleNamespace(
+            transcriptions=SimpleNamespace(create=transcribe_create),
+            speech=SimpleNamespace(
+                with_streaming_response=SimpleNamespace(create=speech_create)
+            ),
+        )
+
+
+def test_get_client_is_none_without_key():
+    providers.set_client(None)
+    assert providers.get_client() is None
+
+
+def test_endpoints_use_shared_async_client(monkeypatch):
+    fake = FakeAsyncClient()
+    providers.set_client(fake)
+    monkeypatch.delenv("MOCK_MODE", raising=False)
+    monkeypatch.setattr(app_module, "audio_cache", None)
+    monkeypatch.setattr(app_module, "stt_cache", None)
+    try:
+        client = TestClient(app_module.app)
+
+        r = client.post("/stt", files={"audio": ("a.m4a", b"fake-audio", "audio/m4a")})
+        assert r.status_code == 200
+        assert r.json()["text"] == "stub transcript"
+
+        r = client.post("/chat", json={"user_id": "providers", "message": "hi"})
+        assert r.status_code == 200
+        assert r.json()["reply"] == "stub reply"
+
+        r = client.post("/tts", json={"text": "hello"})
+        assert r.status_code == 200
+        assert r.content == b"ID3audio"
+
+        kinds = [kind for kind, _ in fake.calls]
+        assert kinds == ["stt", "chat", "tts"]
+        # per-call timeouts are always passed through
+        assert all("timeout" in kwargs for _, kwargs in fake.calls)
+    finally:
+        providers.set_client(None)
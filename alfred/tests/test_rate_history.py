@@ -0,0 +1,69 @@
+from datetime import UTC, datetime
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from alfred.app import main as app_module
+from alfred.app import models, rate_history
+from alfred.app.commands import handle_command
+
+
+def hire(db, name, department, rate, when):
+    staff = models.Staff(full_name=name, department=department, current_daily_rate=rate, created_at=when)
+    db.add(staff)
+    db.commit()
+    return staff
+
+
+def test_rate_as_of_and_changes_between(db):
+    olive = hire(db, "Olive Perez", "Warehouse", 500, datetime(2026, 1, 1))
+    ben = hire(db, "Ben Lim", "Warehouse", 450, datetime(2026, 1, 1))
+    hire(db, "Late Hire", "Warehouse", 400, datetime(2026, 6, 1))
+    rate_history.record_change(db, olive, 550, datetime(2026, 2, 1))
+    rate_history.record_change(db, olive, 600, datetime(2026, 3, 1))
+    db.commit()
+
+    def rate_on(day, **scope):
+        return [r["daily_rate"] for r in rate_history.rates_as_of(db, rate_history.parse_bound(day, end=True), **scope)]
+
+    assert rate_on("2026-01-15", staff_id=olive.id) == [500]   # before the first change
+    assert rate_on("2026-02-01", staff_id=olive.id) == [550]   # the whole day counts
+    assert rate_on("2026-07-01", staff_id=olive.id) == [600]
+    assert rate_on("2026-01-15", staff_id=ben.id) == [450]     # never changed: current rate
+    assert rate_on("2026-03-15", department="warehouse") == [600, 450]  # Late Hire not yet on staff
+    assert rate_on("2025-12-31", staff_id=olive.id) == []
+
+    changes, truncated = rate_history.changes_between(
+        db, datetime(2026, 2, 1), rate_history.parse_bound("2026-02-28", end=True), department="Warehouse"
+    )
+    assert [(c["previous_rate"], c["daily_rate"]) for c in changes] == [(500, 550)] and not truncated
+
+
+def test_adjust_salary_appends_history_in_the_same_commit(db):
+    hire(db, "Olive Perez", "Warehouse", 500, datetime(2026, 1, 1))
+    handle_command("/adjust_salary Olive Perez | 585", db)
+    handle_command("/adjust_salary Nobody Here | 585", db)
+    assert db.scalar(select(func.count()).select_from(models.StaffRateHistory)) == 1
+
+    reply, _ = handle_command("/rate_changes olive perez | 2026-01-01", db)
+    assert "500.00 PHP → 585.00 PHP" in reply
+    reply, _ = handle_command("/rate_as_of Warehouse | 2026-01-02", db)
+    assert "- Olive Perez: 500.00 PHP" in reply
+    assert "Did you mean: Warehouse?" in handle_command("/rate_as_of Warehous | 2026-01-02", db)[0]
+    assert "Invalid date" in handle_command("/rate_as_of Olive Perez | Jan 2", db)[0]
+
+
+def test_rate_endpoints():
+    with TestClient(app_module.app) as client:
+        client.post("/chat", json={"user_id": "rates", "message": "/add_staff Rate Tester | Clerk | Audit | 400"})
+        client.post("/chat", json={"user_id": "rates", "message": "/adjust_salary Rate Tester | 420"})
+
+        today = datetime.now(UTC).date().isoformat()
+        r = client.get("/staff/rates", params={"as_of": today, "department": "audit"})
+        assert r.status_code == 200 and r.json()["rates"][0]["daily_rate"] == 420
+        r = client.get("/staff/rate_changes", params={"start": "2000-01-01", "name": "rate tester"})
+        assert [c["daily_rate"] for c in r.json()["changes"]] == [420]
+
+        assert client.get("/staff/rates", params={"as_of": today}).status_code == 400
+        assert client.get("/staff/rates", params={"as_of": "soon", "department": "Audit"}).status_code == 400
+        assert client.get("/staff/rate_changes", params={"start": today, "name": "Nobody"}).status_code == 404
@@ -0,0 +1,32 @@
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app.response_cache import ResponseCache, make_key, normalize
+
+
+def test_normalized_questions_share_a_key():
+    assert normalize("  How many   staff do we have?? ") == "how many staff do we have"
+    assert make_key("How many staff?", 3, "sys", "m") == make_key("how many staff", 3, "sys", "m")
+    assert make_key("How many staff?", 3, "sys", "m") != make_key("How many staff?", 4, "sys", "m")
+
+
+def test_repeated_questions_skip_think_until_staff_changes(monkeypatch):
+    monkeypatch.setattr(app_module, "reply_cache", ResponseCache(max_entries=8, ttl=60))
+    calls = []
+
+    async def fake_think(user_input, history, business_context=None, summary=None, recalled=None):
+        calls.append(user_input)
+        return f"{business_context['staff_count']} staff"
+
+    monkeypatch.setattr(app_module, "think", fake_think)
+    with TestClient(app_module.app) as client:  # lifespan creates the staff table
+        ask = lambda text: client.post("/chat", json={"user_id": "cache-test", "message": text}).json()["reply"]
+
+        first = ask("How many staff do we have?")
+        assert ask("how many staff do we have") == first
+        assert len(calls) == 1
+
+        client.post("/chat", json={"user_id": "cache-test", "message": "/add_staff Ana Cruz | Clerk | Store | 500"})
+        assert ask("How many staff do we have?") != first
+        assert len(calls) == 2
+    assert app_module.reply_cache.stats()["hits"] == 1
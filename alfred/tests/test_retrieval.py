@@ -0,0 +1,66 @@
+from alfred.app import prompt
+from alfred.app.retrieval import RetrievalIndex
+
+
+def test_recalls_relevant_turns_and_persists(tmp_path, make_store):
+    store = make_store()
+    store.append("alice", "Maria's daily rate is 120 in the warehouse", "Noted.")
+    for i in range(50):
+        store.append("alice", f"small talk {i}", f"reply {i}")
+    store.append("bob", "Maria's daily rate is 300", "Noted.")
+
+    index = RetrievalIndex(str(tmp_path / "index"))
+    assert index.sync("alice", store) == 51
+    assert index.sync("alice", store) == 0  # already caught up
+
+    hits = index.search("alice", "what is Maria's daily rate?", k=2)
+    assert hits[0][0] == 1
+    # another process reopening the directory sees the same index
+    reopened = RetrievalIndex(str(tmp_path / "index"))
+    assert reopened.search("alice", "what is Maria's daily rate?", k=2)[0][0] == 1
+    # turns already in the prompt window are excluded
+    assert all(seq < 1 for seq, _ in reopened.search("alice", "Maria's daily rate", before=1))
+
+    store.append("alice", "Maria now earns 150 a day", "Updated.")
+    assert reopened.sync("alice", store) == 1
+    assert reopened.search("alice", "how much does Maria earn a day", k=1)[0][0] == 53
+
+
+def test_index_is_rebuilt_when_the_store_is_reset(tmp_path, make_store):
+    index = RetrievalIndex(str(tmp_path / "index"))
+    old = make_store("old.db")
+    for i in range(5):
+        old.append("alice", f"turn {i}", "ok")
+    index.sync("alice", old)
+
+    fresh = make_store("fresh.db")
+    fresh.append("alice", "warehouse inventory", "ok")
+    assert index.sync("alice", fresh) == 1
+    assert [seq for seq, _ in index.search("alice", "warehouse inventory")] == [1]
+
+
+def test_index_is_rebuilt_for_another_database(tmp_path, make_store):
+    first = make_store("first.db")
+    first.append("alice", "Maria's daily rate is 120", "Noted.")
+    index = RetrievalIndex(str(tmp_path / "index"), database="sqlite:///first.db")
+    index.sync("alice", first)
+
+    # same seqs and more of them, so the reset-on-rewind check alone would miss it
+    second = make_store("second.db")
+    second.append("alice", "warehouse inventory", "ok")
+    second.append("alice", "loading dock schedule", "ok")
+    reopened = RetrievalIndex(str(tmp_path / "index"), database="sqlite:///second.db")
+    assert reopened.sync("alice", second) == 2
+    assert reopened.search("alice", "Maria's daily rate") == []
+
+    # reopening for the same database keeps the rows
+    again = RetrievalIndex(str(tmp_path / "index"), database="sqlite:///second.db")
+    assert again.sync("alice", second) == 0
+    assert again.search("alice", "warehouse inventory", k=1)[0][0] == 1
+
+
+def test_recalled_turns_go_into_the_prompt():
+    messages = prompt.build_prompt(
+        "system", "rate?", [], recalled=[{"user": "Maria earns 120", "alfred": "Noted."}]
+    )
+    assert messages[1]["content"] == prompt.RECALL_PREAMBLE + "User: Maria earns 120\nAlfred: Noted."
@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+from alfred.app.speculative_tts import SpeculativeTTS
+
+
+async def _slow_chunks(gate: asyncio.Event):
+    yield b"one"
+    await gate.wait()
+    yield b"two"
+
+
+def test_claim_attaches_to_in_flight_audio():
+    async def run():
+        registry = SpeculativeTTS(max_jobs=2, ttl=60)
+        gate = asyncio.Event()
+        handle = registry.start("k1", "mp3", lambda: _slow_chunks(gate))
+        await asyncio.sleep(0)
+
+        job = registry.claim(handle)
+        assert registry.claim(handle) is None  # one claim per handle
+        received = []
+
+        async def reader():
+            async for chunk in job.stream():
+                received.append(chunk)
+
+        task = asyncio.create_task(reader())
+        await asyncio.sleep(0.01)
+        assert received == [b"one"]
+        gate.set()
+        await task
+        return received
+
+    assert asyncio.run(run()) == [b"one", b"two"]
+
+
+def test_queue_is_bounded_and_unclaimed_jobs_expire():
+    async def run():
+        registry = SpeculativeTTS(max_jobs=1, ttl=60)
+        gate = asyncio.Event()
+        first = registry.start("k1", "mp3", lambda: _slow_chunks(gate))
+        assert first is not None
+        assert registry.start("k2", "mp3", lambda: _slow_chunks(gate)) is None
+        # same text joins the pending job instead of queueing another
+        assert registry.start("k1", "mp3", lambda: _slow_chunks(gate)) == first
+
+        registry.ttl = 0
+        registry.sweep()
+        await asyncio.sleep(0)
+        assert registry.claim(first) is None
+        return registry.stats()
+
+    stats = asyncio.run(run())
+    assert stats["pending"] == 0
+    assert stats["dropped"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_duplicate_or_rejected_jobs_never_open_a_stream():
+    async def run():
+        registry = SpeculativeTTS(max_jobs=1, ttl=60)
+        gate = asyncio.Event()
+        opened = []
+
+        def make(key):
+            opened.append(key)
+            return _slow_chunks(gate)
+
+        registry.start("k1", "mp3", lambda: make("k1"))
+        registry.start("k1", "mp3", lambda: make("k1"))  # joins the pending job
+        registry.start("k2", "mp3", lambda: make("k2"))  # queue full
+        assert opened == ["k1"]
+
+        # the periodic sweep frees expired audio without any start/claim
+        registry.ttl = 0
+        sweeper = asyncio.create_task(registry.sweep_forever(interval=0.01))
+        await asyncio.sleep(0.05)
+        sweeper.cancel()
+        return registry.stats()
+
+    assert asyncio.run(run())["pending"] == 0
+
+
+def test_chat_speak_returns_handle_for_prefetched_audio(monkeypatch):
+    calls = []
+
+    class Speech:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def iter_bytes(self, chunk_size=None):
+            yield b"ID3"
+            yield b"prefetched"
+
+    def create(**kwargs):
+        calls.append(kwargs["input"])
+        return Speech()
+
+    monkeypatch.setattr(app_module, "audio_cache", None)
+    monkeypatch.setattr(app_module, "prefetch", SpeculativeTTS(max_jobs=4, ttl=60))
+    async def chat_create(**kwargs):
+        message = SimpleNamespace(content="Hello there.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    providers.set_client(SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=chat_create)),
+        audio=SimpleNamespace(speech=SimpleNamespace(with_streaming_response=SimpleNamespace(create=create))),
+    ))
+    try:
+        with TestClient(app_module.app) as client:
+            r = client.post("/chat", json={"user_id": "speak-test", "message": "hi", "speak": True})
+            handle = r.json()["audio_handle"]
+            assert handle
+
+            audio = client.get(f"/tts/{handle}")
+            assert audio.status_code == 200
+            assert audio.content == b"ID3prefetched"
+            assert client.get(f"/tts/{handle}").status_code == 404
+
+            # without speak, no audio work is started
+            r = client.post("/chat", json={"user_id": "speak-test", "message": "again"})
+            assert r.json()["audio_handle"] is None
+        assert len(calls) == 1
+    finally:
+        providers.set_client(None)
@@ -0,0 +1,67 @@
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from alfred.app import main as app_module
+from alfred.app import models, staff_export, staff_search
+from alfred.app.commands import handle_command
+from alfred.app.staff_import import import_stream
+
+
+def add(db, *names, department="Warehouse"):
+    db.add_all(models.Staff(full_name=n, department=department, current_daily_rate=500) for n in names)
+    db.commit()
+
+
+@pytest.fixture
+def client(db_engine):
+    """TestClient whose exports read the `db_engine` database."""
+    app_module.app.dependency_overrides[app_module.get_session_factory] = lambda: sessionmaker(bind=db_engine)
+    with TestClient(app_module.app) as client:
+        yield client
+    app_module.app.dependency_overrides.pop(app_module.get_session_factory, None)
+
+
+def test_export_streams_rows_that_import_back(db, client):
+    body = "full_name,department,daily_rate\n" + "".join(f"Export {i},Depot,700\n" for i in range(30))
+    import_stream(db, io.StringIO(body), fmt="csv")
+    add(db, "Ben Lim", department="Logistics")
+
+    r = client.get("/staff/export", params={"department": "depot"})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/csv")
+    lines = r.text.splitlines()
+    assert lines[0] == "id,full_name,role,department,daily_rate,status,created_at"
+    assert len(lines) == 31 and ",Export 0,,Depot,700.0,active," in lines[1]
+
+    ndjson = client.get("/staff/export", params={"format": "ndjson", "department": "Depot"}).text
+    assert [json.loads(line)["full_name"] for line in ndjson.splitlines()][-1] == "Export 29"
+    assert client.get("/staff/export", params={"format": "xml"}).status_code == 400
+
+    report = import_stream(db, io.StringIO(r.text), fmt="csv")
+    assert report.inserted == 30 and report.failed == 0
+
+
+def test_export_reads_in_chunks(db_engine, db):
+    add(db, *(f"Worker {i}" for i in range(25)))
+    chunks = list(staff_export.iter_export(sessionmaker(bind=db_engine), "ndjson", chunk=10))
+    assert [len(c.splitlines()) for c in chunks] == [10, 10, 5]
+
+
+def test_list_staff_pages_by_keyset(db):
+    add(db, *(f"Worker {i:03d}" for i in range(120)))
+    add(db, "Ben Lim", department="Logistics")
+
+    first, _ = handle_command("/list_staff Warehouse", db)
+    assert first.startswith("Staff in department 'Warehouse' (1-50 of 120):")
+    assert "Worker 049" in first and "Worker 050" not in first
+    assert first.endswith("More: /list_staff Warehouse page 2")
+
+    third, _ = handle_command("/list_staff warehouse page 3", db)
+    assert "(101-120 of 120)" in third and "Worker 119" in third and "More:" not in third
+
+    page = staff_search.list_page(db, "Warehouse", after=60, limit=10)  # ids start at 1
+    assert page.start == 61 and page.staff[0].full_name == "Worker 060" and page.cursor == page.staff[-1].id
+    assert "(no records found)" in handle_command("/list_staff Warehouse page 9", db)[0]
@@ -0,0 +1,75 @@
+import io
+
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select, text
+
+from alfred.app import main as app_module
+from alfred.app import models
+from alfred.app.commands import handle_command
+from alfred.app.staff_import import import_stream
+
+
+def test_csv_rows_are_batched_and_bad_rows_reported(db):
+    rows = ["full_name,role,department,daily_rate"]
+    rows += [f"Worker {i},Picker,Warehouse,{500 + i}" for i in range(25)]
+    rows += [",Picker,Warehouse,500", "Bad Rate,Picker,Warehouse,lots"]
+    report = import_stream(db, io.StringIO("\n".join(rows) + "\n"), batch_size=10)
+
+    assert report.inserted == 25 and report.failed == 2
+    assert [e["row"] for e in report.errors] == [27, 28]
+    assert "full_name is required" in report.errors[0]["error"]
+    assert db.scalar(select(func.count()).select_from(models.Staff)) == 25
+    assert db.scalar(select(models.Staff.status).limit(1)) == "active"
+
+
+def test_import_staff_command_accepts_inline_ndjson(db):
+    reply, handled = handle_command(
+        '/import_staff\n{"name": "Ana Cruz", "dept": "Store", "rate": 450}\n{"role": "Clerk"}\nnot json', db
+    )
+    assert handled
+    assert reply.startswith("✅ Imported 1 staff, 2 rows rejected.")
+    assert db.scalar(select(models.Staff.department)) == "Store"
+
+
+def test_upload_endpoint_streams_file():
+    body = "full_name,department,daily_rate\n" + "".join(f"Upload {i},Office,600\n" for i in range(50))
+    with TestClient(app_module.app) as client:
+        r = client.post("/staff/import", files={"file": ("staff.csv", body.encode(), "text/csv")})
+        assert r.status_code == 200
+        assert r.json() == {"inserted": 50, "failed": 0, "errors": [], "errors_truncated": False, "aborted": None}
+
+        bad = client.post("/staff/import", files={"file": ("staff.txt", b"", "text/plain")})
+        assert bad.status_code == 400
+
+
+def test_failed_batch_stops_the_import_and_reports_what_was_saved(db):
+    db.execute(text(
+        "CREATE TRIGGER reject_boom BEFORE INSERT ON staff WHEN NEW.full_name = 'Boom' "
+        "BEGIN SELECT RAISE(ABORT, 'boom rejected'); END"
+    ))
+    db.commit()
+    rows = "full_name,daily_rate\n" + "".join(f"{'Boom' if i == 14 else f'Worker {i}'},500\n" for i in range(25))
+
+    report = import_stream(db, io.StringIO(rows), batch_size=10)
+    assert report.inserted == 10
+    assert report.aborted == {"stage": "write", "error": report.aborted["error"], "first_row": 12, "last_row": 21}
+    assert "boom rejected" in report.aborted["error"] and "rows from 12 on" in report.summary()
+    assert db.scalar(select(func.count()).select_from(models.Staff)) == 10
+
+    report = import_stream(db, io.StringIO(rows), batch_size=10, atomic=True)
+    assert report.inserted == 0 and report.aborted["first_row"] == 2
+    assert db.scalar(select(func.count()).select_from(models.Staff)) == 10
+
+
+def test_upload_with_bad_encoding_reports_committed_batches():
+    body = ("full_name,department\n" + "".join(f"Encoded {i},Office\n" for i in range(2500))).encode()
+    body += b"Bad \xff Bytes,Office\n"
+    with TestClient(app_module.app) as client:
+        r = client.post("/staff/import", files={"file": ("staff.csv", body, "text/csv")})
+        assert r.status_code == 400
+        report = r.json()
+        assert report["inserted"] == 2000 and report["aborted"]["stage"] == "read"
+        assert report["aborted"]["first_row"] == 2002
+
+        r = client.post("/staff/import", files={"file": ("staff.csv", body, "text/csv")}, data={"atomic": "true"})
+        assert r.status_code == 400 and r.json()["inserted"] == 0
@@ -0,0 +1,69 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from alfred.app import models, staff_search
+from alfred.app.commands import handle_command
+from alfred.app.models import search_key
+
+
+def add(db, *names, department="Warehouse"):
+    db.add_all(models.Staff(full_name=n, department=department, current_daily_rate=500) for n in names)
+    db.commit()
+
+
+def test_search_key_folds_case_accents_and_punctuation():
+    assert search_key("  OLIVE  Pérez-Cruz ") == "olive perez cruz"
+    assert search_key(None) is None
+
+
+def test_lookup_ignores_case_and_accents(db):
+    add(db, "José Ramírez", "Olive Perez")
+    assert staff_search.find_by_name(db, "jose ramirez").full_name == "José Ramírez"
+    assert staff_search.find_by_name(db, "OLIVE PÉREZ").full_name == "Olive Perez"
+
+    # keys follow renames made through the ORM
+    staff = staff_search.find_by_name(db, "olive perez")
+    staff.full_name = "Olive Santos"
+    db.commit()
+    assert staff_search.find_by_name(db, "olive santos") is not None
+    assert staff_search.suggest_names(db, "Olive Santo") == ["Olive Santos"]
+
+
+def test_suggestions_include_names_added_after_counts_are_cached(db):
+    add(db, "Olive Perez")
+    assert staff_search.suggest_names(db, "Olive Perz") == ["Olive Perez"]
+    add(db, "Xavier Quon")
+    assert staff_search.suggest_names(db, "Xavir Quon") == ["Xavier Quon"]
+
+
+def test_miss_suggests_close_names_and_departments(db):
+    add(db, "Olive Perez", "Juan dela Cruz", "Maria Santos")
+    add(db, "Ben Lim", department="Logistics")
+
+    reply, handled = handle_command("/adjust_salary Olvie Perez | 600", db)
+    assert handled and "No staff found" in reply and "Did you mean: Olive Perez?" in reply
+
+    reply, _ = handle_command("/adjust_salary olive perez | 600", db)
+    assert reply.startswith("✅ Updated salary for Olive Perez")
+
+    reply, _ = handle_command("/list_staff logistcs", db)
+    assert "(no records found)" in reply and "Did you mean: Logistics?" in reply
+    reply, _ = handle_command("/list_staff LOGISTICS", db)
+    assert "Ben Lim" in reply
+
+
+def test_ensure_schema_upgrades_an_existing_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}", future=True)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE staff (id INTEGER PRIMARY KEY, full_name VARCHAR(200), role VARCHAR(100), "
+            "department VARCHAR(100), current_daily_rate FLOAT, status VARCHAR(50), created_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO staff (full_name, department) VALUES ('Renée Dubois', 'Office')"))
+
+    staff_search.ensure_schema(engine)
+    staff_search.ensure_schema(engine)  # idempotent
+    db = sessionmaker(bind=engine)()
+    assert staff_search.find_by_name(db, "renee dubois").department == "Office"
+    assert [s.full_name for s in staff_search.list_page(db, department="office").staff] == ["Renée Dubois"]
+    assert staff_search.suggest_names(db, "Rene Dubois") == ["Renée Dubois"]
@@ -0,0 +1,155 @@
+import sqlite3
+import time
+
+import pytest
+
+from alfred.app.history_cache import HistoryCache
+from alfred.app.state import InProcessState, RedisState, SQLiteState, StateBackend
+
+
+class FakeRedis:
+    """Local stand-in for the subset of redis-py that RedisState uses."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def _live(self, key):
+        if key in self.expiry and time.time() >= self.expiry[key]:
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return self.data.get(key)
+
+    def get(self, key):
+        value = self._live(key)
+        return value.encode() if isinstance(value, str) else None
+
+    def set(self, key, value, px=None):
+        self.data[key] = value
+        self.expiry.pop(key, None)
+        if px:
+            self.expiry[key] = time.time() + px / 1000
+
+    def delete(self, key):
+        self.data.pop(key, None)
+        self.expiry.pop(key, None)
+
+    def incr(self, key):
+        self.data[key] = str(int(self._live(key) or 0) + 1)
+        return int(self.data[key])
+
+    def exists(self, key):
+        return int(self._live(key) is not None)
+
+    def pexpire(self, key, ms):
+        if self._live(key) is not None:
+            self.expiry[key] = time.time() + ms / 1000
+
+    def rpush(self, key, *values):
+        self.data.setdefault(key, []).extend(values)
+        return len(self.data[key])
+
+    def rpushx(self, key, value):
+        if self._live(key) is None:
+            return 0
+        return self.rpush(key, value)
+
+    def ltrim(self, key, start, end):
+        if self._live(key) is not None:
+            items = self.data[key]
+            self.data[key] = items[start:] if end == -1 else items[start:end + 1]
+
+    def lrange(self, key, start, end):
+        items = self._live(key) or []
+        return [v.encode() for v in (items[start:] if end == -1 else items[start:end + 1])]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return InProcessState(max_keys=100)
+    if request.param == "sqlite":
+        return SQLiteState(str(tmp_path / "state.db"))
+    return RedisState(client=FakeRedis())
+
+
+def test_backends_share_one_contract(backend):
+    assert backend.get("k") is None
+    backend.set("k", "v")
+    assert backend.get("k") == "v"
+    backend.delete("k")
+    assert backend.get("k") is None
+    assert [backend.incr("n") for _ in range(3)] == [1, 2, 3]
+
+    assert backend.items("list") is None
+    assert backend.append("list", "x", max_len=3) is False  # absent lists stay absent
+    backend.set_items("list", [], max_len=3)
+    assert backend.items("list") == []
+    for value in "abcd":
+        assert backend.append("list", value, max_len=3)
+    assert backend.items("list") == ["b", "c", "d"]
+
+    backend.set("short", "lived", ttl=0.05)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(StateBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_sqlite_purges_expired_rows_every_n_writes(tmp_path):
+    path = str(tmp_path / "state.db")
+    state = SQLiteState(path, purge_every=3)
+
+    def rows():
+        with sqlite3.connect(path) as db:
+            return [db.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("state_kv", "state_list")]
+
+    state.set_items("old", ["a", "b"], max_len=5, ttl=0.05)
+    state.set("short", "lived", ttl=0.05)
+    time.sleep(0.1)
+    state.set_items("new", ["c"], max_len=5, ttl=60)
+    assert state.purges == 1 and rows() == [1, 1]
+
+    state.set("other", "x", ttl=0.05)
+    time.sleep(0.1)
+    state.set("kept", "y")  # writes without a TTL do not count
+    assert state.purges == 1 and rows() == [3, 1]
+    assert state.get("other") is None  # reads skip expired rows before they are purged
+
+
+def test_workers_see_the_same_conversation(tmp_path):
+    # two workers, each with its own connection to the shared state
+    path = str(tmp_path / "state.db")
+    worker_a = HistoryCache(turns=3, backend=SQLiteState(path))
+    worker_b = HistoryCache(turns=3, backend=SQLiteState(path))
+
+    worker_a.put("alice", [{"user": "hi", "alfred": "hello"}])
+    worker_b.append("alice", {"user": "how are you?", "alfred": "well"})
+    assert worker_a.get("alice") == [
+        {"user": "hi", "alfred": "hello"},
+        {"user": "how are you?", "alfred": "well"},
+    ]
+    worker_a.put("alice", [])
+    assert worker_b.get("alice") == []
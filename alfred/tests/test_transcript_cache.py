@@ -0,0 +1,116 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+from alfred.app.state import InProcessState, SQLiteState
+from alfred.app.transcript_cache import TranscriptCache, fingerprint
+
+
+def test_concurrent_requests_share_one_upstream_call():
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "hello"
+
+    async def run():
+        cache = TranscriptCache(max_entries=4, ttl=60)
+        results = await asyncio.gather(*(cache.get_or_transcribe("k", upstream) for _ in range(3)))
+        again = await cache.get_or_transcribe("k", upstream)
+        return results, again, cache.stats()
+
+    results, again, stats = asyncio.run(run())
+    assert len(calls) == 1
+    assert [status for _, status in results] == ["miss", "coalesced", "coalesced"]
+    assert again == ("hello", "hit")
+    assert stats["hits"] == 1 and stats["coalesced"] == 2 and stats["misses"] == 1
+
+
+def test_concurrent_requests_coalesce_across_the_shared_lookup(tmp_path):
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "hello"
+
+    class Down(InProcessState):
+        def get(self, key):
+            raise ConnectionError("state backend down")
+
+    async def run(shared):
+        cache = TranscriptCache(max_entries=4, ttl=60, shared=shared)
+        return await asyncio.gather(*(cache.get_or_transcribe("k", upstream) for _ in range(3)))
+
+    # the SQLite lookup runs in a worker thread; callers arriving meanwhile must still join
+    results = asyncio.run(run(SQLiteState(str(tmp_path / "state.db"))))
+    assert len(calls) == 1 and [status for _, status in results] == ["miss", "coalesced", "coalesced"]
+    # a failing non-blocking backend is a miss, not an error
+    results = asyncio.run(run(Down()))
+    assert len(calls) == 2 and results[0] == ("hello", "miss")
+
+
+def test_failures_are_not_cached_and_entries_expire_and_evict():
+    async def failing():
+        raise RuntimeError("upstream down")
+
+    async def ok():
+        return "text"
+
+    async def run():
+        cache = TranscriptCache(max_entries=2, ttl=60)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_transcribe("k", failing)
+        assert cache.get("k") is None
+
+        for key in ("a", "b", "c"):
+            await cache.get_or_transcribe(key, ok)
+        assert cache.get("a") is None  # least recently used went first
+
+        cache.ttl = -1
+        assert cache.get("c") is None
+        return cache.stats()
+
+    stats = asyncio.run(run())
+    assert stats["evictions"] == 1
+    assert stats["expired"] == 1
+
+
+def test_fingerprint_of_file_matches_bytes_and_rewinds():
+    f = io.BytesIO(b"clip" * 1000)
+    assert fingerprint(f, "whisper-1") == fingerprint(b"clip" * 1000, "whisper-1")
+    assert f.tell() == 0
+    assert fingerprint(b"clip", "whisper-1") != fingerprint(b"clip", "other-model")
+
+
+def test_stt_retry_is_served_from_cache(monkeypatch):
+    calls = []
+
+    async def transcribe_create(**kwargs):
+        calls.append(kwargs["file"][0])
+        return SimpleNamespace(text="same clip")
+
+    monkeypatch.delenv("MOCK_MODE", raising=False)
+    monkeypatch.setattr(app_module, "AUDIO_PREP", False)
+    monkeypatch.setattr(app_module, "stt_cache", TranscriptCache(max_entries=8, ttl=60))
+    providers.set_client(SimpleNamespace(audio=SimpleNamespace(
+        transcriptions=SimpleNamespace(create=transcribe_create)
+    )))
+    try:
+        client = TestClient(app_module.app)
+        upload = {"audio": ("a.m4a", b"retried bytes", "audio/m4a")}
+        first = client.post("/stt", files=upload)
+        second = client.post("/stt", files=upload)
+        assert first.json()["text"] == second.json()["text"] == "same clip"
+        assert first.headers["X-STT-Cache"] == "miss"
+        assert second.headers["X-STT-Cache"] == "hit"
+        assert len(calls) == 1
+        assert client.get("/stats").json()["stt_cache"]["hits"] == 1
+    finally:
+        providers.set_client(None)
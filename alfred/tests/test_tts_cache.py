@@ -0,0 +1,141 @@
+import os
+import time
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers, tts_cache
+from alfred.app.tts_cache import TTSCache, make_key
+
+
+def _store(cache, key, data):
+    w = cache.writer(key)
+    w.write(data)
+    w.commit()
+
+
+def test_key_depends_on_every_field():
+    base = make_key("hello", "alloy", "mp3", "tts-1")
+    assert base == make_key("hello", "alloy", "mp3", "tts-1")
+    assert base != make_key("hello", "nova", "mp3", "tts-1")
+    assert base != make_key("hello", "alloy", "opus", "tts-1")
+    assert base != make_key("hello", "alloy", "mp3", "tts-1-hd")
+
+
+def test_lru_eviction_and_stats(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=25)
+    _store(cache, "a", b"x" * 10)
+    _store(cache, "b", b"x" * 10)
+    assert cache.get("a") is not None  # a is now most recent
+    _store(cache, "c", b"x" * 10)      # over cap: evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("a").read_bytes() == b"x" * 10
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == 20
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_concurrent_writers_for_one_key_do_not_share_a_temp_file(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1000)
+    first, second = cache.writer("k"), cache.writer("k")
+    first.write(b"1234")
+    second.write(b"5678")
+    first.commit()
+    second.commit()
+    assert cache.get("k").read_bytes() == b"5678"
+    assert list(tmp_path.glob("*.part")) == []
+
+    lost = cache.writer("k")
+    lost.write(b"abcd")
+    lost._tmp.unlink()  # swept as stale by another worker's startup
+    lost.commit()       # no error; the published file stays
+    assert cache.get("k").read_bytes() == b"5678"
+
+
+def test_aborted_write_is_not_published_and_index_reloads(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1000)
+    w = cache.writer("partial")
+    w.write(b"half")
+    w.abort()
+    _store(cache, "old", b"1")
+    time.sleep(0.01)
+    _store(cache, "new", b"2")
+
+    reloaded = TTSCache(str(tmp_path), max_bytes=1000)
+    assert reloaded.get("partial") is None
+    assert list(reloaded._entries) == ["old", "new"]
+
+
+def test_workers_sharing_a_directory_stay_under_one_cap(tmp_path):
+    first = TTSCache(str(tmp_path), max_bytes=25)
+    second = TTSCache(str(tmp_path), max_bytes=25)
+    _store(first, "a", b"x" * 10)
+    time.sleep(0.01)
+    _store(second, "b", b"x" * 10)
+    time.sleep(0.01)
+    _store(first, "c", b"x" * 10)  # counts b too: evicts a, the oldest
+
+    assert sorted(p.name for p in tmp_path.glob("*.audio")) == ["b.audio", "c.audio"]
+    assert first.get("b") is not None and first.stats()["bytes"] == 20
+
+
+def test_startup_only_sweeps_stale_temp_files(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=1000)
+    live = cache.writer("live")
+    live.write(b"1234")
+    stale = tmp_path / "crashed.abc.part"
+    stale.write_bytes(b"half")
+    old = time.time() - 2 * tts_cache.STALE_PART_SECONDS
+    os.utime(stale, (old, old))
+
+    TTSCache(str(tmp_path), max_bytes=1000)  # another worker starting
+    assert not stale.exists()
+    live.commit()
+    assert cache.get("live").read_bytes() == b"1234"
+
+
+def test_tts_endpoint_serves_hits_from_disk_with_etag(tmp_path, monkeypatch):
+    calls = []
+
+    class Speech:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def iter_bytes(self, chunk_size=None):
+            yield b"ID3"
+            yield b"cached-audio"
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return Speech()
+
+    monkeypatch.setattr(app_module, "audio_cache", TTSCache(str(tmp_path), 1024 * 1024))
+    providers.set_client(SimpleNamespace(
+        audio=SimpleNamespace(speech=SimpleNamespace(with_streaming_response=SimpleNamespace(create=create)))
+    ))
+    try:
+        client = TestClient(app_module.app)
+        first = client.post("/tts", json={"text": "Added staff"})
+        assert first.headers["x-tts-cache"] == "miss"
+        assert first.content == b"ID3cached-audio"
+
+        second = client.post("/tts", json={"text": "Added staff"})
+        assert second.headers["x-tts-cache"] == "hit"
+        assert second.content == b"ID3cached-audio"
+        assert len(calls) == 1
+
+        etag = second.headers["etag"]
+        third = client.post("/tts", json={"text": "Added staff"}, headers={"If-None-Match": etag})
+        assert third.status_code == 304
+
+        stats = client.get("/stats").json()["tts_cache"]
+        assert stats["hits"] == 2 and stats["misses"] == 1
+    finally:
+        providers.set_client(None)
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+
+
+class FakeSpeech:
+    def __init__(self, chunks, fail=False):
+        self.chunks = chunks
+        self.fail = fail
+        self.closed = False
+        self.chunk_size = None
+
+    async def __aenter__(self):
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return self
+
+    async def __aexit__(self, *exc):
+        self.closed = True
+        return False
+
+    async def iter_bytes(self, chunk_size=None):
+        self.chunk_size = chunk_size
+        for chunk in self.chunks:
+            yield chunk
+
+
+def fake_client(speech):
+    create = lambda **kwargs: speech
+    return SimpleNamespace(
+        audio=SimpleNamespace(speech=SimpleNamespace(with_streaming_response=SimpleNamespace(create=create)))
+    )
+
+
+def test_tts_passes_chunks_through(monkeypatch):
+    monkeypatch.setattr(app_module, "audio_cache", None)
+    speech = FakeSpeech([b"a" * 10, b"b" * 10, b"c" * 10])
+    providers.set_client(fake_client(speech))
+    try:
+        client = TestClient(app_module.app)
+        with client.stream("POST", "/tts", json={"text": "hello"}) as r:
+            assert r.headers["content-type"] == "audio/mpeg"
+            received = list(r.iter_bytes())
+        assert b"".join(received) == b"a" * 10 + b"b" * 10 + b"c" * 10
+        assert speech.chunk_size == providers.TTS_CHUNK_SIZE
+        assert speech.closed
+    finally:
+        providers.set_client(None)
+
+
+def test_tts_upstream_failure_returns_empty_audio(monkeypatch):
+    monkeypatch.setattr(app_module, "audio_cache", None)
+    providers.set_client(fake_client(FakeSpeech([], fail=True)))
+    try:
+        client = TestClient(app_module.app)
+        r = client.post("/tts", json={"text": "hello"})
+        assert r.status_code == 200
+        assert r.content == b""
+    finally:
+        providers.set_client(None)
+
+
+def test_primed_closes_upstream_when_consumer_stops_early():
+    speech = FakeSpeech([b"1", b"2", b"3"])
+    providers.set_client(fake_client(speech))
+
+    async def run():
+        body = await app_module._primed(providers.synthesize("hi", "alloy", "mp3"))
+        first = await body.__anext__()
+        await body.aclose()  # what Starlette does when the client disconnects
+        return first
+
+    try:
+        assert asyncio.run(run()) == b"1"
+        assert speech.closed
+    finally:
+        providers.set_client(None)
@@ -0,0 +1,65 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+from alfred.app.uploads import UploadLimitMiddleware, UploadTooLarge
+
+
+def test_declared_oversized_upload_is_rejected_before_reading(monkeypatch):
+    monkeypatch.setitem(app_module.UPLOAD_LIMITS, "/stt", 1024)
+    client = TestClient(app_module.app)
+    r = client.post("/stt", files={"audio": ("big.m4a", b"x" * 4096, "audio/m4a")})
+    assert r.status_code == 413
+    assert "too large" in r.json()["error"]
+
+
+def test_streamed_upload_is_cut_off_once_it_crosses_the_limit():
+    pulled = []
+    sent = []
+
+    async def receive():
+        pulled.append(1)
+        return {"type": "http.request", "body": b"x" * 512, "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        while (await receive())["more_body"]:
+            pass
+
+    async def run():
+        # chunked transfer: no Content-Length for the early check
+        scope = {"type": "http", "path": "/stt", "headers": []}
+        await UploadLimitMiddleware(app, {"/stt": 1024})(scope, receive, send)
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(run())
+    assert len(pulled) == 3  # stopped at the chunk that crossed the limit
+
+
+def test_upload_file_object_is_handed_to_transcription(monkeypatch):
+    received = []
+
+    async def transcribe_create(**kwargs):
+        received.append(kwargs["file"][1])
+        return SimpleNamespace(text="ok")
+
+    monkeypatch.delenv("MOCK_MODE", raising=False)
+    monkeypatch.setattr(app_module, "stt_cache", None)
+    monkeypatch.setattr(app_module, "AUDIO_PREP", False)
+    providers.set_client(SimpleNamespace(audio=SimpleNamespace(
+        transcriptions=SimpleNamespace(create=transcribe_create)
+    )))
+    try:
+        client = TestClient(app_module.app)
+        r = client.post("/stt", files={"audio": ("a.m4a", b"abc" * 100, "audio/m4a")})
+        assert r.json()["text"] == "ok"
+        # the spooled upload itself, rewound, not a bytes copy
+        assert hasattr(received[0], "read") and not isinstance(received[0], bytes)
+    finally:
+        providers.set_client(None)
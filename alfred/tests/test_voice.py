@@ -0,0 +1,72 @@
+import base64
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from alfred.app import main as app_module
+from alfred.app import providers
+
+
+class Speech:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def iter_bytes(self, chunk_size=None):
+        yield b"ID3"
+        yield b"voice-audio"
+
+
+def test_voice_runs_stt_think_tts_in_one_request(monkeypatch, parse_sse):
+    async def transcribe_create(**kwargs):
+        return SimpleNamespace(text="hello alfred")
+
+    async def deltas():
+        for piece in ("Hello ", "there."):
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    async def chat_create(**kwargs):
+        return deltas()
+
+    monkeypatch.delenv("MOCK_MODE", raising=False)
+    monkeypatch.setattr(app_module, "audio_cache", None)
+    monkeypatch.setattr(app_module, "stt_cache", None)
+    providers.set_client(SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=chat_create)),
+        audio=SimpleNamespace(
+            transcriptions=SimpleNamespace(create=transcribe_create),
+            speech=SimpleNamespace(with_streaming_response=SimpleNamespace(create=lambda **kw: Speech())),
+        ),
+    ))
+    try:
+        client = TestClient(app_module.app)
+        r = client.post(
+            "/voice",
+            files={"audio": ("a.m4a", b"fake-audio", "audio/m4a")},
+            data={"user_id": "voice-test"},
+        )
+        assert r.status_code == 200
+        events = parse_sse(r.text)
+        kinds = [kind for kind, _ in events]
+
+        assert kinds[0] == "transcript" and events[0][1]["text"] == "hello alfred"
+        assert kinds.index("reply") < kinds.index("audio")
+        assert kinds[-1] == "done" and events[-1][1]["audio"] is True
+
+        audio = b"".join(base64.b64decode(data["data"]) for kind, data in events if kind == "audio")
+        assert audio == b"ID3voice-audio"
+        assert app_module._histories.get("voice-test")[-1]["user"] == "hello alfred"
+    finally:
+        providers.set_client(None)
+
+
+def test_voice_dev_mode_returns_text_without_audio(monkeypatch, parse_sse):
+    monkeypatch.setenv("MOCK_MODE", "true")
+    client = TestClient(app_module.app)
+    r = client.post("/voice", files={"audio": ("a.wav", b"RIFF", "audio/wav")}, data={"user_id": "voice-test"})
+    events = parse_sse(r.text)
+    assert events[0] == ("transcript", {"text": app_module.MOCK_TRANSCRIPT})
+    assert "reply" in [kind for kind, _ in events]
+    assert events[-1] == ("done", {"audio": False})
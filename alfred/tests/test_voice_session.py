@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from alfred.app import main as app_module
+from alfred.app.voice_session import RingBuffer, UtteranceDetector
+
+RATE = 16000
+
+
+def tone(ms, amplitude=0.3):
+    t = np.arange(RATE * ms // 1000) / RATE
+    return (np.sin(2 * np.pi * 220 * t) * amplitude * 32767).astype("<i2").tobytes()
+
+
+def silence(ms):
+    return b"\x00\x00" * (RATE * ms // 1000)
+
+
+def frames(pcm, ms=20):
+    step = RATE * ms // 1000 * 2
+    return [pcm[i:i + step] for i in range(0, len(pcm), step)]
+
+
+def test_ring_buffer_keeps_newest_bytes():
+    ring = RingBuffer(8)
+    ring.write(b"abcdef")
+    ring.write(b"ghij")
+    assert ring.read_all() == b"cdefghij"
+    assert ring.dropped == 2 and ring.full
+    ring.keep_last(3)
+    assert ring.read_all() == b"hij"
+    ring.write(b"0123456789")
+    assert ring.read_all() == b"23456789"
+
+
+def test_detector_finds_start_and_end_of_speech():
+    detector = UtteranceDetector(RATE, end_silence_ms=300)
+    events = []
+    for frame in frames(silence(200) + tone(500) + silence(400)):
+        events.extend(detector.feed(frame))
+    assert events == ["start", "end"]
+
+
+def test_websocket_dispatches_transcription_when_speech_ends(monkeypatch):
+    transcribed = []
+
+    async def stand_in(pcm, sample_rate):
+        transcribed.append(len(pcm))
+        return "list staff please"
+
+    monkeypatch.setattr(app_module, "_transcribe_pcm", stand_in)
+    monkeypatch.setattr(app_module, "VAD_END_SILENCE_MS", 300)
+    monkeypatch.setattr(app_module, "WS_PARTIAL_MS", 0)
+    monkeypatch.setenv("MOCK_MODE", "true")
+
+    client = TestClient(app_module.app)
+    with client.websocket_connect("/ws/voice?user_id=ws-test") as ws:
+        assert ws.receive_json()["type"] == "ready"
+        for frame in frames(silence(200) + tone(600) + silence(400)):
+            ws.send_bytes(frame)
+
+        assert ws.receive_json()["type"] == "speech_start"
+        final = ws.receive_json()
+        assert final == {"type": "final", "text": "list staff please"}
+        reply = ws.receive_json()
+        assert reply["type"] == "reply" and "list staff please" in reply["text"]
+        ws.send_json({"type": "close"})
+
+    # only speech plus a short pre-roll is buffered, not the leading silence
+    assert len(transcribed) == 1
+    assert transcribed[0] < (200 + 600 + 400) * RATE // 1000 * 2
+
+
+def test_websocket_push_to_talk_without_speech_gets_empty_final(monkeypatch):
+    monkeypatch.setenv("MOCK_MODE", "true")
+    client = TestClient(app_module.app)
+    with client.websocket_connect("/ws/voice") as ws:
+        ws.receive_json()
+        ws.send_bytes(silence(100))
+        ws.send_json({"type": "end"})
+        assert ws.receive_json() == {"type": "final", "text": ""}
+
+
+def test_websocket_rejects_unusable_sample_rates(monkeypatch):
+    monkeypatch.setenv("MOCK_MODE", "true")
+    client = TestClient(app_module.app)
+    for rate in (0, -16000, 4000, 96000):
+        with client.websocket_connect(f"/ws/voice?sample_rate={rate}") as ws:
+            assert ws.receive_json() == {"type": "error", "error": "sample_rate must be between 8000 and 48000 Hz"}
+            with pytest.raises(WebSocketDisconnect):
+                ws.receive_json()